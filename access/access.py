@@ -1,8 +1,16 @@
+import functools
+import json
 import logging
+import os
+import pickle
 
+import numpy as np
 import pandas as pd
 
-from . import fca, helpers, raam, weights
+from . import fca, helpers, profiling, raam, weights
+from .cache import CatchmentCache
+from .costs import FactorizedCosts, SortedCostIndex, compact_costs
+from .shared import SharedCosts
 
 access_log_stream = logging.StreamHandler()
 access_log_format = logging.Formatter("%(name)s %(levelname)-8s :: %(message)s")
@@ -45,16 +53,51 @@ class Access:
                            The column name of the destination locations -- this is what goes in the groups.
     neighbor_cost_name   : {str, list}
                            The column name(s) of the travel cost(s).
+    copy                 : bool
+                           If True (default), `demand_df` and `supply_df` are copied.
+                           If False, the `Access` object shares their data instead, which saves time and memory
+                           when building many of them, e.g., for each state in a loop.
+                           Setting an index or adding columns does not affect the originals,
+                           but their values must not be modified in place while the object is in use.
 
     Attributes
     ----------
 
-    Access               : pandas.DataFrame
-                           All of the calculated access measures.
+    access_df            : pandas.DataFrame
+                           All of the calculated access measures, indexed by demand location.
+    access               : pandas.DataFrame
+                           Facility-level results, indexed by supply location:
+                           the demand within the catchment of each facility (`<name>_demand`),
+                           from the demand stage of :meth:`Access.two_stage_fca` and :meth:`Access.three_stage_fca`,
+                           and the crowdedness of each supply type (`<name>_<supply>_crowdedness`),
+                           that demand per unit of supply (NaN without supply).
     access_metadata      : pandas.DataFrame
-                           Lists currently-available measures of access.
+                           Lists currently-available measures of access,
+                           with the parameters used to calculate each,
+                           the wall time of the calculation in total (`seconds`) and by stage (`stages`),
+                           the rows of the cost table remaining after `max_cost` filtering (`rows`),
+                           and the peak memory allocated (`peak_bytes`).
+                           The same records are logged at the DEBUG level to the `access` logger,
+                           in the `access` attribute of each log record.
+    trace_memory         : bool
+                           Record `peak_bytes` in `access_metadata`, using :mod:`tracemalloc`.
+                           False by default, since tracing slows allocation-heavy code.
     cost_metadata        : pandas.DataFrame
                            Describes each of the currently-available supply to demand costs.
+    cache                : :class:`access.cache.CatchmentCache`
+                           Intermediate results of the catchment measures -- weighted costs
+                           and demand stages, which do not depend on the supply --
+                           reused by later calls with the same cost, `max_cost` and weight function,
+                           for any supply type.
+                           Entries are keyed on the demand values, so they are not reused
+                           once those change, and the cache is cleared when `cost_df` is replaced
+                           (e.g., by :meth:`Access.append_user_cost`).
+                           After modifying `cost_df` in place, call `cache.clear()`.
+                           Its byte budget is `cache.max_bytes` (256 MiB by default; 0 disables it).
+    raam_assignments     : dict
+                           The last RAAM assignment of demand to supply (see :func:`access.raam.raam`),
+                           for each supply type, cost and tau, keyed by `(supply, cost, tau)`.
+                           :meth:`Access.raam` starts from it when called with `warm_start = True`.
     """  # noqa: E501
 
     logger_initialized = False
@@ -75,6 +118,7 @@ class Access:
         neighbor_cost_origin=None,
         neighbor_cost_dest=None,
         neighbor_cost_name=None,
+        copy=True,
     ):
         """
         Initialize the class.
@@ -126,6 +170,10 @@ class Access:
                                           cost_dest = "destination", cost_name = "cost")
         """  # noqa: E501
         self.log = logging.getLogger("access")
+        self.cache = CatchmentCache()
+        self.raam_assignments = {}
+        # Settings of compact_costs, keyed by whether they apply to the neighbor costs.
+        self._compaction = {}
 
         if not Access.logger_initialized:
             self.log.addHandler(access_log_stream)
@@ -202,14 +250,14 @@ class Access:
 
         ### Now load the demand DFs.
 
-        self.demand_df = demand_df.copy()
+        self.demand_df = demand_df.copy(deep=copy)
         self.demand_value = demand_value
         if demand_index is not True:
             self.demand_df.set_index(demand_index, inplace=True)
 
         ### And now the supply DFs.
 
-        self.supply_df = supply_df.copy()
+        self.supply_df = supply_df.copy(deep=copy)
 
         if not supply_value:
             self.log.info(
@@ -284,9 +332,22 @@ class Access:
         self.access = pd.DataFrame(index=self.supply_df.index)
 
         self.access_metadata = pd.DataFrame(
-            columns=["name", "distance", "function", "descriptor"]
+            columns=[
+                "name",
+                "distance",
+                "function",
+                "descriptor",
+                "parameters",
+                "seconds",
+                "stages",
+                "rows",
+                "peak_bytes",
+            ]
         )
+        self.trace_memory = False
         self.cost_metadata = pd.DataFrame(columns=["name", "type", "descriptor"])
+        for c in self.cost_names:
+            self._describe_cost(c, "user", "provided at initialization")
 
         return
 
@@ -343,27 +404,34 @@ class Access:
         supply_values = helpers.sanitize_supplies(self, supply_values)
 
         for s in supply_values:
-            # Bryan consistently flipped origin and destination in this one
-            # -- very confusing.
-            series = fca.weighted_catchment(
-                loc_df=self.supply_df,
-                loc_index=True,
-                loc_value=s,
-                cost_df=self.cost_df,
-                cost_source=self.cost_dest,
-                cost_dest=self.cost_origin,
-                cost_cost=self._default_cost,
-                weight_fn=weight_fn,
-                max_cost=max_cost,
-            )
+            with profiling.profile(self.trace_memory) as prof:
+                # Bryan consistently flipped origin and destination in this one
+                # -- very confusing.
+                series = fca.weighted_catchment(
+                    loc_df=self.supply_df,
+                    loc_index=True,
+                    loc_value=s,
+                    cost_df=self.cost_df,
+                    cost_source=self.cost_dest,
+                    cost_dest=self.cost_origin,
+                    cost_cost=self._default_cost,
+                    weight_fn=weight_fn,
+                    weights=self._cached_weights(self._default_cost, weight_fn),
+                    max_cost=max_cost,
+                )
 
-            series.name = name + "_" + s
-            if series.name in self.access_df.columns:
-                self.log.info(f"Overwriting {series.name}.")
-                self.access_df.drop(series.name, axis=1, inplace=True)
+                series.name = name + "_" + s
+                self._store_series(series)
 
-            # store the raw, un-normalized access values
-            self.access_df = self.access_df.join(series)
+            self._record_measure(
+                series.name,
+                "weighted_catchment",
+                "weighted catchment",
+                self._default_cost,
+                prof,
+                max_cost=max_cost,
+                weight_fn=weight_fn,
+            )
 
         if normalize:
             columns = [name + "_" + s for s in supply_values]
@@ -371,6 +439,141 @@ class Access:
 
         return self.access_df.filter(regex="^" + name, axis=1)
 
+    def cumulative_opportunities(
+        self,
+        name="cumulative",
+        cost=None,
+        thresholds=range(5, 61, 5),
+        supply_values=None,
+    ):
+        """
+        Calculate cumulative opportunities: the supply reachable from each origin,
+        within each of a list of thresholds.
+        All thresholds are computed together, from a running sum over the costs of each origin,
+        sorted once (see :func:`access.fca.cumulative_opportunities`).
+
+        Parameters
+        ----------
+        name                : str
+                              Column name prefix for access values.
+        cost                : str
+                              Name of cost value column in cost_df (supply-side)
+        thresholds          : list
+                              Cost thresholds; by default, every 5 up to 60.
+        supply_values       : {str, list}
+                              supply type or types.
+
+        Returns
+        -------
+
+        access              : pandas DataFrame
+                              Supply within each threshold, for origin locations,
+                              in columns named like `cumulative_doc_30`.
+                              Origins with costs but nothing in reach have 0.
+
+        Examples
+        --------
+
+        Doctors within 10, 20 and 30 minutes of each tract:
+
+        >>> chicago_primary_care.cumulative_opportunities(thresholds = [10, 20, 30], supply_values = "doc")
+        """  # noqa: E501
+
+        cost = helpers.sanitize_supply_cost(self, cost, name)
+        supply_values = helpers.sanitize_supplies(self, supply_values)
+        thresholds = list(thresholds)
+
+        with profiling.profile(self.trace_memory) as prof:
+            curves = fca.cumulative_opportunities(
+                self.supply_df,
+                self.cost_index(cost),
+                thresholds,
+                supply_names=supply_values,
+                cost_origin=self.cost_origin,
+            )
+            curves.columns = [f"{name}_{s}_{t:g}" for s, t in curves.columns]
+
+            self._store_frame(curves)
+
+        for s in supply_values:
+            self._record_measure(
+                name + "_" + s,
+                "cumulative_opportunities",
+                "cumulative opportunities",
+                cost,
+                prof,
+                thresholds=thresholds,
+            )
+
+        return self.access_df.filter(regex="^" + name, axis=1)
+
+    def nearest(
+        self,
+        name="nearest",
+        cost=None,
+        k=1,
+        supply_values=None,
+    ):
+        """
+        Calculate the cost to the nearest supply location, or the mean cost to the `k` nearest.
+        Only locations with a positive supply of each type are considered,
+        and all supply types and values of `k` are computed from the same sorted cost index
+        (see :func:`access.fca.nearest`).
+
+        Parameters
+        ----------
+        name                : str
+                              Column name prefix for access values.
+        cost                : str
+                              Name of cost value column in cost_df (supply-side)
+        k                   : {int, list}
+                              Number of nearest locations to average over, or a list of them.
+        supply_values       : {str, list}
+                              supply type or types.
+
+        Returns
+        -------
+
+        access              : pandas DataFrame
+                              Cost to the nearest location(s), for origin locations.
+                              Columns are named like `nearest_doc` when `k` is a single value,
+                              and like `nearest_doc_3` when it is a list.
+                              Origins reaching fewer than `k` locations are NaN.
+
+        Examples
+        --------
+
+        Travel time to the nearest doctor and dentist, and mean time to the three nearest:
+
+        >>> chicago_primary_care.nearest()
+        >>> chicago_primary_care.nearest(name = "nearest3", k = 3)
+        """  # noqa: E501
+
+        cost = helpers.sanitize_supply_cost(self, cost, name)
+        supply_values = helpers.sanitize_supplies(self, supply_values)
+
+        with profiling.profile(self.trace_memory) as prof:
+            nearest = fca.nearest(
+                self.supply_df,
+                self.cost_index(cost),
+                k,
+                supply_names=supply_values,
+                cost_origin=self.cost_origin,
+            )
+            if np.isscalar(k):
+                nearest.columns = [name + "_" + s for s, _ in nearest.columns]
+            else:
+                nearest.columns = [f"{name}_{s}_{n}" for s, n in nearest.columns]
+
+            self._store_frame(nearest)
+
+        for s in supply_values:
+            self._record_measure(
+                name + "_" + s, "nearest", "nearest supply", cost, prof, k=k
+            )
+
+        return self.access_df.filter(regex="^" + name, axis=1)
+
     def fca_ratio(
         self,
         name="fca",
@@ -474,34 +677,44 @@ class Access:
         demand_cost = helpers.sanitize_demand_cost(self, demand_cost, name)
         supply_values = helpers.sanitize_supplies(self, supply_values)
 
+        # The demand around each demand location is on the neighbor costs.
+        cache = self._catchment_cache(("neighbors", demand_cost), max_cost, None)
+
         for s in supply_values:
-            series = fca.fca_ratio(
-                demand_df=self.demand_df,
-                demand_index=self.demand_df.index.name,
-                demand_name=self.demand_value,
-                supply_df=self.supply_df,
-                supply_index=self.supply_df.index.name,
-                supply_name=s,
-                demand_cost_df=self.neighbor_cost_df,
-                supply_cost_df=self.cost_df,
-                demand_cost_origin=self.neighbor_cost_origin,
-                demand_cost_dest=self.neighbor_cost_dest,
-                demand_cost_name=demand_cost,
-                supply_cost_origin=self.cost_origin,
-                supply_cost_dest=self.cost_dest,
-                supply_cost_name=supply_cost,
-                max_cost=max_cost,
-                normalize=normalize,
-                noise=noise,
-            )
+            with profiling.profile(self.trace_memory) as prof:
+                series = fca.fca_ratio(
+                    demand_df=self.demand_df,
+                    demand_index=self.demand_df.index.name,
+                    demand_name=self.demand_value,
+                    supply_df=self.supply_df,
+                    supply_index=self.supply_df.index.name,
+                    supply_name=s,
+                    demand_cost_df=self.neighbor_cost_df,
+                    supply_cost_df=self.cost_df,
+                    demand_cost_origin=self.neighbor_cost_origin,
+                    demand_cost_dest=self.neighbor_cost_dest,
+                    demand_cost_name=demand_cost,
+                    supply_cost_origin=self.cost_origin,
+                    supply_cost_dest=self.cost_dest,
+                    supply_cost_name=supply_cost,
+                    max_cost=max_cost,
+                    normalize=normalize,
+                    noise=noise,
+                    cache=cache,
+                )
 
-            series.name = name + "_" + s
-            if series.name in self.access_df.columns:
-                self.log.info(f"Overwriting {series.name}.")
-                self.access_df.drop(series.name, axis=1, inplace=True)
+                series.name = name + "_" + s
+                self._store_series(series)
 
-            # store the raw, un-normalized access values
-            self.access_df = self.access_df.join(series)
+            self._record_measure(
+                series.name,
+                "fca_ratio",
+                "floating catchment area ratio",
+                supply_cost,
+                prof,
+                max_cost=max_cost,
+                demand_cost=demand_cost,
+            )
 
         if normalize:
             columns = [name + "_" + s for s in supply_values]
@@ -522,6 +735,13 @@ class Access:
         half_life=50,
         min_step=0.005,
         verbose=False,
+        method="iterate",
+        tol=1e-3,
+        warm_start=False,
+        clusters=None,
+        refine_cycles=10,
+        checkpoint=None,
+        checkpoint_every=25,
     ):
         """Calculate the rational agent access model. :cite:`2019_saxon_snow_raam`
 
@@ -550,6 +770,30 @@ class Access:
                               This is the minimum value, to which the moving fraction converges.
         verbose             : bool
                               Print some information as the optimization proceeds.
+        method              : str
+                              "iterate" (default) for the original step schedule, or "frank-wolfe" or "projected-gradient"
+                              to solve the continuous relaxation to a duality gap of `tol` (see :func:`access.raam.solve_raam`).
+        tol                 : float
+                              Relative duality gap at which the "frank-wolfe" and "projected-gradient" methods stop.
+        warm_start          : bool
+                              Start from the last assignment with the same supply type, cost and tau (see `raam_assignments`),
+                              rather than from each origin's nearest facility. After a small change to the supply or demand,
+                              this is already close to equilibrium, so that a few cycles (`max_cycles`) suffice.
+        clusters            : pandas.Series
+                              Cluster of each demand location, e.g. from :func:`access.raam.cluster_origins`.
+                              If given, RAAM is first solved between clusters and supply locations, for `max_cycles`,
+                              then refined from there between demand and supply locations, for `refine_cycles`.
+                              Not used with `warm_start`, if there is an assignment to start from.
+        refine_cycles       : int
+                              Cycles of refinement after solving between clusters.
+        checkpoint          : str
+                              Directory for checkpoints of long runs, one file per supply type, `<name>_<supply>.npz`
+                              (see :class:`access.raam.Checkpoint`). If a run is interrupted, calling `raam` again with the same
+                              arguments resumes from the last checkpoint and gives the same results.
+                              Each file is deleted once its run completes; one left by a run with other inputs
+                              or settings raises ValueError, and must be deleted to start over.
+        checkpoint_every    : int
+                              Cycles between checkpoints.
 
         Returns
         -------
@@ -652,6 +896,25 @@ class Access:
 
         >>> chicago_primary_care.raam(name = "raam_euclidean", tau = 100, cost = "euclidean")
 
+        Rather than the step schedule, a gradient method can solve for the equilibrium, usually in far fewer cycles:
+
+        >>> chicago_primary_care.raam(name = "raam_pg", tau = 30, method = "projected-gradient", tol = 1e-4)
+
+        For very large problems, solve between counties (the first 5 digits of the tract GEOIDs) before refining:
+
+        >>> from access.raam import cluster_origins
+        >>> counties = cluster_origins(chicago_primary_care.demand_df, prefix = 5)
+        >>> chicago_primary_care.raam(name = "raam_ml", tau = 30, clusters = counties, refine_cycles = 20)
+
+        A long run can save its progress every 10 cycles, and pick up from there if it is interrupted:
+
+        >>> chicago_primary_care.raam(name = "raam_long", tau = 30, max_cycles = 1000, checkpoint = "checkpoints", checkpoint_every = 10)
+
+        After editing the supply, a rerun can start from the previous equilibrium:
+
+        >>> chicago_primary_care.supply_df.loc[17031010100, "doc"] += 5
+        >>> chicago_primary_care.raam(name = "raam_pg", tau = 30, method = "projected-gradient", tol = 1e-4, warm_start = True)
+
         """  # noqa: E501
 
         assert self.supply_value_provided, (
@@ -661,32 +924,154 @@ class Access:
         cost = helpers.sanitize_supply_cost(self, cost, name)
         supply_values = helpers.sanitize_supplies(self, supply_values)
 
+        if checkpoint is not None:
+            os.makedirs(checkpoint, exist_ok=True)
+
         for s in supply_values:
-            raam_costs = raam.raam(
-                demand_df=self.demand_df,
-                supply_df=self.supply_df,
-                cost_df=self.cost_df,
-                demand_name=self.demand_value,
-                supply_name=s,
-                cost_origin=self.cost_origin,
-                cost_dest=self.cost_dest,
-                cost_name=cost,
-                max_cycles=max_cycles,
+            key = (s, cost, tau)
+            path = checkpoint and os.path.join(checkpoint, f"{name}_{s}.npz")
+            start = self.raam_assignments.get(key) if warm_start else None
+            with profiling.profile(self.trace_memory) as prof:
+                raam_costs, assignment = raam.raam(
+                    demand_df=self.demand_df,
+                    supply_df=self.supply_df,
+                    cost_df=self.cost_df,
+                    demand_name=self.demand_value,
+                    supply_name=s,
+                    cost_origin=self.cost_origin,
+                    cost_dest=self.cost_dest,
+                    cost_name=cost,
+                    max_cycles=max_cycles,
+                    tau=tau,
+                    rho=rho,
+                    verbose=verbose,
+                    initial_step=initial_step,
+                    min_step=min_step,
+                    half_life=half_life,
+                    method=method,
+                    tol=tol,
+                    assignment=start,
+                    return_assignment=True,
+                    clusters=clusters,
+                    refine_cycles=refine_cycles,
+                    checkpoint=path,
+                    checkpoint_every=checkpoint_every,
+                )
+
+                self.raam_assignments[key] = assignment
+                raam_costs.name = name + "_" + s
+                self._store_series(raam_costs)
+
+            self._record_measure(
+                raam_costs.name,
+                "raam",
+                "rational agent access model",
+                cost,
+                prof,
                 tau=tau,
                 rho=rho,
-                verbose=verbose,
+                max_cycles=max_cycles,
                 initial_step=initial_step,
-                min_step=min_step,
                 half_life=half_life,
+                min_step=min_step,
+                method=method,
+                tol=tol,
+                warm_start=start is not None,
+                clusters=None if clusters is None else pd.Series(clusters).nunique(),
+                refine_cycles=refine_cycles,
             )
 
-            raam_costs.name = name + "_" + s
-            if raam_costs.name in self.access_df.columns:
-                self.log.info(f"Overwriting {raam_costs.name}.")
-                self.access_df.drop(raam_costs.name, axis=1, inplace=True)
+        if normalize:
+            columns = [name + "_" + s for s in supply_values]
+            return helpers.normalized_access(self, columns)
 
-            # store the raw, un-normalized access values
-            self.access_df = self.access_df.join(raam_costs)
+        return self.access_df.filter(regex="^" + name, axis=1)
+
+    def huff(
+        self,
+        name="huff",
+        cost=None,
+        max_cost=None,
+        supply_values=None,
+        attractiveness=None,
+        weight_fn=None,
+        normalize=False,
+    ):
+        """Calculate the Huff-model access score. :cite:`1963_huff_trade_areas` :cite:`2014_luo_huff_2SFCA`
+        Each origin's demand is split across the facilities in its catchment, in proportion
+        to their attractiveness times the distance decay `weight_fn`. The crowdedness of each facility
+        then follows from its expected load, in a single pass: a closed-form alternative to :meth:`Access.raam`.
+
+        Parameters
+        ----------
+        name                : str
+                              Column name for access values
+        cost                : str
+                              Name of cost value column in cost_df (supply-side)
+        max_cost            : float
+                              Cutoff of cost values
+        supply_values       : {str, list}
+                              supply type or types.
+        attractiveness      : str
+                              Column of supply_df with the attractiveness of each facility.
+                              If None, each supply type is its own attractiveness.
+        weight_fn           : function
+                              Distance decay of the choice probabilities, e.g. :func:`access.weights.gravity`.
+        normalize           : bool
+                              If True, return normalized access values; otherwise, return raw access values
+
+        Returns
+        -------
+
+        access              : pandas Series
+                              Accessibility score for origin locations.
+
+        Examples
+        --------
+
+        Choice probabilities inversely proportional to travel time, among practices within an hour:
+
+        >>> chicago_primary_care.huff(max_cost = 60, weight_fn = weights.gravity(scale = 20, alpha = -1),
+                                      supply_values = "doc")
+        """  # noqa: E501
+
+        assert self.supply_value_provided, (
+            "You must provide a supply value in order to use this functionality."
+        )
+
+        cost = helpers.sanitize_supply_cost(self, cost, name)
+        supply_values = helpers.sanitize_supplies(self, supply_values)
+
+        if attractiveness is not None and attractiveness not in self.supply_df.columns:
+            raise ValueError(f"{attractiveness} is not a column of supply_df.")
+
+        for s in supply_values:
+            with profiling.profile(self.trace_memory) as prof:
+                series = fca.huff(
+                    demand_df=self.demand_df,
+                    supply_df=self.supply_df,
+                    cost_df=self.cost_index(cost),
+                    max_cost=max_cost,
+                    demand_name=self.demand_value,
+                    supply_name=s,
+                    attractiveness=attractiveness,
+                    cost_origin=self.cost_origin,
+                    weight_fn=weight_fn,
+                )
+
+                series.name = name + "_" + s
+                self._store_series(series)
+
+            self._record_measure(
+                series.name,
+                "huff",
+                "Huff model",
+                cost,
+                prof,
+                max_cost=max_cost,
+                attractiveness=attractiveness,
+                weight_fn=weight_fn,
+            )
 
         if normalize:
             columns = [name + "_" + s for s in supply_values]
@@ -717,8 +1102,11 @@ class Access:
                               supply type or types.
         max_cost            : float
                               Cutoff of cost values
-        weight_fn           : function
-                              Weight to be applied to access values
+        weight_fn           : {function, list, dict}
+                              Weight to be applied to access values.
+                              With a list of functions, all are evaluated together, in a single pass
+                              (see :func:`access.fca.two_stage_fca`), into columns named like `2sfca_doc_0`
+                              for the first function; with a dict, the keys label the columns instead.
         normalize           : bool
                               If True, return normalized access values; otherwise, return raw access values
 
@@ -810,6 +1198,12 @@ class Access:
         17031010202  2818   0.000717       0.000424     0.000973         0.000541
         17197884103  2776   0.000384       0.000291     0.000371         0.000377
         17197980100  3264   0.000457       0.000325     0.000348         0.000314
+
+        To compare distance decays, pass several weight functions at once:
+
+        >>> chicago_primary_care.two_stage_fca(name = '2sfca_decay', max_cost = 60, supply_values = 'doc',
+                                               weight_fn = {'step': weights.step_fn({20: 1, 40: 0.68, 60: 0.22}),
+                                                            'gaussian': weights.gaussian(20)})
         """  # noqa: E501
 
         assert self.supply_value_provided, (
@@ -829,32 +1223,81 @@ class Access:
         if supply_values is None:
             supply_values = self.supply_types
 
-        for s in supply_values:
-            series = fca.two_stage_fca(
-                demand_df=self.demand_df,
-                demand_index=self.demand_df.index.name,
-                demand_name=self.demand_value,
-                supply_df=self.supply_df,
-                supply_index=self.supply_df.index.name,
-                supply_name=s,
-                cost_df=self.cost_df,
-                cost_origin=self.cost_origin,
-                cost_dest=self.cost_dest,
-                cost_name=cost,
-                max_cost=max_cost,
-                weight_fn=weight_fn,
-                normalize=normalize,
-            )
+        # Several weight functions are evaluated together, one column each.
+        if isinstance(weight_fn, dict):
+            labels, weight_fn = list(weight_fn), list(weight_fn.values())
+        elif isinstance(weight_fn, (list, tuple)):
+            labels, weight_fn = list(range(len(weight_fn))), list(weight_fn)
+        else:
+            labels = None
 
-            series.name = name + "_" + s
-            if series.name in self.access_df.columns:
-                self.log.info(f"Overwriting {series.name}.")
-                self.access_df.drop(series.name, axis=1, inplace=True)
+        cache = self._catchment_cache(cost, max_cost, weight_fn)
 
-            self.access_df = self.access_df.join(series)
+        for s in supply_values:
+            with profiling.profile(self.trace_memory) as prof:
+                series = fca.two_stage_fca(
+                    demand_df=self.demand_df,
+                    demand_index=self.demand_df.index.name,
+                    demand_name=self.demand_value,
+                    supply_df=self.supply_df,
+                    supply_index=self.supply_df.index.name,
+                    supply_name=s,
+                    cost_df=self.cost_df,
+                    cost_origin=self.cost_origin,
+                    cost_dest=self.cost_dest,
+                    cost_name=cost,
+                    max_cost=max_cost,
+                    weight_fn=weight_fn,
+                    normalize=normalize,
+                    weights=self._cached_weights(cost, weight_fn),
+                    cache=cache,
+                )
+
+                if labels is None:
+                    series.name = name + "_" + s
+                    self._store_series(series)
+                else:
+                    series.columns = [f"{name}_{s}_{label}" for label in labels]
+                    self._store_frame(series)
+
+            if labels is None:
+                self._record_measure(
+                    series.name,
+                    "two_stage_fca",
+                    "two-stage floating catchment area",
+                    cost,
+                    prof,
+                    max_cost=max_cost,
+                    weight_fn=weight_fn,
+                )
+            else:
+                for column, fn in zip(series.columns, weight_fn, strict=True):
+                    self._record_measure(
+                        column,
+                        "two_stage_fca",
+                        "two-stage floating catchment area",
+                        cost,
+                        prof,
+                        max_cost=max_cost,
+                        weight_fn=fn,
+                    )
+
+        demand = cache.get("demand").facility_demand()
+        if labels is None:
+            self._store_facility_demand(name, demand, supply_values)
+        else:
+            for k, label in enumerate(labels):
+                self._store_facility_demand(
+                    name, demand[k], supply_values, suffix=f"_{label}"
+                )
 
         if normalize:
-            columns = [name + "_" + s for s in supply_values]
+            if labels is None:
+                columns = [name + "_" + s for s in supply_values]
+            else:
+                columns = [
+                    f"{name}_{s}_{label}" for s in supply_values for label in labels
+                ]
             return helpers.normalized_access(self, columns)
 
         return self.access_df.filter(regex="^" + name, axis=1)
@@ -995,6 +1438,102 @@ class Access:
             name, cost, max_cost, supply_values, weight_fn, normalize
         )
 
+    def variable_two_stage_fca(
+        self,
+        name="vc2sfca",
+        cost=None,
+        demand_threshold=None,
+        supply_threshold=None,
+        max_cost=None,
+        supply_values=None,
+        weight_fn=None,
+        normalize=False,
+    ):
+        """Calculate the variable-catchment two-stage floating catchment area access score. :cite:`2012_luo_whippo_VC2SFCA`
+        Each facility's catchment expands until it covers `demand_threshold` people,
+        and each origin's catchment expands until it covers `supply_threshold` units of supply,
+        in both cases up to `max_cost` if it is given.
+
+        Parameters
+        ----------
+        name                : str
+                              Column name for access values
+        cost                : str
+                              Name of cost value column in cost_df (supply-side)
+        demand_threshold    : float
+                              Demand to cover within each facility's catchment.
+                              If None, facility catchments are fixed at `max_cost`.
+        supply_threshold    : float
+                              Supply to cover within each origin's catchment.
+                              If None, origin catchments are fixed at `max_cost`.
+        max_cost            : float
+                              Cap on every catchment.
+        supply_values       : {str, list}
+                              supply type or types.
+        weight_fn           : function
+                              Weight to be applied to access values
+        normalize           : bool
+                              If True, return normalized access values; otherwise, return raw access values
+
+        Returns
+        -------
+
+        access              : pandas Series
+                              Accessibility score for origin locations.
+
+        Examples
+        --------
+
+        Catchments covering 100,000 residents around each practice, and 100 doctors around each tract,
+        never beyond 90 minutes:
+
+        >>> chicago_primary_care.variable_two_stage_fca(demand_threshold = 100000, supply_threshold = 100,
+                                                        max_cost = 90, supply_values = "doc")
+        """  # noqa: E501
+
+        assert self.supply_value_provided, (
+            "You must provide a supply value in order to use this functionality."
+        )
+
+        cost = helpers.sanitize_supply_cost(self, cost, name)
+        supply_values = helpers.sanitize_supplies(self, supply_values)
+
+        for s in supply_values:
+            with profiling.profile(self.trace_memory) as prof:
+                series = fca.variable_two_stage_fca(
+                    demand_df=self.demand_df,
+                    supply_df=self.supply_df,
+                    cost_df=self.cost_index(cost),
+                    demand_threshold=demand_threshold,
+                    supply_threshold=supply_threshold,
+                    max_cost=max_cost,
+                    demand_name=self.demand_value,
+                    supply_name=s,
+                    cost_origin=self.cost_origin,
+                    weight_fn=weight_fn,
+                )
+
+                series.name = name + "_" + s
+                self._store_series(series)
+
+            self._record_measure(
+                series.name,
+                "variable_two_stage_fca",
+                "variable-catchment two-stage floating catchment area",
+                cost,
+                prof,
+                demand_threshold=demand_threshold,
+                supply_threshold=supply_threshold,
+                max_cost=max_cost,
+                weight_fn=weight_fn,
+            )
+
+        if normalize:
+            columns = [name + "_" + s for s in supply_values]
+            return helpers.normalized_access(self, columns)
+
+        return self.access_df.filter(regex="^" + name, axis=1)
+
     def three_stage_fca(
         self,
         name="3sfca",
@@ -1104,30 +1643,46 @@ class Access:
         cost = helpers.sanitize_supply_cost(self, cost, name)
         supply_values = helpers.sanitize_supplies(self, supply_values)
 
+        cache = self._catchment_cache(cost, max_cost, weight_fn)
+        # Only needed if the demand stage is missing; built once for all supply types.
+        preference = functools.cache(lambda: self._cached_preference(cost, weight_fn))
+
         for s in supply_values:
-            series = fca.three_stage_fca(
-                demand_df=self.demand_df,
-                demand_index=self.demand_df.index.name,
-                demand_name=self.demand_value,
-                supply_df=self.supply_df,
-                supply_index=self.supply_df.index.name,
-                supply_name=s,
-                cost_df=self.cost_df,
-                cost_origin=self.cost_origin,
-                cost_dest=self.cost_dest,
-                cost_name=cost,
+            with profiling.profile(self.trace_memory) as prof:
+                series = fca.three_stage_fca(
+                    demand_df=self.demand_df,
+                    demand_index=self.demand_df.index.name,
+                    demand_name=self.demand_value,
+                    supply_df=self.supply_df,
+                    supply_index=self.supply_df.index.name,
+                    supply_name=s,
+                    cost_df=self.cost_df,
+                    cost_origin=self.cost_origin,
+                    cost_dest=self.cost_dest,
+                    cost_name=cost,
+                    max_cost=max_cost,
+                    weight_fn=weight_fn,
+                    normalize=normalize,
+                    preference=preference,
+                    cache=cache,
+                )
+
+                series.name = name + "_" + s
+                self._store_series(series)
+
+            self._record_measure(
+                series.name,
+                "three_stage_fca",
+                "three-stage floating catchment area",
+                cost,
+                prof,
                 max_cost=max_cost,
                 weight_fn=weight_fn,
-                normalize=normalize,
             )
 
-            series.name = name + "_" + s
-            if series.name in self.access_df.columns:
-                self.log.info(f"Overwriting {series.name}.")
-                self.access_df.drop(series.name, axis=1, inplace=True)
-
-            # store the raw, un-normalized access values
-            self.access_df = self.access_df.join(series)
+        self._store_facility_demand(
+            name, cache.get("three_stage_demand").facility_demand(), supply_values
+        )
 
         if normalize:
             columns = [name + "_" + s for s in supply_values]
@@ -1135,6 +1690,356 @@ class Access:
 
         return self.access_df.filter(regex="^" + name, axis=1)
 
+    def two_stage_fca_uncertainty(
+        self,
+        name="2sfca_mc",
+        cost=None,
+        max_cost=None,
+        supply_values=None,
+        weight_fn=None,
+        draws=1000,
+        demand_moe=None,
+        supply_moe=None,
+        confidence=0.9,
+        quantiles=(0.05, 0.5, 0.95),
+        seed=None,
+    ):
+        """Monte Carlo uncertainty bands for the two-stage floating catchment area access score.
+        Demand and supply are drawn from normal distributions implied by their margins of error,
+        and all draws are evaluated together as sparse matrix products over the fixed catchment weights
+        (see :func:`access.fca.two_stage_fca_draws`).
+
+        Parameters
+        ----------
+        name                : str
+                              Column name prefix for the quantiles.
+        cost                : str
+                              Name of cost value column in cost_df (supply-side)
+        max_cost            : float
+                              Cutoff of cost values
+        supply_values       : {str, list}
+                              supply type or types.
+        weight_fn           : function
+                              Weight to be applied to access values
+        draws               : int
+                              Number of Monte Carlo draws.
+        demand_moe          : {str, float}
+                              Column of demand_df holding the margin of error of the demand (e.g., from the ACS),
+                              or a margin of error relative to the demand (e.g., 0.1 for +/-10%).
+                              If None, demand is not perturbed.
+        supply_moe          : {str, float, dict}
+                              As demand_moe, for the supply; a dict maps each supply type to its own margin.
+        confidence          : float
+                              Confidence level at which margins of error are expressed (ACS uses 90%).
+        quantiles           : list
+                              Quantiles to report, for each origin.
+        seed                : {int, numpy.random.Generator}
+                              Seed for reproducible draws.
+
+        Returns
+        -------
+
+        access              : pandas DataFrame
+                              Quantiles of the access score for origin locations,
+                              in columns named like `2sfca_mc_doc_q5`.
+
+        Examples
+        --------
+
+        With a margin of error column for the population and a +/-10% margin on the supply,
+        compute the 5th, 50th and 95th percentiles of 2SFCA access within 30 minutes:
+
+        >>> chicago_primary_care.two_stage_fca_uncertainty(demand_moe = "pop_moe", supply_moe = 0.1,
+                                                           max_cost = 30, seed = 0)
+        """  # noqa: E501
+
+        assert self.supply_value_provided, (
+            "You must provide a supply value in order to use this functionality."
+        )
+
+        cost = helpers.sanitize_supply_cost(self, cost, name)
+        supply_values = helpers.sanitize_supplies(self, supply_values)
+        rng = np.random.default_rng(seed)
+
+        demand_draws = helpers.draw_values(
+            self.demand_df, self.demand_value, demand_moe, draws, rng, confidence
+        )
+
+        for s in supply_values:
+            moe = supply_moe.get(s) if type(supply_moe) is dict else supply_moe
+            supply_draws = helpers.draw_values(
+                self.supply_df, s, moe, draws, rng, confidence
+            )
+
+            with profiling.profile(self.trace_memory) as prof:
+                access_draws = fca.two_stage_fca_draws(
+                    demand_draws,
+                    supply_draws,
+                    self.cost_index(cost),
+                    max_cost=max_cost,
+                    cost_origin=self.cost_origin,
+                    cost_dest=self.cost_dest,
+                    cost_name=cost,
+                    weight_fn=weight_fn,
+                )
+
+                self._join_quantiles(access_draws, quantiles, name + "_" + s)
+
+            self._record_measure(
+                name + "_" + s,
+                "two_stage_fca_uncertainty",
+                "two-stage floating catchment area, Monte Carlo quantiles",
+                cost,
+                prof,
+                max_cost=max_cost,
+                weight_fn=weight_fn,
+                draws=draws,
+                demand_moe=demand_moe,
+                supply_moe=moe,
+                confidence=confidence,
+                quantiles=quantiles,
+                seed=seed,
+            )
+
+        return self.access_df.filter(regex="^" + name, axis=1)
+
+    def raam_uncertainty(
+        self,
+        name="raam_mc",
+        cost=None,
+        supply_values=None,
+        tau=60,
+        rho=None,
+        max_cycles=150,
+        initial_step=0.2,
+        half_life=50,
+        min_step=0.005,
+        draws=100,
+        demand_moe=None,
+        supply_moe=None,
+        confidence=0.9,
+        quantiles=(0.05, 0.5, 0.95),
+        seed=None,
+    ):
+        """Monte Carlo uncertainty bands for the rational agent access model.
+        RAAM is an iterative equilibrium rather than a linear map, so draws cannot be
+        evaluated as a single matrix product; instead the travel matrix is built once
+        and every draw is solved directly on arrays (see :func:`access.raam.raam_draws`).
+
+        Parameters
+        ----------
+        name                : str
+                              Column name prefix for the quantiles.
+        cost                : str
+                              Name of cost variable, for reaching supply sites.
+        supply_values       : {str, list}
+                              Name(s) of supply values in supply_df
+        tau, rho, max_cycles, initial_step, half_life, min_step :
+                              As in :meth:`Access.raam`. If `rho` is None, it is recomputed for each draw.
+        draws, demand_moe, supply_moe, confidence, quantiles, seed :
+                              As in :meth:`Access.two_stage_fca_uncertainty`.
+
+        Returns
+        -------
+
+        access              : pandas DataFrame
+                              Quantiles of the RAAM cost for origin locations,
+                              in columns named like `raam_mc_doc_q5`.
+        """  # noqa: E501
+
+        assert self.supply_value_provided, (
+            "You must provide a supply value in order to use this functionality."
+        )
+
+        cost = helpers.sanitize_supply_cost(self, cost, name)
+        supply_values = helpers.sanitize_supplies(self, supply_values)
+        rng = np.random.default_rng(seed)
+
+        demand_draws = helpers.draw_values(
+            self.demand_df, self.demand_value, demand_moe, draws, rng, confidence
+        )
+
+        for s in supply_values:
+            moe = supply_moe.get(s) if type(supply_moe) is dict else supply_moe
+            supply_draws = helpers.draw_values(
+                self.supply_df, s, moe, draws, rng, confidence
+            )
+
+            with profiling.profile(self.trace_memory) as prof:
+                access_draws = raam.raam_draws(
+                    demand_draws,
+                    supply_draws,
+                    self.cost_df,
+                    cost_origin=self.cost_origin,
+                    cost_dest=self.cost_dest,
+                    cost_name=cost,
+                    tau=tau,
+                    rho=rho,
+                    max_cycles=max_cycles,
+                    initial_step=initial_step,
+                    min_step=min_step,
+                    half_life=half_life,
+                )
+
+                self._join_quantiles(access_draws, quantiles, name + "_" + s)
+
+            self._record_measure(
+                name + "_" + s,
+                "raam_uncertainty",
+                "rational agent access model, Monte Carlo quantiles",
+                cost,
+                prof,
+                tau=tau,
+                rho=rho,
+                max_cycles=max_cycles,
+                draws=draws,
+                demand_moe=demand_moe,
+                supply_moe=moe,
+                confidence=confidence,
+                quantiles=quantiles,
+                seed=seed,
+            )
+
+        return self.access_df.filter(regex="^" + name, axis=1)
+
+    def _join_quantiles(self, access_draws, quantiles, prefix):
+        self._store_frame(helpers.quantile_columns(access_draws, quantiles, prefix))
+
+    def _store_frame(self, frame):
+        with profiling.stage("join"):
+            overwritten = frame.columns.intersection(self.access_df.columns)
+            if len(overwritten):
+                self.log.info(f"Overwriting {', '.join(overwritten)}.")
+                self.access_df.drop(overwritten, axis=1, inplace=True)
+
+            self.access_df = self.access_df.join(frame)
+
+    def _cached_weights(self, cost, weight_fn):
+        """Values of `weight_fn` for each row of `cost_df`, computed once per cost."""
+
+        if weight_fn is None:
+            return None
+
+        return self._cached(
+            (cost, helpers.weight_fingerprint(weight_fn), "weights"),
+            "weights",
+            lambda: weights.evaluate_unique(weight_fn, self.cost_df[cost].to_numpy()),
+        )
+
+    def _cached_preference(self, cost, weight_fn):
+        """Three-stage preference weights of `cost` (see :func:`access.fca.preference_weights`), computed once per weight function."""  # noqa: E501
+
+        return self._cached(
+            (cost, helpers.weight_fingerprint(weight_fn), "preference"),
+            "preference",
+            lambda: fca.preference_weights(
+                self.cost_df, self.cost_origin, self.cost_dest, cost, weight_fn
+            ),
+        )
+
+    def _cached(self, key, name, compute):
+        """
+        The cache entry for `key`, computed by `compute` in the profiling stage `name` if missing.
+        None if the cache is disabled or the key cannot be hashed.
+        """  # noqa: E501
+
+        if self.cache.max_bytes == 0:
+            return None
+
+        try:
+            hash(key)
+        except TypeError:
+            return None
+
+        values = self.cache.get(key)
+        if values is None:
+            with profiling.stage(name):
+                values = compute()
+            self.cache.put(key, values)
+
+        return values
+
+    def _catchment_cache(self, cost, max_cost, weight_fn):
+        """
+        Cache view for the demand stage of a catchment measure.
+        The key includes a fingerprint of the demand values,
+        so that changed inputs never hit stale entries;
+        the demand stage does not depend on the supply, so every supply type shares it.
+        If the weight function cannot be fingerprinted, a plain dict,
+        shared by the supply types of a single call, is returned instead.
+        """
+
+        try:
+            key = (
+                cost,
+                max_cost,
+                helpers.weight_fingerprint(weight_fn),
+                helpers.value_fingerprint(self.demand_df, [self.demand_value]),
+            )
+            hash(key)
+        except TypeError:
+            return {}
+
+        return self.cache.view(*key)
+
+    def _store_facility_demand(self, name, demand, supply_values, suffix=""):
+        """
+        Store the demand within the catchment of each facility in `access`,
+        with the crowdedness of each supply type -- demand per unit of supply.
+        """
+
+        with profiling.stage("join"):
+            demand = demand.rename(f"{name}_demand{suffix}")
+            frame = demand.to_frame().reindex(self.access.index)
+            for s in supply_values:
+                supply = self.supply_df[s].where(self.supply_df[s] != 0)
+                frame[f"{name}_{s}_crowdedness{suffix}"] = frame[demand.name] / supply
+
+            overwritten = frame.columns.intersection(self.access.columns)
+            self.access = self.access.drop(columns=overwritten).join(frame)
+
+    def _store_series(self, series):
+        with profiling.stage("join"):
+            if series.name in self.access_df.columns:
+                self.log.info(f"Overwriting {series.name}.")
+                self.access_df.drop(series.name, axis=1, inplace=True)
+
+            # store the raw, un-normalized access values
+            self.access_df = self.access_df.join(series)
+
+    def _describe_cost(self, name, cost_type, descriptor):
+        self.cost_metadata = pd.concat(
+            [
+                self.cost_metadata[self.cost_metadata["name"] != name],
+                pd.DataFrame(
+                    [[name, cost_type, descriptor]], columns=self.cost_metadata.columns
+                ),
+            ],
+            ignore_index=True,
+        )
+
+    def _record_measure(self, column, function, descriptor, cost, prof, **parameters):
+        record = {
+            "name": column,
+            "distance": cost,
+            "function": function,
+            "descriptor": descriptor,
+            "parameters": parameters,
+            **prof.as_dict(),
+        }
+
+        self.access_metadata = pd.concat(
+            [
+                self.access_metadata[self.access_metadata["name"] != column],
+                pd.DataFrame([record], columns=self.access_metadata.columns),
+            ],
+            ignore_index=True,
+        )
+
+        self.log.debug(
+            f"{column}: {function} in {prof.seconds:.3f}s", extra={"access": record}
+        )
+
     @property
     def norm_access_df(self):
         for column in self.access_df.columns.difference([self.demand_value]):
@@ -1252,6 +2157,28 @@ class Access:
 
         return weighted_score
 
+    @property
+    def cost_df(self):
+        return self._cost_df
+
+    @cost_df.setter
+    def cost_df(self, new_cost_df):
+        """Replace the cost table, discarding cached results computed from it."""
+
+        self._cost_df = new_cost_df
+        self.cache.clear()
+
+    @property
+    def neighbor_cost_df(self):
+        return self._neighbor_cost_df
+
+    @neighbor_cost_df.setter
+    def neighbor_cost_df(self, new_cost_df):
+        """Replace the neighbor cost table, discarding cached results."""
+
+        self._neighbor_cost_df = new_cost_df
+        self.cache.clear()
+
     @property
     def default_cost(self):
         return self._default_cost
@@ -1280,6 +2207,370 @@ class Access:
         else:
             raise ValueError("Tried to set cost not available in cost df")
 
+    def cost_index(self, cost=None, by="origin"):
+        """Costs sorted within each origin (or destination), for fast threshold queries.
+        The index is built once per cost and kept in the :attr:`cache`.
+
+        Parameters
+        ----------
+        cost                : str
+                              Name of cost value column in cost_df; by default, the default cost.
+        by                  : str
+                              Group the costs by "origin" (default) or by "dest".
+
+        Returns
+        -------
+
+        index               : :class:`access.costs.SortedCostIndex`
+
+        Examples
+        --------
+
+        Count the destinations within 30 minutes of each origin, without scanning the cost table:
+
+        >>> index = chicago_primary_care.cost_index()
+        >>> pd.Series(index.counts(max_cost = 30), index = index.row_ids)
+        """  # noqa: E501
+
+        cost = helpers.sanitize_supply_cost(self, cost, "cost_index")
+
+        key = (cost, by, "index")
+        index = self.cache.get(key)
+        if index is None:
+            with profiling.stage("index"):
+                index = SortedCostIndex.from_costs(
+                    self.factorized_costs(),
+                    cost,
+                    by=by,
+                    cost_origin=self.cost_origin,
+                    cost_dest=self.cost_dest,
+                )
+            self.cache.put(key, index)
+
+        return index
+
+    def factorized_costs(self, neighbors=False):
+        """The cost table with integer-coded locations, for every cost.
+        The location IDs are factorized once, and kept in the :attr:`cache`
+        for the cost indexes (see :meth:`Access.cost_index`) and :meth:`Access.share_costs`.
+
+        Parameters
+        ----------
+        neighbors           : bool
+                              If True, factorize `neighbor_cost_df` instead of `cost_df`.
+
+        Returns
+        -------
+
+        costs               : :class:`access.costs.FactorizedCosts`
+        """  # noqa: E501
+
+        if neighbors:
+            cost_df, origin, dest = (
+                self.neighbor_cost_df,
+                self.neighbor_cost_origin,
+                self.neighbor_cost_dest,
+            )
+            cost_names = self.neighbor_cost_names
+        else:
+            cost_df, origin, dest = self.cost_df, self.cost_origin, self.cost_dest
+            cost_names = self.cost_names
+
+        key = ("neighbors" if neighbors else "costs", "factorized")
+        costs = self.cache.get(key)
+        if costs is None:
+            with profiling.stage("factorize"):
+                costs = FactorizedCosts.from_frame(cost_df, origin, dest, cost_names)
+            self.cache.put(key, costs)
+
+        return costs
+
+    def share_costs(self, cost_names=None, neighbors=False):
+        """Place the factorized cost table in shared memory, for worker processes.
+
+        Parameters
+        ----------
+        cost_names          : {str, list}
+                              Cost column(s) to share; by default, all of them.
+        neighbors           : bool
+                              If True, share `neighbor_cost_df` instead of `cost_df`.
+
+        Returns
+        -------
+
+        shared              : :class:`access.shared.SharedCosts`
+                              Owner of the segments. Pass its `handle` (or the object itself) to workers,
+                              and call `close()` -- or use it as a context manager -- when done.
+
+        Examples
+        --------
+
+        >>> with chicago_primary_care.share_costs() as shared:
+        ...     results = pool.map(worker, [shared.handle] * 8)
+        """  # noqa: E501
+
+        available = self.neighbor_cost_names if neighbors else self.cost_names
+
+        if cost_names is None:
+            cost_names = available
+        elif type(cost_names) is str:
+            cost_names = [cost_names]
+
+        for c in cost_names:
+            if c not in available:
+                raise ValueError(f"{c} not an available cost.")
+
+        costs = self.factorized_costs(neighbors).select(cost_names)
+
+        return SharedCosts(costs)
+
+    def compact_costs(self, ids="category", costs="float32", neighbors=False):
+        """Shrink the cost table in memory, by storing its columns in smaller types
+        (see :func:`access.costs.compact_costs`).
+        Columns other than the origin, destination and costs -- such as the duplicate keys
+        left over by :meth:`Access.append_user_cost` -- are dropped.
+        Costs appended afterwards are compacted the same way.
+
+        Parameters
+        ----------
+        ids                 : str
+                              "category" (default) to store the location IDs as integer codes, or None.
+        costs               : str
+                              "float32" (default), "uint16" (whole units, e.g., minutes) or None.
+        neighbors           : bool
+                              If True, compact `neighbor_cost_df` instead of `cost_df`.
+
+        Returns
+        -------
+
+        memory              : pandas.Series
+                              Size in bytes of the table `before` and `after` compaction, and the bytes `saved`.
+
+        Examples
+        --------
+
+        >>> memory = chicago_primary_care.compact_costs()
+        >>> memory["saved"] / memory["before"]
+        """  # noqa: E501
+
+        if neighbors:
+            cost_df, origin, dest = (
+                self.neighbor_cost_df,
+                self.neighbor_cost_origin,
+                self.neighbor_cost_dest,
+            )
+            cost_names = self.neighbor_cost_names
+        else:
+            cost_df, origin, dest = self.cost_df, self.cost_origin, self.cost_dest
+            cost_names = self.cost_names
+
+        compact = compact_costs(cost_df, origin, dest, cost_names, ids, costs)
+
+        before = int(cost_df.memory_usage(index=True, deep=True).sum())
+        after = int(compact.memory_usage(index=True, deep=True).sum())
+
+        if neighbors:
+            self.neighbor_cost_df = compact
+        else:
+            self.cost_df = compact
+        self._compaction[neighbors] = (ids, costs)
+
+        self.log.info(
+            f"Compacted {'neighbor_cost_df' if neighbors else 'cost_df'} "
+            f"from {before / 2**20:.1f} to {after / 2**20:.1f} MiB."
+        )
+
+        return pd.Series(
+            {"before": before, "after": after, "saved": before - after}, name="bytes"
+        )
+
+    def _recompact(self, neighbors):
+        """Compact a cost table again after a cost is appended, if it was compacted before."""  # noqa: E501
+
+        if neighbors not in self._compaction:
+            return
+
+        ids, costs = self._compaction[neighbors]
+        try:
+            self.compact_costs(ids, costs, neighbors)
+        except ValueError as e:
+            # E.g., uint16 costs, with missing values from the outer join.
+            del self._compaction[neighbors]
+            self.log.warning(
+                f"{'neighbor_cost_df' if neighbors else 'cost_df'} "
+                f"is no longer compact: {e}"
+            )
+
+    def save(self, path):
+        """Save the session -- locations, costs, access measures and cached intermediate results --
+        to the directory `path`, for :meth:`Access.load`.
+        The layout is:
+
+        - ``session.json``: the column names of the demand, supply and cost tables, and the default costs.
+        - ``demand.pkl``, ``supply.pkl``: `demand_df` and `supply_df`, pickled.
+        - ``results.pkl``: `access_df`, `access`, `access_metadata`, `cost_metadata` and `raam_assignments`, pickled.
+        - ``cache.pkl``: the entries of :attr:`cache` keyed by plain values, pickled;
+          entries for weight functions that are not :class:`access.weights.WeightFunction` objects are recomputed instead.
+        - ``costs/``, ``neighbor_costs/``: the factorized cost tables (see :meth:`Access.factorized_costs`),
+          one ``.npy`` file per array (see :meth:`access.costs.FactorizedCosts.save`).
+
+        Only the origin, destination and cost columns of the cost tables are saved.
+        Measure parameters that cannot be pickled, such as locally defined weight functions,
+        are recorded in `access_metadata` by their ``repr``.
+
+        .. warning::
+           Loading a session unpickles its ``.pkl`` files, which can execute arbitrary code;
+           only load sessions from trusted sources.
+
+        Parameters
+        ----------
+        path                : str
+                              Directory to write. It is created if needed, and earlier sessions in it are overwritten.
+
+        Examples
+        --------
+
+        >>> chicago_primary_care.save("sessions/chicago")
+        >>> chicago_primary_care = Access.load("sessions/chicago")
+        """  # noqa: E501
+
+        os.makedirs(path, exist_ok=True)
+
+        settings = {
+            "demand_value": self.demand_value,
+            "supply_types": self.supply_types,
+            "supply_value_provided": self.supply_value_provided,
+            "trace_memory": self.trace_memory,
+        }
+
+        for key, neighbors in [("costs", False), ("neighbor_costs", True)]:
+            if neighbors:
+                cost_df, origin, dest = (
+                    self.neighbor_cost_df,
+                    self.neighbor_cost_origin,
+                    self.neighbor_cost_dest,
+                )
+                cost_names = self.neighbor_cost_names
+                default = getattr(self, "_neighbor_default_cost", None)
+            else:
+                cost_df, origin, dest = self.cost_df, self.cost_origin, self.cost_dest
+                cost_names = self.cost_names
+                default = getattr(self, "_default_cost", None)
+
+            settings[key] = {
+                "origin": origin,
+                "dest": dest,
+                "names": cost_names,
+                "default": default,
+                "categorical": isinstance(cost_df[origin].dtype, pd.CategoricalDtype),
+                "compaction": self._compaction.get(neighbors),
+            }
+            if cost_names:
+                self.factorized_costs(neighbors).save(os.path.join(path, key))
+
+        with open(os.path.join(path, "session.json"), "w") as f:
+            json.dump(settings, f, indent=2)
+
+        pd.to_pickle(self.demand_df, os.path.join(path, "demand.pkl"))
+        pd.to_pickle(self.supply_df, os.path.join(path, "supply.pkl"))
+        pd.to_pickle(
+            {
+                "access_df": self.access_df,
+                "access": self.access,
+                "access_metadata": self.access_metadata.assign(
+                    parameters=self.access_metadata["parameters"].map(
+                        _picklable_parameters
+                    )
+                ),
+                "cost_metadata": self.cost_metadata,
+                "raam_assignments": self.raam_assignments,
+            },
+            os.path.join(path, "results.pkl"),
+        )
+
+        # A callable in a key only identifies it within this session; recompute those.
+        entries = [
+            (key, value)
+            for key, value in self.cache.items()
+            if key[-1] != "factorized" and helpers.is_plain_key(key)
+        ]
+        pd.to_pickle(entries, os.path.join(path, "cache.pkl"))
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Load a session written by :meth:`Access.save`.
+        The factorized cost tables are memory-mapped, so loading is near-instant even for large tables,
+        and their arrays are shared, read-only, by the cost tables, the cost indexes and the cache.
+
+        .. warning::
+           The tables, results and cache entries are read with :func:`pickle.loads`,
+           and the cost arrays with ``np.load(allow_pickle=True)``;
+           both can execute arbitrary code, so only load sessions from trusted sources.
+
+        Parameters
+        ----------
+        path                : str
+                              Directory written by :meth:`Access.save`.
+        mmap                : bool
+                              If True (default), memory-map the cost arrays; otherwise, read them into memory.
+
+        Returns
+        -------
+
+        access              : Access
+        """  # noqa: E501
+
+        with open(os.path.join(path, "session.json")) as f:
+            settings = json.load(f)
+
+        model = cls(
+            demand_df=pd.read_pickle(os.path.join(path, "demand.pkl")),
+            demand_value=settings["demand_value"],
+            supply_df=pd.read_pickle(os.path.join(path, "supply.pkl")),
+            supply_value=settings["supply_value_provided"] and settings["supply_types"],
+            copy=False,
+        )
+        model.trace_memory = settings["trace_memory"]
+
+        factorized = {}
+        for key, neighbors in [("costs", False), ("neighbor_costs", True)]:
+            c = settings[key]
+            if not c["names"]:
+                continue
+
+            costs = FactorizedCosts.load(os.path.join(path, key), mmap)
+            cost_df = costs.to_frame(
+                c["origin"], c["dest"], c["categorical"], copy=False
+            )
+            factorized[("neighbors" if neighbors else "costs", "factorized")] = costs
+
+            if neighbors:
+                model.neighbor_cost_df = cost_df
+                model.neighbor_cost_origin = c["origin"]
+                model.neighbor_cost_dest = c["dest"]
+                model.neighbor_cost_name = c["names"]
+                model.neighbor_cost_names = c["names"]
+                model._neighbor_default_cost = c["default"]
+            else:
+                model.cost_df = cost_df
+                model.cost_origin = c["origin"]
+                model.cost_dest = c["dest"]
+                model.cost_names = c["names"]
+                model._default_cost = c["default"]
+
+            if c.get("compaction"):
+                model._compaction[neighbors] = tuple(c["compaction"])
+
+        for name, value in pd.read_pickle(os.path.join(path, "results.pkl")).items():
+            setattr(model, name, value)
+
+        for key, costs in factorized.items():
+            model.cache.put(key, costs)
+        for key, value in pd.read_pickle(os.path.join(path, "cache.pkl")):
+            model.cache.put(key, value)
+
+        return model
+
     def append_user_cost(self, new_cost_df, origin, destination, name):
         """Create a user cost, from demand to supply locations.
 
@@ -1378,6 +2669,8 @@ class Access:
             right_on=[origin, destination],
         )
         self.cost_names.append(name)
+        self._describe_cost(name, "user", "appended with append_user_cost")
+        self._recompact(False)
 
     def append_user_cost_neighbors(self, new_cost_df, origin, destination, name):
         """Create a user cost, from supply locations to other supply locations.
@@ -1476,6 +2769,7 @@ class Access:
             right_on=[origin, destination],
         )
         self.neighbor_cost_names.append(name)
+        self._recompact(True)
 
     def create_euclidean_distance(
         self, name="euclidean", threshold=0, centroid_o=False, centroid_d=False
@@ -1624,9 +2918,11 @@ class Access:
         # Add it to the list of costs.
         if name not in self.cost_names:
             self.cost_names.append(name)
+        self._describe_cost(name, "euclidean", f"threshold {threshold}")
         # Set the default cost if it does not exist
         if not hasattr(self, "_default_cost"):
             self._default_cost = name
+        self._recompact(False)
 
     def create_euclidean_distance_neighbors(
         self, name="euclidean", threshold=0, centroid=False
@@ -1766,3 +3062,18 @@ class Access:
         # Set the default cost if it does not exist
         if not hasattr(self, "_neighbor_default_cost"):
             self._neighbor_default_cost = name
+        self._recompact(True)
+
+
+def _picklable_parameters(parameters):
+    """`parameters`, with the values that cannot be pickled replaced by their repr."""
+
+    picklable = {}
+    for key, value in parameters.items():
+        try:
+            pickle.dumps(value)
+        except (pickle.PicklingError, AttributeError, TypeError):
+            value = repr(value)
+        picklable[key] = value
+
+    return picklable
@@ -0,0 +1,166 @@
+import os
+
+import numpy as np
+
+from .costs import FactorizedCosts
+
+
+def _pyarrow():
+    """Import pyarrow, which is only needed for Arrow input and output."""
+
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError(
+            "Arrow and Parquet files require pyarrow: `pip install pyarrow`."
+        ) from e
+
+    return pyarrow
+
+
+def _is_feather(path):
+    """Arrow IPC (Feather) for .feather, .arrow and .ipc files, otherwise Parquet."""
+
+    return os.path.splitext(str(path))[1].lower() in (".feather", ".arrow", ".ipc")
+
+
+def _factorize(column):
+    """Sorted unique values of an Arrow column, and the ``int32`` code of each row."""
+
+    pa = _pyarrow()
+    import pyarrow.compute as pc
+
+    # Dictionaries differ from chunk to chunk: decode them and code the values.
+    if pa.types.is_dictionary(column.type):
+        column = pa.chunked_array(
+            [chunk.dictionary_decode() for chunk in column.chunks],
+            type=column.type.value_type,
+        )
+
+    ids = pc.unique(column)
+    ids = ids.take(pc.sort_indices(ids))
+    codes = pc.index_in(column, value_set=ids)
+
+    return (
+        codes.to_numpy().astype(np.int32, copy=False),
+        ids.to_numpy(zero_copy_only=False),
+    )
+
+
+def read_costs(
+    path, cost_origin="origin", cost_dest="dest", cost_names="cost", max_cost=None
+):
+    """
+    Read a long-format cost table from Parquet or Feather, straight into integer codes.
+    Only the origin, destination and cost columns are read,
+    and rows above `max_cost` are skipped as the file is scanned,
+    so that neither the other columns nor the rows beyond the catchment are ever in memory.
+    The IDs are factorized by Arrow, without building a DataFrame.
+
+    Parameters
+    ----------
+    path                : str
+                          A Parquet file, a Feather file (``.feather``, ``.arrow`` or ``.ipc``),
+                          or a directory of Parquet files, e.g., a partitioned dataset.
+    cost_origin         : str
+                          The column name of the origin locations.
+    cost_dest           : str
+                          The column name of the destination locations.
+    cost_names          : {str, list}
+                          The column name(s) of the travel cost(s) to read.
+    max_cost            : float
+                          If given, rows whose first cost in `cost_names` is above this value are skipped.
+
+    Returns
+    -------
+    costs               : :class:`access.costs.FactorizedCosts`
+
+    Examples
+    --------
+
+    >>> costs = read_costs("times.parquet", cost_names = "minutes", max_cost = 60)
+    >>> index = SortedCostIndex.from_costs(costs, "minutes")
+    """  # noqa: E501
+
+    _pyarrow()
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+
+    if type(cost_names) is str:
+        cost_names = [cost_names]
+
+    dataset = ds.dataset(path, format="ipc" if _is_feather(path) else "parquet")
+
+    condition = pc.field(cost_origin).is_valid() & pc.field(cost_dest).is_valid()
+    if max_cost is not None:
+        condition &= pc.field(cost_names[0]) <= max_cost
+
+    table = dataset.to_table(
+        columns=[cost_origin, cost_dest, *cost_names], filter=condition
+    )
+
+    origin, origin_ids = _factorize(table[cost_origin])
+    dest, dest_ids = _factorize(table[cost_dest])
+    costs = {c: table[c].to_numpy() for c in cost_names}
+
+    return FactorizedCosts(origin, dest, origin_ids, dest_ids, costs)
+
+
+def _write(table, path):
+    if _is_feather(path):
+        import pyarrow.feather as feather
+
+        feather.write_feather(table, path)
+    else:
+        import pyarrow.parquet as pq
+
+        pq.write_table(table, path)
+
+
+def write_costs(costs, path, cost_origin="origin", cost_dest="dest"):
+    """
+    Write integer-coded costs to Parquet or Feather (see :func:`read_costs`).
+    The codes and ID maps become dictionary-encoded origin and destination columns,
+    and the cost arrays are handed to Arrow as they are, without copies.
+
+    Parameters
+    ----------
+    costs               : :class:`access.costs.FactorizedCosts`
+                          E.g., :meth:`access.Access.factorized_costs`.
+    path                : str
+                          Output file: Feather for ``.feather``, ``.arrow`` and ``.ipc``, otherwise Parquet.
+    cost_origin         : str
+                          The column name of the origin locations.
+    cost_dest           : str
+                          The column name of the destination locations.
+    """  # noqa: E501
+
+    pa = _pyarrow()
+
+    columns = {
+        cost_origin: pa.DictionaryArray.from_arrays(costs.origin, costs.origin_ids),
+        cost_dest: pa.DictionaryArray.from_arrays(costs.dest, costs.dest_ids),
+    }
+    for name, values in costs.costs.items():
+        columns[name] = pa.array(values)
+
+    _write(pa.table(columns), path)
+
+
+def write_frame(df, path, index=True):
+    """
+    Write a DataFrame, e.g., :attr:`access.Access.access_df`, to Parquet or Feather.
+
+    Parameters
+    ----------
+    df                  : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_
+                          The table to write.
+    path                : str
+                          Output file: Feather for ``.feather``, ``.arrow`` and ``.ipc``, otherwise Parquet.
+    index               : bool
+                          Whether to write the index as a column.
+    """  # noqa: E501
+
+    pa = _pyarrow()
+
+    _write(pa.Table.from_pandas(df, preserve_index=index), path)
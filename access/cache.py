@@ -0,0 +1,126 @@
+import sys
+from collections import OrderedDict
+
+import scipy.sparse as sp
+
+
+def sizeof(value):
+    """Approximate size in bytes of a cached value."""
+
+    if isinstance(value, tuple):
+        return sum(sizeof(v) for v in value)
+
+    if sp.issparse(value):
+        return sizeof((value.data, value.indices, value.indptr))
+
+    if hasattr(value, "memory_usage"):
+        usage = value.memory_usage(index=True, deep=True)
+        return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+
+    return sys.getsizeof(value)
+
+
+class CatchmentCache:
+    """
+    Least-recently-used store of intermediate catchment results,
+    such as demand-stage totals, supply-to-demand ratios and weighted costs.
+
+    Parameters
+    ----------
+    max_bytes           : int
+                          Byte budget. When it is exceeded, the least recently used
+                          entries are evicted. Values larger than the whole budget
+                          are never stored, and a budget of 0 disables caching.
+
+    Attributes
+    ----------
+    hits, misses        : int
+                          Lookup counts, for diagnostics.
+    """  # noqa: E501
+
+    def __init__(self, max_bytes=2**28):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        if key not in self._entries:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+
+        return self._entries[key][0]
+
+    def put(self, key, value):
+        if key in self._entries:
+            self.nbytes -= self._entries.pop(key)[1]
+
+        size = sizeof(value)
+        if size > self.max_bytes:
+            return
+
+        self._entries[key] = (value, size)
+        self.nbytes += size
+
+        while self.nbytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.nbytes -= evicted
+
+    def items(self):
+        """The entries, as (key, value) pairs, from least to most recently used."""
+
+        return [(key, value) for key, (value, _) in self._entries.items()]
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+    def view(self, *prefix):
+        """A dict-like window on the entries whose keys start with `prefix`."""
+
+        return CacheView(self, prefix)
+
+
+class CacheView:
+    """
+    Entries of a :class:`CatchmentCache` sharing a key prefix,
+    with the ``get`` / ``[]=`` interface of a dict.
+    Values read or written through the view are also kept by the view itself,
+    so that they stay available for as long as it is in use --
+    e.g., across the supply types of one call --
+    even if the cache evicts them, cannot hold them or is disabled.
+    """
+
+    def __init__(self, cache, prefix):
+        self.cache = cache
+        self.prefix = prefix
+        self._seen = {}
+
+    def get(self, key, default=None):
+        if key in self._seen:
+            return self._seen[key]
+
+        value = self.cache.get(self.prefix + (key,))
+        if value is None:
+            return default
+
+        self._seen[key] = value
+
+        return value
+
+    def __setitem__(self, key, value):
+        self._seen[key] = value
+        self.cache.put(self.prefix + (key,), value)
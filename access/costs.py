@@ -0,0 +1,759 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from .weights import evaluate_unique
+
+
+class FactorizedCosts:
+    """
+    Integer-coded representation of a long-format cost table.
+
+    The origin and destination columns are replaced by ``int32`` codes into
+    sorted arrays of unique IDs, and each cost column is held as a plain
+    numpy array aligned with the codes.
+    Rows missing an origin or a destination are dropped.
+
+    Parameters
+    ----------
+    origin              : numpy.ndarray
+                          Integer codes of the origin of each row.
+    dest                : numpy.ndarray
+                          Integer codes of the destination of each row.
+    origin_ids          : numpy.ndarray
+                          Unique origin IDs; ``origin_ids[origin]`` recovers the raw column.
+    dest_ids            : numpy.ndarray
+                          Unique destination IDs.
+    costs               : dict
+                          Cost column names mapped to arrays aligned with the codes.
+    """  # noqa: E501
+
+    def __init__(self, origin, dest, origin_ids, dest_ids, costs):
+        self.origin = origin
+        self.dest = dest
+        self.origin_ids = origin_ids
+        self.dest_ids = dest_ids
+        self.costs = dict(costs)
+
+    @classmethod
+    def from_frame(cls, cost_df, cost_origin, cost_dest, cost_names):
+        """
+        Factorize the origin and destination columns of `cost_df`.
+
+        Parameters
+        ----------
+        cost_df             : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_
+                              Long-format table of costs.
+        cost_origin         : str
+                              The column name of the origin locations.
+        cost_dest           : str
+                              The column name of the destination locations.
+        cost_names          : {str, list}
+                              The column name(s) of the travel cost(s) to keep.
+
+        Returns
+        -------
+        costs               : FactorizedCosts
+        """  # noqa: E501
+
+        if type(cost_names) is str:
+            cost_names = [cost_names]
+
+        origin, origin_ids = pd.factorize(cost_df[cost_origin], sort=True)
+        dest, dest_ids = pd.factorize(cost_df[cost_dest], sort=True)
+
+        # pandas codes missing keys as -1; these rows cannot be used.
+        valid = (origin >= 0) & (dest >= 0)
+        if valid.all():
+            valid = slice(None)
+
+        costs = {c: cost_df[c].to_numpy()[valid] for c in cost_names}
+
+        return cls(
+            origin[valid].astype(np.int32),
+            dest[valid].astype(np.int32),
+            np.asarray(origin_ids),
+            np.asarray(dest_ids),
+            costs,
+        )
+
+    def __len__(self):
+        return len(self.origin)
+
+    def select(self, cost_names):
+        """The same structure with only the costs in `cost_names`, sharing its arrays."""  # noqa: E501
+
+        if type(cost_names) is str:
+            cost_names = [cost_names]
+
+        return FactorizedCosts(
+            self.origin,
+            self.dest,
+            self.origin_ids,
+            self.dest_ids,
+            {c: self.costs[c] for c in cost_names},
+        )
+
+    @property
+    def nbytes(self):
+        """Total size in bytes of the codes, ID maps and cost arrays."""
+
+        return sum(a.nbytes for a in self.arrays().values())
+
+    def arrays(self):
+        """
+        Flatten the structure into a dictionary of named arrays.
+        Cost columns are keyed as ``"cost:<name>"``.
+        """
+
+        arrays = {
+            "origin": self.origin,
+            "dest": self.dest,
+            "origin_ids": self.origin_ids,
+            "dest_ids": self.dest_ids,
+        }
+        for name, values in self.costs.items():
+            arrays["cost:" + name] = values
+
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Inverse of :meth:`FactorizedCosts.arrays`."""
+
+        costs = {k[5:]: v for k, v in arrays.items() if k.startswith("cost:")}
+
+        return cls(
+            arrays["origin"],
+            arrays["dest"],
+            arrays["origin_ids"],
+            arrays["dest_ids"],
+            costs,
+        )
+
+    def to_frame(
+        self, cost_origin="origin", cost_dest="dest", categorical=False, copy=True
+    ):
+        """
+        Rebuild a long-format cost DataFrame, with the raw IDs.
+        If `categorical`, the IDs are categoricals over the codes,
+        as in :func:`compact_costs`, rather than decoded values.
+        If not `copy`, the cost columns share the arrays of this structure.
+        """
+
+        if categorical:
+            data = {
+                cost_origin: pd.Categorical.from_codes(self.origin, self.origin_ids),
+                cost_dest: pd.Categorical.from_codes(self.dest, self.dest_ids),
+            }
+        else:
+            data = {
+                cost_origin: self.origin_ids[self.origin],
+                cost_dest: self.dest_ids[self.dest],
+            }
+        data.update(self.costs)
+
+        return pd.DataFrame(data, copy=copy)
+
+    def save(self, path):
+        """
+        Write each array to a ``.npy`` file in the directory `path`,
+        with an ``arrays.json`` manifest mapping the keys of :meth:`FactorizedCosts.arrays`
+        to file names, so that :meth:`FactorizedCosts.load` can memory-map them.
+        """  # noqa: E501
+
+        os.makedirs(path, exist_ok=True)
+
+        files = {}
+        n_costs = 0
+        for key, values in self.arrays().items():
+            # Cost names may not be valid file names; number them instead.
+            if key.startswith("cost:"):
+                name = f"cost-{n_costs}"
+                n_costs += 1
+            else:
+                name = key
+            values = np.asarray(values)
+            np.save(
+                os.path.join(path, name + ".npy"),
+                values,
+                allow_pickle=values.dtype.hasobject,
+            )
+            files[key] = name + ".npy"
+
+        with open(os.path.join(path, "arrays.json"), "w") as f:
+            json.dump(files, f)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Read the arrays written by :meth:`FactorizedCosts.save`.
+        With `mmap`, they are memory-mapped read-only, so that loading is immediate
+        and pages are read from disk as they are used.
+        Object arrays, such as string IDs, are unpickled, which can execute arbitrary code;
+        only load directories from trusted sources.
+        """  # noqa: E501
+
+        with open(os.path.join(path, "arrays.json")) as f:
+            files = json.load(f)
+
+        arrays = {}
+        for key, name in files.items():
+            file = os.path.join(path, name)
+            try:
+                arrays[key] = np.load(file, mmap_mode="r" if mmap else None)
+            except ValueError:
+                # Object arrays, such as string IDs, cannot be memory-mapped.
+                arrays[key] = np.load(file, allow_pickle=True)
+
+        return cls.from_arrays(arrays)
+
+
+class SortedCostIndex:
+    """
+    Costs grouped by origin (or by destination) and sorted within each group,
+    in a compressed sparse row layout.
+    The entries of row :math:`i` are ``cols[indptr[i]:indptr[i + 1]]``, in increasing order of cost,
+    so the entries within any threshold are a prefix of each row, found by binary search
+    rather than by scanning and copying the table.
+    Missing costs sort last in their row: they are kept when there is no threshold,
+    and excluded by any threshold.
+    Use :meth:`SortedCostIndex.from_frame` or :meth:`SortedCostIndex.from_costs` to build one.
+
+    Parameters
+    ----------
+    indptr              : numpy.ndarray
+                          Row offsets, of length ``len(row_ids) + 1``.
+    cols                : numpy.ndarray
+                          Integer codes of the column location of each entry.
+    costs               : numpy.ndarray
+                          Cost of each entry, sorted within each row.
+    row_ids             : numpy.ndarray
+                          IDs of the row locations.
+    col_ids             : numpy.ndarray
+                          IDs of the column locations.
+    by                  : str
+                          "origin" if the rows are origins, "dest" if they are destinations.
+    cost_origin         : str
+                          The column name of the origin locations, in the original cost table.
+    cost_dest           : str
+                          The column name of the destination locations, in the original cost table.
+    """  # noqa: E501
+
+    def __init__(
+        self,
+        indptr,
+        cols,
+        costs,
+        row_ids,
+        col_ids,
+        by="origin",
+        cost_origin="origin",
+        cost_dest="dest",
+    ):
+        if by not in ("origin", "dest"):
+            raise ValueError("by must be 'origin' or 'dest'.")
+
+        self.indptr = indptr
+        self.cols = cols
+        self.costs = costs
+        self.row_ids = row_ids
+        self.col_ids = col_ids
+        self.by = by
+        self.cost_origin = cost_origin
+        self.cost_dest = cost_dest
+
+    @classmethod
+    def from_costs(
+        cls, costs, cost_name, by="origin", cost_origin="origin", cost_dest="dest"
+    ):
+        """
+        Sort the rows of a :class:`FactorizedCosts` by cost, within each origin (or destination).
+        """  # noqa: E501
+
+        if by == "origin":
+            rows, cols, row_ids, col_ids = (
+                costs.origin,
+                costs.dest,
+                costs.origin_ids,
+                costs.dest_ids,
+            )
+        elif by == "dest":
+            rows, cols, row_ids, col_ids = (
+                costs.dest,
+                costs.origin,
+                costs.dest_ids,
+                costs.origin_ids,
+            )
+        else:
+            raise ValueError("by must be 'origin' or 'dest'.")
+
+        values = np.asarray(costs.costs[cost_name], dtype=float)
+
+        # lexsort orders by its last key first, and puts NaN last.
+        order = np.lexsort((values, rows))
+
+        indptr = np.zeros(len(row_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(row_ids)), out=indptr[1:])
+
+        return cls(
+            indptr,
+            cols[order],
+            values[order],
+            row_ids,
+            col_ids,
+            by,
+            cost_origin,
+            cost_dest,
+        )
+
+    @classmethod
+    def from_frame(cls, cost_df, cost_origin, cost_dest, cost_name, by="origin"):
+        """
+        Build the index of one cost column of a long-format cost table.
+
+        Parameters
+        ----------
+        cost_df             : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_
+                              Long-format table of costs.
+        cost_origin         : str
+                              The column name of the origin locations.
+        cost_dest           : str
+                              The column name of the destination locations.
+        cost_name           : str
+                              The column name of the travel cost.
+        by                  : str
+                              Group the costs by "origin" (default) or by "dest".
+
+        Returns
+        -------
+        index               : SortedCostIndex
+        """  # noqa: E501
+
+        costs = FactorizedCosts.from_frame(cost_df, cost_origin, cost_dest, cost_name)
+
+        return cls.from_costs(costs, cost_name, by, cost_origin, cost_dest)
+
+    def __len__(self):
+        return len(self.cols)
+
+    @property
+    def shape(self):
+        return len(self.row_ids), len(self.col_ids)
+
+    @property
+    def nbytes(self):
+        return sum(
+            a.nbytes
+            for a in [self.indptr, self.cols, self.costs, self.row_ids, self.col_ids]
+        )
+
+    @property
+    def origin_ids(self):
+        return self.row_ids if self.by == "origin" else self.col_ids
+
+    @property
+    def dest_ids(self):
+        return self.col_ids if self.by == "origin" else self.row_ids
+
+    def cutoffs(self, max_cost=None):
+        """
+        End offset, in each row, of the entries with cost at most `max_cost`.
+        All rows are searched together, bisecting their sorted costs.
+
+        Parameters
+        ----------
+        max_cost            : {float, numpy.ndarray}
+                              A single threshold, or one per row.
+                              If None, every entry is included.
+
+        Returns
+        -------
+        ends                : numpy.ndarray
+                              Offsets into `cols` and `costs`, between ``indptr[:-1]`` and ``indptr[1:]``.
+        """  # noqa: E501
+
+        lo = self.indptr[:-1].copy()
+        hi = self.indptr[1:].copy()
+        if max_cost is None:
+            return hi
+
+        threshold = np.broadcast_to(np.asarray(max_cost, dtype=float), lo.shape)
+
+        rows = np.flatnonzero(lo < hi)
+        while len(rows):
+            mid = (lo[rows] + hi[rows]) // 2
+            within = self.costs[mid] <= threshold[rows]
+            lo[rows[within]] = mid[within] + 1
+            hi[rows[~within]] = mid[~within]
+            rows = rows[lo[rows] < hi[rows]]
+
+        return lo
+
+    def reach(self, values, target):
+        """
+        The cost at which each row's running total of `values` first reaches `target`,
+        e.g., the radius within which a facility serves a given population.
+        The running totals of all rows are one non-decreasing array, so every row
+        is found by a single binary search.
+
+        Parameters
+        ----------
+        values              : numpy.ndarray
+                              Non-negative value of each column location, in the order of `col_ids`.
+        target              : {float, numpy.ndarray}
+                              Total to reach, for all rows or for each row.
+
+        Returns
+        -------
+        radius              : numpy.ndarray
+                              Cost of the entry reaching the target, in each row;
+                              infinite if the whole row falls short.
+        """  # noqa: E501
+
+        values = np.where(np.isnan(self.costs), 0, np.asarray(values)[self.cols])
+
+        prefix = np.zeros(len(self) + 1)
+        np.cumsum(values, out=prefix[1:])
+
+        starts, ends = self.indptr[:-1], self.indptr[1:]
+        goal = prefix[starts] + target
+
+        # prefix[m] is the first total at or above the goal: entry m - 1 reaches it.
+        m = np.maximum(np.searchsorted(prefix, goal, side="left"), starts + 1)
+        reached = (m <= ends) & (ends > starts)
+
+        radius = np.full(len(starts), np.inf)
+        radius[reached] = self.costs[m[reached] - 1]
+
+        return radius
+
+    def transpose(self):
+        """The same costs, grouped by the other side."""
+
+        rows = np.repeat(np.arange(len(self.row_ids)), np.diff(self.indptr))
+        order = np.lexsort((self.costs, self.cols))
+
+        indptr = np.zeros(len(self.col_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.cols, minlength=len(self.col_ids)), out=indptr[1:])
+
+        return SortedCostIndex(
+            indptr,
+            rows[order].astype(self.cols.dtype),
+            self.costs[order],
+            self.col_ids,
+            self.row_ids,
+            "dest" if self.by == "origin" else "origin",
+            self.cost_origin,
+            self.cost_dest,
+        )
+
+    def counts(self, max_cost=None):
+        """Number of entries of each row with cost at most `max_cost`."""
+
+        return self.cutoffs(max_cost) - self.indptr[:-1]
+
+    def select(self, max_cost=None):
+        """
+        Positions of the entries with cost at most `max_cost`, row by row,
+        and the new row offsets over them.
+        """
+
+        lengths = self.counts(max_cost)
+
+        indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+
+        # Shift a running count over the selected entries by each row's start.
+        positions = np.arange(indptr[-1]) + np.repeat(
+            self.indptr[:-1] - indptr[:-1], lengths
+        )
+
+        return positions, indptr
+
+    def to_csr(self, max_cost=None, weight_fn=None):
+        """
+        Sparse matrix of the entries with cost at most `max_cost`,
+        weighted by `weight_fn` of the cost, or 1.
+        Entries of missing cost or weight are left out, as unreachable.
+        Rows and columns follow `row_ids` and `col_ids`.
+        """
+
+        positions, indptr = self.select(max_cost)
+        costs = self.costs[positions]
+        if weight_fn:
+            data = evaluate_unique(weight_fn, costs)
+        else:
+            data = np.ones(len(positions))
+
+        valid = ~np.isnan(costs) & ~np.isnan(data)
+        if not valid.all():
+            rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+            indptr = np.zeros_like(indptr)
+            np.cumsum(
+                np.bincount(rows[valid], minlength=len(indptr) - 1), out=indptr[1:]
+            )
+            positions, data = positions[valid], data[valid]
+
+        return sp.csr_matrix((data, self.cols[positions], indptr), shape=self.shape)
+
+    def matrix(self, origins, dests, max_cost=None, weight_fn=None):
+        """
+        As :meth:`SortedCostIndex.to_csr`, oriented from origins (rows) to destinations (columns),
+        in the order given. Locations missing from the index have no entries.
+        """  # noqa: E501
+
+        weights = self.to_csr(max_cost, weight_fn)
+        if self.by == "dest":
+            weights = weights.T.tocsr()
+
+        o = pd.Index(self.origin_ids).get_indexer(origins)
+        d = pd.Index(self.dest_ids).get_indexer(dests)
+
+        # Gather the listed rows, then renumber the listed columns and drop the rest.
+        # This works on the raw arrays, so that explicit zero weights are kept.
+        starts = weights.indptr[np.maximum(o, 0)]
+        lengths = np.where(o >= 0, weights.indptr[np.maximum(o, 0) + 1] - starts, 0)
+        offsets = np.cumsum(lengths) - lengths
+        positions = np.arange(lengths.sum()) + np.repeat(starts - offsets, lengths)
+
+        column = np.full(weights.shape[1], -1)
+        column[d[d >= 0]] = np.flatnonzero(d >= 0)
+        cols = column[weights.indices[positions]]
+        keep = cols >= 0
+
+        rows = np.repeat(np.arange(len(o)), lengths)[keep]
+
+        return sp.csr_matrix(
+            (weights.data[positions][keep], (rows, cols[keep])),
+            shape=(len(o), len(d)),
+        )
+
+
+class PartitionedCosts:
+    """
+    A long-format cost table, split on disk into partitions by origin.
+
+    Every row for a given origin lands in the same partition,
+    so per-origin results can be computed one partition at a time,
+    and per-destination totals can be accumulated across partitions.
+    Peak memory is then bounded by a single partition
+    (plus origin- or destination-sized vectors),
+    rather than by the full table.
+    Use :func:`partition_costs` to create one.
+
+    Parameters
+    ----------
+    path                : str
+                          Directory written by :func:`partition_costs`.
+    """  # noqa: E501
+
+    def __init__(self, path):
+        self.path = path
+
+        with open(os.path.join(path, "partitions.json")) as f:
+            meta = json.load(f)
+
+        self.cost_origin = meta["cost_origin"]
+        self.n_partitions = meta["n_partitions"]
+        self.columns = meta["columns"]
+
+    def __len__(self):
+        return self.n_partitions
+
+    def __iter__(self):
+        return self.iter_partitions()
+
+    def read_partition(self, i, columns=None):
+        """
+        Load partition `i` as a DataFrame, optionally projecting `columns`.
+        Returns None if no rows were assigned to this partition.
+        """
+
+        part_dir = os.path.join(self.path, f"part-{i:05d}")
+        chunks = [
+            pd.read_pickle(os.path.join(part_dir, f))
+            for f in sorted(os.listdir(part_dir))
+        ]
+
+        if not chunks:
+            return None
+
+        df = pd.concat(chunks, ignore_index=True)
+        if columns is not None:
+            df = df[list(columns)]
+
+        return df
+
+    def iter_partitions(self, columns=None, cost_name=None, max_cost=None):
+        """
+        Stream the partitions, one DataFrame at a time.
+
+        Parameters
+        ----------
+        columns             : list
+                              Columns to keep; by default, all of them.
+        cost_name           : str
+                              Cost column used with `max_cost`.
+        max_cost            : float
+                              If given, rows with `cost_name` above this value
+                              are dropped as each partition is read.
+        """
+
+        for i in range(self.n_partitions):
+            df = self.read_partition(i, columns)
+            if df is None:
+                continue
+            if max_cost is not None:
+                df = df[df[cost_name] <= max_cost]
+            yield df
+
+    def unique(self, column):
+        """Unique values of `column` across all partitions."""
+
+        values = set()
+        for df in self.iter_partitions(columns=[column]):
+            values.update(df[column].unique())
+
+        return values
+
+
+def partition_costs(cost_chunks, path, cost_origin, n_partitions=16, columns=None):
+    """
+    Split a cost table into origin partitions on disk.
+
+    Parameters
+    ----------
+    cost_chunks         : {`pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_, iterable}
+                          A cost table, or an iterable of pieces of one
+                          (e.g., ``pd.read_csv(..., chunksize = 10**6)``),
+                          so that the full table never needs to be in memory.
+    path                : str
+                          Directory in which to write the partitions. It is created if needed.
+    cost_origin         : str
+                          The column name of the origin locations, used to assign partitions.
+    n_partitions        : int
+                          Number of partitions.
+    columns             : list
+                          Columns to keep; by default, all of them.
+
+    Returns
+    -------
+    partitioned         : PartitionedCosts
+
+    Examples
+    --------
+
+    >>> chunks = pd.read_csv("national_block_times.csv.bz2", chunksize = 10**7)
+    >>> partitioned = partition_costs(chunks, "/scratch/times", "origin", n_partitions = 64)
+    >>> fca.two_stage_fca(demand_df, supply_df, partitioned, max_cost = 60)
+    """  # noqa: E501
+
+    if isinstance(cost_chunks, pd.DataFrame):
+        cost_chunks = [cost_chunks]
+
+    if n_partitions < 1:
+        raise ValueError("n_partitions must be at least 1.")
+
+    if os.path.isdir(path) and os.listdir(path):
+        raise FileExistsError(f"{path} is not empty.")
+
+    for i in range(n_partitions):
+        os.makedirs(os.path.join(path, f"part-{i:05d}"), exist_ok=True)
+
+    for c, chunk in enumerate(cost_chunks):
+        if columns is not None:
+            chunk = chunk[list(columns)]
+        else:
+            columns = list(chunk.columns)
+
+        part = pd.util.hash_pandas_object(chunk[cost_origin], index=False).to_numpy()
+        part = part % n_partitions
+
+        for i, piece in chunk.groupby(part, sort=False):
+            piece.reset_index(drop=True).to_pickle(
+                os.path.join(path, f"part-{i:05d}", f"{c:08d}.pkl")
+            )
+
+    with open(os.path.join(path, "partitions.json"), "w") as f:
+        json.dump(
+            {
+                "cost_origin": cost_origin,
+                "n_partitions": n_partitions,
+                "columns": columns,
+            },
+            f,
+        )
+
+    return PartitionedCosts(path)
+
+
+def compact_costs(
+    cost_df, cost_origin, cost_dest, cost_names, ids="category", costs="float32"
+):
+    """
+    Copy of a long-format cost table with smaller column types,
+    keeping only the origin, destination and cost columns.
+
+    Parameters
+    ----------
+    cost_df             : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_
+                          Long-format table of costs.
+    cost_origin         : str
+                          The column name of the origin locations.
+    cost_dest           : str
+                          The column name of the destination locations.
+    cost_names          : {str, list}
+                          The column name(s) of the travel cost(s) to keep.
+    ids                 : str
+                          "category" stores the origin and destination IDs as pandas categoricals,
+                          i.e., as integer codes (of at most 32 bits) into a single copy of each distinct ID.
+                          None leaves them unchanged.
+    costs               : str
+                          "float32" halves the size of float64 costs, with about 7 significant digits.
+                          "uint16" rounds the costs to whole units (e.g., minutes), from 0 to 65,535,
+                          in a quarter of the space; it requires costs without missing values.
+                          None leaves them unchanged.
+
+    Returns
+    -------
+    cost_df             : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_
+                          The compacted table.
+
+    Examples
+    --------
+
+    >>> compact = compact_costs(chi_travel_costs, "origin", "dest", "cost")
+    >>> chi_travel_costs.memory_usage(deep = True).sum(), compact.memory_usage(deep = True).sum()
+    """  # noqa: E501
+
+    if type(cost_names) is str:
+        cost_names = [cost_names]
+
+    if ids not in ("category", None):
+        raise ValueError("ids must be 'category' or None.")
+
+    if costs not in ("float32", "uint16", None):
+        raise ValueError("costs must be 'float32', 'uint16' or None.")
+
+    columns = {}
+    for c in [cost_origin, cost_dest]:
+        columns[c] = cost_df[c].astype("category") if ids else cost_df[c]
+
+    for c in cost_names:
+        values = cost_df[c]
+        if costs == "float32":
+            values = values.astype(np.float32)
+        elif costs == "uint16":
+            if values.isna().any():
+                raise ValueError(f"{c} has missing costs, which uint16 cannot hold.")
+            values = values.round()
+            if values.min() < 0 or values.max() > np.iinfo(np.uint16).max:
+                raise ValueError(f"{c} is outside of the range of uint16.")
+            values = values.astype(np.uint16)
+        columns[c] = values
+
+    return pd.DataFrame(columns, index=cost_df.index)
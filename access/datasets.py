@@ -1,4 +1,6 @@
+import numpy as np
 import pandas as pd
+from scipy.spatial import cKDTree
 
 
 class Datasets:
@@ -30,6 +32,131 @@ class Datasets:
 
         return pd.read_csv(url)
 
+    @staticmethod
+    def synthetic(
+        n_origins=1000,
+        n_facilities=None,
+        n_clusters=None,
+        extent=None,
+        k=50,
+        neighbor_k=10,
+        seed=0,
+    ):
+        """
+        Generate a synthetic, clustered accessibility problem of any size.
+
+        Origins are scattered around population clusters in a square region,
+        with log-normal populations. Facilities are placed near origins,
+        so that they follow the population, with skewed counts of doctors and dentists
+        (most facilities have few providers, and many have none of one type).
+        Travel times, in minutes, combine a fixed access time
+        with a detour-inflated distance at a speed that rises with trip length,
+        and log-normal noise; they are rounded to 0.01 minutes, like `chi_times`.
+        Each origin is linked to its `k` nearest facilities.
+        Everything is vectorized, so problems with 10^5 origins build in seconds.
+
+        Parameters
+        ----------
+        n_origins           : int
+                              Number of demand locations.
+        n_facilities        : int
+                              Number of supply locations; by default, a tenth of the origins.
+        n_clusters          : int
+                              Number of population clusters; by default, the square root of `n_origins`.
+        extent              : float
+                              Side of the square region, in kilometers.
+                              By default, it grows with the number of origins, to keep their density
+                              (and so the distribution of travel times) fixed: 100 km for 1000 origins.
+        k                   : int
+                              Number of facilities linked to each origin in the cost table.
+        neighbor_k          : int
+                              Number of origins linked to each origin in the neighbor cost table.
+        seed                : int
+                              Random seed.
+
+        Returns
+        -------
+        demand_df           : pandas.DataFrame
+                              Columns `geoid`, `pop`, `x` and `y`.
+        supply_df           : pandas.DataFrame
+                              Columns `geoid`, `doc`, `dentist`, `x` and `y`.
+        cost_df             : pandas.DataFrame
+                              Travel times from origins to facilities (`origin`, `dest`, `cost`).
+        neighbor_cost_df    : pandas.DataFrame
+                              Travel times among origins (`origin`, `dest`, `cost`).
+
+        Examples
+        --------
+
+        >>> demand, supply, costs, neighbor_costs = Datasets.synthetic(10000)
+        >>> A = Access(demand_df = demand, demand_index = "geoid", demand_value = "pop",
+                       supply_df = supply, supply_index = "geoid", supply_value = ["doc", "dentist"],
+                       cost_df = costs, cost_origin = "origin", cost_dest = "dest", cost_name = "cost")
+        """  # noqa: E501
+
+        rng = np.random.default_rng(seed)
+
+        if n_facilities is None:
+            n_facilities = max(n_origins // 10, 1)
+        if n_clusters is None:
+            n_clusters = max(int(np.sqrt(n_origins)), 1)
+        if extent is None:
+            extent = 100 * np.sqrt(n_origins / 1000)
+
+        centers = rng.uniform(0, extent, (n_clusters, 2))
+        spread = rng.uniform(0.01, 0.05, n_clusters) * extent
+        cluster = rng.integers(n_clusters, size=n_origins)
+        origin_xy = (
+            centers[cluster] + rng.normal(size=(n_origins, 2)) * spread[cluster, None]
+        )
+
+        demand_df = pd.DataFrame(
+            {
+                "geoid": np.arange(n_origins),
+                "pop": rng.lognormal(8, 0.5, n_origins).round().astype(int),
+                "x": origin_xy[:, 0],
+                "y": origin_xy[:, 1],
+            }
+        )
+
+        near = rng.integers(n_origins, size=n_facilities)
+        facility_xy = origin_xy[near] + rng.normal(scale=0.5, size=(n_facilities, 2))
+
+        supply_df = pd.DataFrame(
+            {
+                "geoid": n_origins + np.arange(n_facilities),
+                "doc": rng.negative_binomial(1, 0.2, n_facilities),
+                "dentist": rng.negative_binomial(1, 0.5, n_facilities),
+                "x": facility_xy[:, 0],
+                "y": facility_xy[:, 1],
+            }
+        )
+
+        def travel_times(from_xy, to_xy, to_ids, n_nearest):
+            n_nearest = min(n_nearest, len(to_xy))
+            dist, idx = cKDTree(to_xy).query(from_xy, k=n_nearest)
+            dist, idx = dist.reshape(-1), idx.reshape(-1)
+
+            # Longer trips use faster roads: ~20 km/h in town up to ~70 km/h.
+            speed = 20 + 50 * (1 - np.exp(-dist / 15))
+            minutes = 2 + 60 * 1.3 * dist / speed
+            minutes *= rng.lognormal(0, 0.1, len(dist))
+
+            return pd.DataFrame(
+                {
+                    "origin": np.repeat(demand_df["geoid"].to_numpy(), n_nearest),
+                    "dest": to_ids[idx],
+                    "cost": minutes.round(2),
+                }
+            )
+
+        cost_df = travel_times(origin_xy, facility_xy, supply_df["geoid"].to_numpy(), k)
+        neighbor_cost_df = travel_times(
+            origin_xy, origin_xy, demand_df["geoid"].to_numpy(), neighbor_k
+        )
+
+        return demand_df, supply_df, cost_df, neighbor_cost_df
+
     @staticmethod
     def available_datasets():
         desc = """
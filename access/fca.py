@@ -1,7 +1,42 @@
 import warnings
+from collections import namedtuple
 
+import numpy as np
 import pandas as pd
 
+from . import kernels
+from .costs import PartitionedCosts, SortedCostIndex
+from .profiling import record_rows, stage
+
+
+class DemandStage(
+    namedtuple(
+        "DemandStage", ["matrix", "origin_ids", "dest_ids", "load", "served", "reached"]
+    )
+):
+    """
+    Demand stage of a floating catchment area, shared by all supply types:
+    the catchment `matrix` (origins by destinations) with the IDs of its rows and columns,
+    the demand within the catchment of each destination (`load`),
+    the destinations reached by listed demand locations (`served`),
+    and the origins reaching those (`reached`).
+    """  # noqa: E501
+
+    __slots__ = ()
+
+    def facility_demand(self):
+        """
+        The demand within the catchment of each served destination, as a Series,
+        or a DataFrame with one column per weight function, for several.
+        """
+
+        load = self.load[self.served]
+        index = self.dest_ids[self.served]
+        if load.ndim == 2:
+            return pd.DataFrame(load, index=index)
+
+        return pd.Series(load, index=index)
+
 
 def weighted_catchment(
     loc_df,
@@ -14,6 +49,7 @@ def weighted_catchment(
     loc_value=None,
     weight_fn=None,
     three_stage_weight=None,
+    weights=None,
 ):
     """
     Calculation of the floating catchment (buffered) accessibility
@@ -33,8 +69,12 @@ def weighted_catchment(
     loc_value   : str
                  If this value is `None`, a count will be used in place of a weight.
                  Use this, for instance, to count restaurants, instead of total doctors in a practice.
-    cost_df    : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_
+    cost_df    : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_, :class:`access.costs.PartitionedCosts` or :class:`access.costs.SortedCostIndex`
                  This dataframe contains the precomputed costs from an origin/index location to destinations.
+                 The sum is a sparse matrix-vector product over the catchment (see :func:`access.kernels.catchment`).
+                 If it is partitioned on disk, the partitions are streamed one at a time
+                 and the partial sums are accumulated.
+                 If it is a sorted index, `max_cost` is applied by binary search within each row.
     cost_source : str
                  The name of the column name of the index locations -- this is what will be grouped.
     cost_dest  : str
@@ -48,6 +88,9 @@ def weighted_catchment(
     max_cost   : float
                  This is the maximum cost to consider in the weighted sum;
                  note that it applies _along with_ the weight function.
+    weights    : numpy.ndarray
+                 Precomputed values of `weight_fn` for each row of `cost_df`, in order.
+                 If given, they are used instead of evaluating `weight_fn`.
 
     Returns
     -------
@@ -55,26 +98,267 @@ def weighted_catchment(
                  A -- potentially weighted -- sum of resources, facilities, or consumers.
     """  # noqa: E501
 
-    # merge the loc dataframe and cost dataframe together
-    if loc_index is True:
-        temp = pd.merge(cost_df, loc_df, left_on=cost_source, right_index=True)
+    if isinstance(cost_df, SortedCostIndex):
+        if three_stage_weight is not None or weights is not None:
+            raise TypeError(
+                "Precomputed or three-stage weights cannot be used with an index."
+            )
+
+        return _indexed_catchment(
+            loc_df,
+            cost_df,
+            max_cost,
+            cost_source,
+            cost_dest,
+            loc_index,
+            loc_value,
+            weight_fn,
+        )
+
+    if isinstance(cost_df, PartitionedCosts):
+        if weights is not None:
+            raise TypeError(
+                "Precomputed weights cannot be used with partitioned costs."
+            )
+
+        # Each partition holds a disjoint set of rows, so the group sums
+        # of the full table are the sums of the per-partition group sums.
+        partial_sums = [
+            weighted_catchment(
+                loc_df,
+                part,
+                max_cost=None,
+                cost_source=cost_source,
+                cost_dest=cost_dest,
+                cost_cost=cost_cost,
+                loc_index=loc_index,
+                loc_value=loc_value,
+                weight_fn=weight_fn,
+                three_stage_weight=three_stage_weight,
+            )
+            for part in cost_df.iter_partitions(
+                columns=[cost_source, cost_dest, cost_cost],
+                cost_name=cost_cost,
+                max_cost=max_cost,
+            )
+        ]
+        if not partial_sums:
+            return pd.Series(name=loc_value, dtype=float)
+
+        return pd.concat(partial_sums).groupby(level=0).sum()
+
+    if three_stage_weight is not None and weights is None and weight_fn:
+        weights = (cost_df["W3"] * cost_df["G"]).to_numpy()
+
+    # Rows of the catchment are the summed locations, and columns the groups.
+    with stage("index"):
+        matrix, source_ids, target_ids = _catchment(
+            cost_df, max_cost, cost_source, cost_dest, cost_cost, weight_fn, weights
+        )
+
+    values, present = _located(loc_df, loc_index, loc_value, source_ids)
+    record_rows(np.diff(matrix.indptr)[present].sum())
+
+    with stage("aggregate"):
+        totals = kernels.facility_demand(matrix, values)
+
+        # As in a merge of the tables, report every target reached by a listed location.
+        structure = matrix.copy()
+        structure.data = np.ones_like(structure.data)
+        reached = (structure.T @ present.astype(float)) > 0
+
+    return pd.Series(
+        totals[reached],
+        index=pd.Index(target_ids[reached], name=cost_dest),
+        name=loc_value,
+    )
+
+
+def _indexed_catchment(
+    loc_df, index, max_cost, cost_source, cost_dest, loc_index, loc_value, weight_fn
+):
+    """weighted_catchment, over a :class:`access.costs.SortedCostIndex`."""
+
+    if cost_source not in (index.cost_origin, index.cost_dest):
+        raise ValueError(f"{cost_source} is not a side of the cost index.")
+
+    with stage("filter"):
+        weights = index.to_csr(max_cost, weight_fn)
+    record_rows(weights.nnz)
+
+    # The summed side is the rows of the index when it was built from cost_source.
+    by_source = (index.by == "origin") == (cost_source == index.cost_origin)
+    if by_source:
+        source_ids, target_ids = index.row_ids, index.col_ids
+        weights = weights.T.tocsr()
     else:
-        temp = pd.merge(cost_df, loc_df, left_on=cost_source, right_on=loc_index)
-
-    # constrain by max cost
-    if max_cost is not None:
-        temp = temp[temp[cost_cost] <= max_cost].copy()
-
-    # apply a weight function if inputted -- either enhanced two stage or three stage
-    if weight_fn:
-        if three_stage_weight is not None:
-            new_loc_value_column = temp[loc_value] * temp.W3 * temp.G
-            temp = temp.drop([loc_value], axis=1)
-            temp[loc_value] = new_loc_value_column
-        else:
-            temp[loc_value] *= temp[cost_cost].apply(weight_fn)
+        source_ids, target_ids = index.col_ids, index.row_ids
+
+    values, present = _located(loc_df, loc_index, loc_value, source_ids)
+
+    with stage("aggregate"):
+        totals = weights @ values
+
+        # Like the merge, report every target reached by at least one listed location.
+        structure = weights.copy()
+        structure.data = np.ones_like(structure.data)
+        reached = (structure @ present.astype(float)) > 0
+
+    return pd.Series(
+        totals[reached],
+        index=pd.Index(target_ids[reached], name=cost_dest),
+        name=loc_value,
+    )
+
+
+def _located(loc_df, loc_index, loc_value, ids):
+    """
+    Values of `loc_value` in the order of `ids` -- summed over repeated locations,
+    and 0 where missing -- and whether each ID is listed in `loc_df`.
+    """
+
+    # As in a merge, loc_index may also name the index of loc_df.
+    if loc_index is not True and loc_index in loc_df.columns:
+        loc_df = loc_df.set_index(loc_index)
+    values = loc_df[loc_value].groupby(level=0).sum()
+    listed = pd.Index(ids).isin(values.index)
 
-    return temp.groupby([cost_dest])[loc_value].sum()
+    return values.reindex(ids).fillna(0).to_numpy(dtype=float), listed
+
+
+def _catchment(
+    cost_df, max_cost, cost_origin, cost_dest, cost_name, weight_fn, weights
+):
+    """
+    Catchment matrix of a cost table or index, from origins (rows) to destinations (columns),
+    with the IDs of both (see :func:`access.kernels.catchment`).
+    """  # noqa: E501
+
+    if isinstance(cost_df, SortedCostIndex):
+        if weights is not None:
+            raise TypeError("Precomputed weights cannot be used with an index.")
+
+        matrix = cost_df.to_csr(max_cost, weight_fn)
+        if cost_df.by == "dest":
+            matrix = matrix.T.tocsr()
+
+        return matrix, cost_df.origin_ids, cost_df.dest_ids
+
+    origin, origin_ids = pd.factorize(cost_df[cost_origin], sort=True)
+    dest, dest_ids = pd.factorize(cost_df[cost_dest], sort=True)
+    matrix = kernels.catchment(
+        origin,
+        dest,
+        cost_df[cost_name].to_numpy(),
+        shape=(len(origin_ids), len(dest_ids)),
+        max_cost=max_cost,
+        weight_fn=weight_fn,
+        weights=weights,
+    )
+
+    return matrix, np.asarray(origin_ids), np.asarray(dest_ids)
+
+
+def _stacked_catchment(
+    cost_df, max_cost, cost_origin, cost_dest, cost_name, weight_fns, weights
+):
+    """
+    Catchment matrix of several weight functions (see :func:`access.kernels.stacked_catchment`),
+    with the catchment itself -- the pairs within `max_cost` -- and the origin and destination IDs.
+    """  # noqa: E501
+
+    if isinstance(cost_df, SortedCostIndex):
+        if weights is not None:
+            raise TypeError("Precomputed weights cannot be used with an index.")
+
+        positions, indptr = cost_df.select(max_cost)
+        rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        cols = cost_df.cols[positions]
+        if cost_df.by == "dest":
+            rows, cols = cols, rows
+        origin_ids, dest_ids = cost_df.origin_ids, cost_df.dest_ids
+        cost = cost_df.costs[positions]
+    else:
+        rows, origin_ids = pd.factorize(cost_df[cost_origin], sort=True)
+        cols, dest_ids = pd.factorize(cost_df[cost_dest], sort=True)
+        origin_ids, dest_ids = np.asarray(origin_ids), np.asarray(dest_ids)
+        cost = cost_df[cost_name].to_numpy()
+
+    shape = (len(origin_ids), len(dest_ids))
+    matrix = kernels.stacked_catchment(
+        rows, cols, cost, weight_fns, shape=shape, max_cost=max_cost, weights=weights
+    )
+    pairs = kernels.catchment(rows, cols, cost, shape=shape, max_cost=max_cost)
+
+    return matrix, pairs, origin_ids, dest_ids
+
+
+def _demand_stage(
+    matrix, origin_ids, dest_ids, demand_df, demand_index, demand_name, pairs=None
+):
+    """
+    :class:`DemandStage` of a catchment matrix, for the demand in `demand_df`.
+    `pairs` is the catchment itself, if `matrix` may leave out some of its pairs,
+    e.g., those of zero weight, or stacks several weight functions.
+    """
+
+    if pairs is None:
+        pairs = matrix
+
+    demand, listed = _located(demand_df, demand_index, demand_name, origin_ids)
+    record_rows(np.diff(pairs.indptr)[listed].sum())
+
+    with stage("aggregate"):
+        load = kernels.facility_demand(matrix, demand)
+        if matrix.shape[1] > len(dest_ids):
+            load = load.reshape(len(dest_ids), -1)
+
+        # As in a merge of the tables, report only the destinations reached
+        # by listed demand locations, and the origins reaching those.
+        structure = pairs.copy()
+        structure.data = np.ones_like(structure.data)
+        served = (structure.T @ listed) > 0
+        reached = (structure @ served) > 0
+
+    return DemandStage(matrix, origin_ids, dest_ids, load, served, reached)
+
+
+def preference_weights(
+    cost_df, cost_origin="origin", cost_dest="dest", cost_name="cost", weight_fn=None
+):
+    """
+    Preference weights *G* of the three-stage floating catchment area (see :func:`three_stage_fca`),
+    as a sparse matrix from origins (rows) to destinations (columns):
+    the weight of each destination from an origin, divided by the sum of that origin's weights
+    over every destination in `cost_df` (see :func:`access.kernels.preference_weights`).
+    They depend only on the costs and the weight function, not on `max_cost`, demand or supply.
+
+    Parameters
+    ----------
+
+    cost_df       : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_ or :class:`access.costs.SortedCostIndex`
+                    Long-format table of costs from origins to destinations.
+    cost_origin   : str
+                    The column name of the locations of users or consumers.
+    cost_dest     : str
+                    The column name of the supply or resource locations.
+    cost_name     : str
+                    The column name of the travel cost between origins and destinations
+    weight_fn     : function
+                    This function will weight each pair, as a function of the raw cost.
+
+    Returns
+    -------
+    preference    : tuple
+                    The matrix of preference weights (a :class:`scipy.sparse.csr_matrix`),
+                    and the origin and destination IDs of its rows and columns.
+    """  # noqa: E501
+
+    matrix, origin_ids, dest_ids = _catchment(
+        cost_df, None, cost_origin, cost_dest, cost_name, weight_fn, None
+    )
+
+    return kernels.preference_weights(matrix), origin_ids, dest_ids
 
 
 def fca_ratio(
@@ -96,6 +380,7 @@ def fca_ratio(
     weight_fn=None,
     normalize=False,  # noqa: ARG001
     noise="quiet",
+    cache=None,
 ):
     """Calculation of the floating catchment accessibility
     ratio, from DataFrames with precomputed distances.
@@ -108,10 +393,12 @@ def fca_ratio(
                          The origins dataframe, containing a location index and a total demand.
     supply_df          : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_
                          The origins dataframe, containing a location index and level of supply
-    demand_cost_df     : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_
+    demand_cost_df     : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_ or :class:`access.costs.PartitionedCosts`
                          This dataframe contains a link between neighboring demand locations, and a cost between them.
-    supply_cost_df     : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_
+    supply_cost_df     : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_ or :class:`access.costs.PartitionedCosts`
                          This dataframe contains a link between neighboring supply locations, and a cost between them.
+                         Either cost table may be partitioned by origin on disk (see :func:`access.costs.partition_costs`),
+                         in which case each is streamed one partition at a time.
     max_cost           : float
                          This is the maximum cost to consider in the weighted sum;
                          note that it applies *along with* the weight function.
@@ -142,6 +429,10 @@ def fca_ratio(
                          True to normalize the FCA series, by default False.
     noise              : str
                          Default 'quiet', otherwise gives messages that indicate potential issues.
+    cache              : dict-like
+                         Store for the total demand within the buffer of each demand location
+                         (key ``"neighbor_demand"``), which does not depend on the supply;
+                         see :func:`two_stage_fca`.
 
     Returns
     -------
@@ -151,39 +442,46 @@ def fca_ratio(
 
     # if there is a discrepancy between the demand and
     # supply cost dataframe locations, print it
-    if (
-        len(
-            set(demand_df.index.tolist())
-            - set(supply_cost_df[supply_cost_dest].unique())
-        )
-        != 0
-    ):
+    if isinstance(supply_cost_df, PartitionedCosts):
+        supply_cost_dests = supply_cost_df.unique(supply_cost_dest)
+    else:
+        supply_cost_dests = set(supply_cost_df[supply_cost_dest].unique())
+
+    if len(set(demand_df.index.tolist()) - supply_cost_dests) != 0:
         warnings.warn("some tracts may be unaccounted for in supply_cost", stacklevel=1)
 
+    if cache is None:
+        cache = {}
+
     # get a series of the total demand within the buffer zone
-    total_demand_series = weighted_catchment(
-        demand_df,
-        demand_cost_df,
-        max_cost,
-        cost_source=demand_cost_dest,
-        cost_dest=demand_cost_origin,
-        cost_cost=demand_cost_name,
-        loc_index=demand_index,
-        loc_value=demand_name,
-        weight_fn=weight_fn,
-    )
+    total_demand_series = cache.get("neighbor_demand")
+    if total_demand_series is None:
+        with stage("demand"):
+            total_demand_series = weighted_catchment(
+                demand_df,
+                demand_cost_df,
+                max_cost,
+                cost_source=demand_cost_dest,
+                cost_dest=demand_cost_origin,
+                cost_cost=demand_cost_name,
+                loc_index=demand_index,
+                loc_value=demand_name,
+                weight_fn=weight_fn,
+            )
+        cache["neighbor_demand"] = total_demand_series
     # get a series of the total supply within the buffer zone
-    total_supply_series = weighted_catchment(
-        supply_df,
-        supply_cost_df,
-        max_cost,
-        cost_source=supply_cost_dest,
-        cost_dest=supply_cost_origin,
-        cost_cost=supply_cost_name,
-        loc_index=supply_index,
-        loc_value=supply_name,
-        weight_fn=weight_fn,
-    )
+    with stage("supply"):
+        total_supply_series = weighted_catchment(
+            supply_df,
+            supply_cost_df,
+            max_cost,
+            cost_source=supply_cost_dest,
+            cost_dest=supply_cost_origin,
+            cost_cost=supply_cost_name,
+            loc_index=supply_index,
+            loc_value=supply_name,
+            weight_fn=weight_fn,
+        )
 
     # join the aggregate demand and the aggregate supply into one dataframe
     temp = (
@@ -218,6 +516,8 @@ def two_stage_fca(
     cost_name="cost",
     weight_fn=None,
     normalize=False,  # noqa: ARG001
+    weights=None,
+    cache=None,
 ):
     """
     Calculation of the two-stage floating catchment accessibility
@@ -229,6 +529,8 @@ def two_stage_fca(
     This is based on the original paper by Luo and Wang :cite:`2002_luo_spatial_accessibility_chicago`,
     as extended by Luo and Qi :cite:`2009_luo_qi_E2SFCA`
     and McGrail and Humphreys :cite:`2009_mcgrail_improved_2SFCA`.
+    The IDs are coded as integers, and both stages are computed on arrays by :mod:`access.kernels`
+    (see :func:`access.kernels.two_stage_fca`).
 
     Parameters
     ----------
@@ -245,46 +547,175 @@ def two_stage_fca(
                     is the name of the column of `supply_df` that holds the origin ID.
     supply_value  : str
                     is the name of the column of `supply_df` that holds the aggregate demand at a location.
-    cost_df       : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_
+    cost_df       : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_, :class:`access.costs.PartitionedCosts` or :class:`access.costs.SortedCostIndex`
                     This dataframe contains a link between neighboring demand locations, and a cost between them.
+                    If it is partitioned by origin on disk (see :func:`access.costs.partition_costs`),
+                    the facility totals of the demand stage are accumulated in a first pass over the partitions,
+                    and access is computed partition by partition in a second pass.
+                    With a sorted index, both stages select the catchment by binary search (see :func:`weighted_catchment`).
     cost_origin   : str
                     The column name of the locations of users or consumers.
     cost_dest     : str
                     The column name of the supply or resource locations.
     cost_name     : str
                     The column name of the travel cost between origins and destinations
-    weight_fn  : function
+    weight_fn  : {function, list}
                  This fucntion will weight the value of resources/facilities,
                  as a function of the raw cost.
+                 With a list of functions, e.g., to compare step, gaussian and gravity decay,
+                 their catchments are stacked in one sparse matrix, built once,
+                 and each stage is a single product for all of them (see :func:`access.kernels.stacked_catchment`).
+                 Not supported with partitioned costs.
     max_cost   : float
                  This is the maximum cost to consider in the weighted sum;
                    note that it applies _along with_ the weight function.
     normalize  : bool
                   True to normalize the FCA series, by default False.
+    weights    : numpy.ndarray
+                 Precomputed values of `weight_fn` for each row of `cost_df`
+                 (see :func:`weighted_catchment`), with one column per function for a list.
+    cache      : dict-like
+                 Store for the demand stage -- the catchments and facility demand totals,
+                 as a :class:`DemandStage` under the key ``"demand"``,
+                 or as a Series of the facility totals with partitioned costs --
+                 supporting ``get`` and item assignment.
+                 It does not depend on the supply, so one store serves every supply type.
+                 A stage found there is reused; one computed is added.
+                 The caller is responsible for keying it on everything else the stage depends on
+                 (see :class:`access.cache.CatchmentCache`).
+
     Returns
     -------
-    access     : pandas.Series
-                 A -- potentially-weighted -- two-stage access ratio.
+    access     : {pandas.Series, pandas.DataFrame}
+                 A -- potentially-weighted -- two-stage access ratio;
+                 with a list of weight functions, a DataFrame with one column per function, in order.
     """  # noqa: E501
 
+    if isinstance(cost_df, PartitionedCosts):
+        if isinstance(weight_fn, (list, tuple)):
+            raise TypeError(
+                "Several weight functions cannot be used with partitioned costs."
+            )
+
+        return _partitioned_two_stage_fca(
+            demand_df,
+            supply_df,
+            cost_df,
+            max_cost,
+            demand_index,
+            demand_name,
+            supply_name,
+            cost_origin,
+            cost_dest,
+            cost_name,
+            weight_fn,
+            cache,
+        )
+
+    if cache is None:
+        cache = {}
+
+    stacked = isinstance(weight_fn, (list, tuple))
+
+    # The catchments and the demand in each are shared by all supply types.
+    demand_stage = cache.get("demand")
+    if demand_stage is None:
+        with stage("demand"):
+            with stage("index"):
+                if stacked:
+                    matrix, pairs, origin_ids, dest_ids = _stacked_catchment(
+                        cost_df,
+                        max_cost,
+                        cost_origin,
+                        cost_dest,
+                        cost_name,
+                        weight_fn,
+                        weights,
+                    )
+                else:
+                    pairs = None
+                    matrix, origin_ids, dest_ids = _catchment(
+                        cost_df,
+                        max_cost,
+                        cost_origin,
+                        cost_dest,
+                        cost_name,
+                        weight_fn,
+                        weights,
+                    )
+            demand_stage = _demand_stage(
+                matrix,
+                origin_ids,
+                dest_ids,
+                demand_df,
+                demand_index,
+                demand_name,
+                pairs=pairs,
+            )
+        cache["demand"] = demand_stage
+
+    matrix, origin_ids, dest_ids, load, served, reached = demand_stage
+    index = pd.Index(origin_ids[reached], name=cost_origin)
+
+    supply, _ = _located(supply_df, True, supply_name, dest_ids)
+
+    if stacked:
+        ratio = np.where(
+            served[:, None], kernels.supply_ratio(load, supply[:, None]), 0
+        )
+        with stage("supply"), stage("aggregate"):
+            access = kernels.stacked_access(matrix, ratio)
+
+        return pd.DataFrame(access[reached], index=index)
+
+    ratio = np.where(served, kernels.supply_ratio(load, supply), 0)
+
+    with stage("supply"), stage("aggregate"):
+        access = kernels.two_stage_access(matrix, ratio)
+
+    return pd.Series(access[reached], index=index, name=supply_name)
+
+
+def _partitioned_two_stage_fca(
+    demand_df,
+    supply_df,
+    cost_df,
+    max_cost,
+    demand_index,
+    demand_name,
+    supply_name,
+    cost_origin,
+    cost_dest,
+    cost_name,
+    weight_fn,
+    cache,
+):
+    """two_stage_fca, streaming the partitions of a :class:`access.costs.PartitionedCosts`."""  # noqa: E501
+
+    if cache is None:
+        cache = {}
+
     # get a series of total demand then calculate the
     # supply to total demand ratio for each location
-    total_demand_series = weighted_catchment(
-        demand_df,
-        cost_df,
-        max_cost,
-        cost_source=cost_origin,
-        cost_dest=cost_dest,
-        cost_cost=cost_name,
-        loc_index=demand_index,
-        loc_value=demand_name,
-        weight_fn=weight_fn,
-    )
+    total_demand_series = cache.get("demand")
+    if total_demand_series is None:
+        with stage("demand"):
+            total_demand_series = weighted_catchment(
+                demand_df,
+                cost_df,
+                max_cost,
+                cost_source=cost_origin,
+                cost_dest=cost_dest,
+                cost_cost=cost_name,
+                loc_index=demand_index,
+                loc_value=demand_name,
+                weight_fn=weight_fn,
+            )
+        cache["demand"] = total_demand_series
 
     # create a temporary dataframe, temp, that holds
     # the supply and aggregate demand at each location
-    total_demand_series.name += "_W"
-    temp = supply_df.join(total_demand_series, how="right")
+    temp = supply_df.join(total_demand_series.rename(demand_name + "_W"), how="right")
 
     # there may be NA values due to a shorter supply dataframe than the demand
     # dataframe. in this case, replace any potential NA values(which correspond
@@ -301,17 +732,18 @@ def two_stage_fca(
     supply_to_total_demand_frame.index.name = "geoid"
 
     # sum, into a series, the supply to total demand ratios for each location
-    two_stage_fca_series = weighted_catchment(
-        supply_to_total_demand_frame,
-        cost_df,
-        max_cost,
-        cost_source=cost_dest,
-        cost_dest=cost_origin,
-        cost_cost=cost_name,
-        loc_index="geoid",
-        loc_value="Rl",
-        weight_fn=weight_fn,
-    )
+    with stage("supply"):
+        two_stage_fca_series = weighted_catchment(
+            supply_to_total_demand_frame,
+            cost_df,
+            max_cost,
+            cost_source=cost_dest,
+            cost_dest=cost_origin,
+            cost_cost=cost_name,
+            loc_index="geoid",
+            loc_value="Rl",
+            weight_fn=weight_fn,
+        )
 
     return two_stage_fca_series
 
@@ -330,11 +762,12 @@ def three_stage_fca(
     cost_name="cost",
     weight_fn=None,
     normalize=False,  # noqa: ARG001
+    preference=None,
+    cache=None,
 ):
     """Calculation of the three-stage floating catchment accessibility
     ratio, from DataFrames with precomputed distances.
-    This is accomplished through a single call of the :meth:`access.access.weighted_catchment` method,
-    to retrieve the patients using each provider.
+    The patients using each provider are summed at each care destination.
     The ratio of providers per patient is then calculated at each care destination,
     and that ratio is weighted and summed at each corresponding demand site.
     The only difference weight respect to the 2SFCA method is that,
@@ -342,6 +775,8 @@ def three_stage_fca(
     a preference weight *G* is calculated.  That calculation
     uses the value :math:`\\beta`.
     See the original paper by Wan, Zou, and Sternberg. :cite:`2012_wan_3SFCA`
+    Both the weights and *G* are sparse matrices (see :func:`preference_weights`),
+    so `cost_df` is neither copied nor modified.
 
     Parameters
     ----------
@@ -373,6 +808,14 @@ def three_stage_fca(
     preference_weight_beta : float
                              Parameter scaling with the gaussian weights,
                              used to generate preference weights.
+    preference : tuple or callable
+                 Precomputed preference weights *G* for `cost_df` and `weight_fn`, from :func:`preference_weights`,
+                 or a function without arguments returning them, only called if the demand stage is not in `cache`.
+                 They do not depend on `max_cost`, so they may be reused across catchment sizes.
+    cache      : dict-like
+                 Store for the demand stage -- the preference-weighted catchments and facility demand totals,
+                 as a :class:`DemandStage` under the key ``"three_stage_demand"`` --
+                 which does not depend on the supply; see :func:`two_stage_fca`.
 
     Returns
     -------
@@ -380,67 +823,560 @@ def three_stage_fca(
                  A -- potentially-weighted -- three-stage access ratio.
     """  # noqa: E501
 
-    # create preference weight 'G', which is the weight
-    cost_df["W3"] = cost_df[cost_name].apply(weight_fn)
-    w3_sum_frame = (
-        cost_df[[cost_origin, "W3"]]
-        .groupby(cost_origin)
-        .sum()
-        .rename(columns={"W3": "W3sum"})
-        .reset_index()
+    if isinstance(cost_df, PartitionedCosts):
+        raise TypeError("three_stage_fca does not support partitioned costs.")
+
+    if cache is None:
+        cache = {}
+
+    # The preference-weighted catchments and the demand in each
+    # are shared by all supply types.
+    demand_stage = cache.get("three_stage_demand")
+    if demand_stage is None:
+        if callable(preference):
+            preference = preference()
+        if preference is None:
+            with stage("preference"):
+                preference = preference_weights(
+                    cost_df, cost_origin, cost_dest, cost_name, weight_fn
+                )
+
+        with stage("demand"):
+            with stage("index"):
+                pairs, origin_ids, dest_ids = _catchment(
+                    cost_df,
+                    max_cost,
+                    cost_origin,
+                    cost_dest,
+                    cost_name,
+                    weight_fn,
+                    None,
+                )
+                # Both stages weight each pair by its weight times its preference.
+                matrix = pairs.multiply(preference[0]).tocsr()
+            demand_stage = _demand_stage(
+                matrix,
+                origin_ids,
+                dest_ids,
+                demand_df,
+                demand_index,
+                demand_name,
+                pairs=pairs,
+            )
+        cache["three_stage_demand"] = demand_stage
+
+    matrix, origin_ids, dest_ids, load, served, reached = demand_stage
+
+    supply, _ = _located(supply_df, True, supply_name, dest_ids)
+    ratio = np.where(served, kernels.supply_ratio(load, supply), 0)
+
+    # Origins reaching only pairs of zero weight have an access of 0, not NaN.
+    with stage("supply"), stage("aggregate"):
+        access = matrix @ ratio
+
+    return pd.Series(
+        access[reached],
+        index=pd.Index(origin_ids[reached], name=cost_origin),
+        name=supply_name,
     )
-    cost_df = pd.merge(cost_df, w3_sum_frame)
-    cost_df["G"] = cost_df.W3 / cost_df.W3sum
-
-    # get a series of total demand then calculate
-    # the supply to total demand ratio for each location
-    total_demand_series = weighted_catchment(
-        demand_df,
-        cost_df,
-        max_cost,
-        cost_source=cost_origin,
-        cost_dest=cost_dest,
-        cost_cost=cost_name,
-        loc_index=demand_index,
-        loc_value=demand_name,
+
+
+def catchment_matrix(
+    cost_df,
+    origins,
+    dests,
+    max_cost=None,
+    cost_origin="origin",
+    cost_dest="dest",
+    cost_name="cost",
+    weight_fn=None,
+):
+    """
+    Sparse matrix of catchment weights, from a long-format cost table.
+    Entry :math:`(i, j)` is the weight of destination :math:`j` seen from origin :math:`i`:
+    1 (or `weight_fn` of the cost) if the pair is within `max_cost`, and not stored otherwise.
+    Rows of `cost_df` whose origin or destination is not listed are ignored.
+
+    Parameters
+    ----------
+
+    cost_df       : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_ or :class:`access.costs.SortedCostIndex`
+                    Long-format table of costs from origins to destinations.
+                    With a sorted index, `max_cost` is found by binary search instead of a scan.
+    origins       : array-like
+                    Origin IDs, in the order of the matrix rows.
+    dests         : array-like
+                    Destination IDs, in the order of the matrix columns.
+    max_cost      : float
+                    This is the maximum cost to consider;
+                    note that it applies *along with* the weight function.
+    cost_origin   : str
+                    The column name of the origin locations.
+    cost_dest     : str
+                    The column name of the destination locations.
+    cost_name     : str
+                    The column name of the travel cost between origins and destinations.
+    weight_fn     : function
+                    This function will weight each pair, as a function of the raw cost.
+
+    Returns
+    -------
+    weights       : scipy.sparse.csr_matrix
+                    Matrix of shape (len(origins), len(dests)).
+    """  # noqa: E501
+
+    if isinstance(cost_df, SortedCostIndex):
+        return cost_df.matrix(origins, dests, max_cost, weight_fn)
+
+    return kernels.catchment(
+        pd.Index(origins).get_indexer(cost_df[cost_origin]),
+        pd.Index(dests).get_indexer(cost_df[cost_dest]),
+        cost_df[cost_name].to_numpy(),
+        shape=(len(origins), len(dests)),
+        max_cost=max_cost,
         weight_fn=weight_fn,
-        three_stage_weight=True,
     )
 
-    # create a temporary dataframe, temp, that holds the
-    # supply and aggregate demand at each location
-    total_demand_series.name += "_W"
-    temp = supply_df.join(total_demand_series, how="right")
 
-    # there may be NA values due to a shorter supply dataframe than the demand
-    # dataframe. in this case, replace any potential NA values(which correspond
-    # to supply locations with no supply) with 0.
-    temp[supply_name] = temp[supply_name].fillna(0)
+def two_stage_fca_draws(
+    demand_draws,
+    supply_draws,
+    cost_df,
+    max_cost=None,
+    cost_origin="origin",
+    cost_dest="dest",
+    cost_name="cost",
+    weight_fn=None,
+):
+    """
+    Evaluate the two-stage floating catchment ratio for many draws of demand and supply at once.
+    The catchment weights are built a single time, as a sparse matrix :math:`W`,
+    and each stage is one sparse-dense product over all draws:
+    :math:`R = S / (W^T D)`, then :math:`A = W R`.
+    With a single, unperturbed draw, this reproduces :func:`two_stage_fca`.
 
-    # calculate the fractional ratio of supply
-    #  to aggregate demand at each location, or Rl
-    temp["Rl"] = temp[supply_name] / temp[demand_name + "_W"]
+    Parameters
+    ----------
 
-    # separate the fractional ratio of supply
-    # to aggregate demand at each location, or Rl, into a new dataframe
-    supply_to_total_demand_frame = pd.DataFrame(data={"Rl": temp["Rl"]})
-    supply_to_total_demand_frame.index.name = "geoid"
+    demand_draws  : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_
+                    Demand, indexed by origin location, with one column per draw.
+    supply_draws  : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_
+                    Supply, indexed by destination location, with the same columns as `demand_draws`.
+    cost_df       : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_ or :class:`access.costs.SortedCostIndex`
+                    This dataframe contains a link between neighboring demand locations, and a cost between them.
+    max_cost      : float
+                    This is the maximum cost to consider in the weighted sum;
+                    note that it applies *along with* the weight function.
+    cost_origin   : str
+                    The column name of the locations of users or consumers.
+    cost_dest     : str
+                    The column name of the supply or resource locations.
+    cost_name     : str
+                    The column name of the travel cost between origins and destinations
+    weight_fn     : function
+                    This function will weight the value of resources/facilities,
+                    as a function of the raw cost.
 
-    # sum, into a series, the supply to total demand ratios for each location
-    three_stage_fca_series = weighted_catchment(
-        supply_to_total_demand_frame,
-        cost_df.sort_index(),
-        max_cost,
-        cost_source=cost_dest,
-        cost_dest=cost_origin,
-        cost_cost=cost_name,
-        loc_index="geoid",
-        loc_value="Rl",
-        weight_fn=weight_fn,
-        three_stage_weight=True,
+    Returns
+    -------
+    access        : pandas.DataFrame
+                    Two-stage access ratio for each origin (rows) and draw (columns).
+                    Origins without any destination in their catchment are NaN.
+    """  # noqa: E501
+
+    if isinstance(cost_df, SortedCostIndex):
+        dests = pd.Index(cost_df.dest_ids)
+    else:
+        dests = pd.Index(cost_df[cost_dest].dropna().unique())
+
+    with stage("index"):
+        weights = catchment_matrix(
+            cost_df,
+            demand_draws.index,
+            dests,
+            max_cost=max_cost,
+            cost_origin=cost_origin,
+            cost_dest=cost_dest,
+            cost_name=cost_name,
+            weight_fn=weight_fn,
+        )
+    record_rows(weights.nnz)
+
+    demand = demand_draws.to_numpy(dtype=float)
+    supply = supply_draws.reindex(dests).fillna(0).to_numpy(dtype=float)
+
+    with stage("demand"):
+        ratio = kernels.supply_ratio(kernels.facility_demand(weights, demand), supply)
+
+    with stage("supply"):
+        access = kernels.two_stage_access(weights, ratio)
+
+    return pd.DataFrame(access, index=demand_draws.index, columns=demand_draws.columns)
+
+
+def cumulative_opportunities(
+    supply_df,
+    cost_df,
+    thresholds,
+    supply_names="supply",
+    cost_origin="origin",
+    cost_dest="dest",
+    cost_name="cost",
+):
+    """
+    Cumulative opportunities: the supply reachable from each origin, within each of several thresholds.
+    With the costs of each origin sorted (see :class:`access.costs.SortedCostIndex`),
+    the supply of every row is accumulated once, as a running sum,
+    and the total within any threshold is the difference of that sum at two offsets
+    found by binary search.
+    Adding thresholds thus adds only a search, rather than a filter, merge and group-by each.
+
+    Parameters
+    ----------
+
+    supply_df     : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_
+                    The supply, indexed by location.
+    cost_df       : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_ or :class:`access.costs.SortedCostIndex`
+                    Costs from origins to supply locations. A DataFrame is indexed first;
+                    an index must be grouped by origin.
+    thresholds    : list
+                    Cost thresholds, e.g., ``range(5, 61, 5)``.
+    supply_names  : {str, list}
+                    The column(s) of `supply_df` to accumulate.
+    cost_origin   : str
+                    The column name of the origin locations.
+    cost_dest     : str
+                    The column name of the supply locations.
+    cost_name     : str
+                    The column name of the travel cost.
+
+    Returns
+    -------
+    opportunities : pandas.DataFrame
+                    Supply within each threshold, for each origin of the cost table (rows),
+                    with columns indexed by supply name and threshold.
+    """  # noqa: E501
+
+    if type(supply_names) is str:
+        supply_names = [supply_names]
+
+    if not isinstance(cost_df, SortedCostIndex):
+        with stage("index"):
+            cost_df = SortedCostIndex.from_frame(
+                cost_df, cost_origin, cost_dest, cost_name
+            )
+
+    if cost_df.by != "origin":
+        raise ValueError("Cumulative opportunities need an index grouped by origin.")
+
+    supply = supply_df[supply_names].reindex(cost_df.col_ids).fillna(0)
+    supply = supply.to_numpy(dtype=float)
+
+    # prefix[i] is the total supply of the first i entries, across all rows.
+    with stage("prefix"):
+        prefix = np.zeros((len(cost_df) + 1, len(supply_names)))
+        np.cumsum(supply[cost_df.cols], axis=0, out=prefix[1:])
+        starts = prefix[cost_df.indptr[:-1]]
+    record_rows(len(cost_df))
+
+    columns = {}
+    with stage("search"):
+        for t in thresholds:
+            within = prefix[cost_df.cutoffs(t)] - starts
+            for j, s in enumerate(supply_names):
+                columns[(s, t)] = within[:, j]
+
+    return pd.DataFrame(columns, index=pd.Index(cost_df.row_ids, name=cost_origin))
+
+
+def nearest(
+    supply_df,
+    cost_df,
+    k=1,
+    supply_names="supply",
+    cost_origin="origin",
+    cost_dest="dest",
+    cost_name="cost",
+):
+    """
+    Cost to the nearest supply location, or mean cost to the `k` nearest, from each origin.
+    Only locations with positive supply count.
+    The costs of each origin are already sorted in a :class:`access.costs.SortedCostIndex`,
+    so the `k` nearest are simply the first `k` entries with supply, in each row:
+    no per-origin sorting or partitioning is needed.
+
+    Parameters
+    ----------
+
+    supply_df     : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_
+                    The supply, indexed by location.
+    cost_df       : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_ or :class:`access.costs.SortedCostIndex`
+                    Costs from origins to supply locations. A DataFrame is indexed first;
+                    an index must be grouped by origin.
+    k             : {int, list}
+                    Number(s) of nearest locations to average over; 1 is the nearest.
+    supply_names  : {str, list}
+                    The column(s) of `supply_df` holding the supply.
+    cost_origin   : str
+                    The column name of the origin locations.
+    cost_dest     : str
+                    The column name of the supply locations.
+    cost_name     : str
+                    The column name of the travel cost.
+
+    Returns
+    -------
+    nearest       : pandas.DataFrame
+                    Mean cost to the `k` nearest locations with supply, for each origin of the cost table (rows),
+                    with columns indexed by supply name and `k`.
+                    Origins that reach fewer than `k` such locations are NaN.
+    """  # noqa: E501
+
+    if type(supply_names) is str:
+        supply_names = [supply_names]
+    ks = [k] if np.isscalar(k) else list(k)
+    if any(n < 1 for n in ks):
+        raise ValueError("k must be at least 1.")
+
+    if not isinstance(cost_df, SortedCostIndex):
+        with stage("index"):
+            cost_df = SortedCostIndex.from_frame(
+                cost_df, cost_origin, cost_dest, cost_name
+            )
+
+    if cost_df.by != "origin":
+        raise ValueError("Nearest locations need an index grouped by origin.")
+
+    n_rows = len(cost_df.row_ids)
+    row_of = np.repeat(np.arange(n_rows), np.diff(cost_df.indptr))
+    supply = supply_df[supply_names].reindex(cost_df.col_ids).fillna(0)
+    supply = supply.to_numpy(dtype=float)
+    record_rows(len(cost_df))
+
+    columns = {}
+    for j, s in enumerate(supply_names):
+        # Entries with supply, still sorted within each row.
+        with stage("filter"):
+            valid = (supply[cost_df.cols, j] > 0) & ~np.isnan(cost_df.costs)
+            costs, rows = cost_df.costs[valid], row_of[valid]
+            counts = np.bincount(rows, minlength=n_rows)
+            starts = np.cumsum(counts) - counts
+
+        with stage("aggregate"):
+            for n in ks:
+                if n == 1:
+                    first = np.full(n_rows, np.nan)
+                    first[counts > 0] = costs[starts[counts > 0]]
+                    columns[(s, n)] = first
+                    continue
+
+                # Rank of each entry within its row; keep the first n.
+                rank = np.arange(len(costs)) - starts[rows]
+                keep = rank < n
+                sums = np.bincount(rows[keep], weights=costs[keep], minlength=n_rows)
+
+                with np.errstate(invalid="ignore"):
+                    columns[(s, n)] = np.where(counts >= n, sums / n, np.nan)
+
+    return pd.DataFrame(columns, index=pd.Index(cost_df.row_ids, name=cost_origin))
+
+
+def variable_two_stage_fca(
+    demand_df,
+    supply_df,
+    cost_df,
+    demand_threshold=None,
+    supply_threshold=None,
+    max_cost=None,
+    demand_name="demand",
+    supply_name="supply",
+    cost_origin="origin",
+    cost_dest="dest",
+    cost_name="cost",
+    weight_fn=None,
+):
+    """
+    Calculation of the variable-catchment two-stage floating catchment accessibility
+    ratio :cite:`2012_luo_whippo_VC2SFCA`.
+    Instead of a single `max_cost`, each facility's catchment grows until it covers `demand_threshold`
+    (e.g., 100,000 people), and each origin's catchment grows until it covers `supply_threshold`
+    (e.g., 100 physicians; with a supply of 1 per facility, this is the `k` nearest facilities).
+    Every catchment radius is the cost at which a running sum over the sorted costs reaches its threshold,
+    found by binary search (see :meth:`access.costs.SortedCostIndex.reach`).
+
+    Parameters
+    ----------
+
+    demand_df        : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_
+                       The demand, indexed by location.
+    supply_df        : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_
+                       The supply, indexed by location.
+    cost_df          : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_ or :class:`access.costs.SortedCostIndex`
+                       Costs from origins to supply locations.
+    demand_threshold : float
+                       Demand covered by each facility's catchment. If None, facility catchments are set by `max_cost` alone.
+    supply_threshold : float
+                       Supply covered by each origin's catchment. If None, origin catchments are set by `max_cost` alone.
+    max_cost         : float
+                       Upper bound on every catchment, if given.
+    demand_name      : str
+                       The column of `demand_df` holding the demand.
+    supply_name      : str
+                       The column of `supply_df` holding the supply.
+    cost_origin      : str
+                       The column name of the origin locations.
+    cost_dest        : str
+                       The column name of the supply locations.
+    cost_name        : str
+                       The column name of the travel cost.
+    weight_fn        : function
+                       This function will weight the value of resources/facilities,
+                       as a function of the raw cost, within the catchments.
+
+    Returns
+    -------
+    access           : pandas.Series
+                       A -- potentially-weighted -- variable-catchment two-stage access ratio,
+                       for each origin of the cost table.
+                       Origins with nothing in their catchment are NaN.
+    """  # noqa: E501
+
+    if not isinstance(cost_df, SortedCostIndex):
+        with stage("index"):
+            cost_df = SortedCostIndex.from_frame(
+                cost_df, cost_origin, cost_dest, cost_name
+            )
+
+    with stage("index"):
+        if cost_df.by == "origin":
+            by_origin, by_dest = cost_df, cost_df.transpose()
+        else:
+            by_origin, by_dest = cost_df.transpose(), cost_df
+
+    demand = demand_df[demand_name].reindex(by_origin.row_ids).fillna(0)
+    demand = demand.to_numpy(dtype=float)
+    supply = supply_df[supply_name].reindex(by_origin.col_ids).fillna(0)
+    supply = supply.to_numpy(dtype=float)
+
+    def radius(index, values, threshold):
+        if threshold is None:
+            return max_cost
+        r = index.reach(values, threshold)
+        return r if max_cost is None else np.minimum(r, max_cost)
+
+    # Facility catchments, grown until they cover demand_threshold.
+    with stage("demand"):
+        weights = by_dest.to_csr(radius(by_dest, demand, demand_threshold), weight_fn)
+        record_rows(weights.nnz)
+        total_demand = weights @ demand
+
+        # Facilities without any demand in reach serve no one.
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.where(total_demand > 0, supply / total_demand, 0)
+
+    # Origin catchments, grown until they cover supply_threshold.
+    with stage("supply"):
+        weights = by_origin.to_csr(
+            radius(by_origin, supply, supply_threshold), weight_fn
+        )
+        record_rows(weights.nnz)
+        access = weights @ ratio
+        access[weights.getnnz(axis=1) == 0] = np.nan
+
+    return pd.Series(
+        access, index=pd.Index(by_origin.row_ids, name=cost_origin), name=supply_name
     )
 
-    # remove the preference weight G from the original costs dataframe
-    cost_df.drop(columns=["G", "W3", "W3sum"], inplace=True)
 
-    return three_stage_fca_series
+def huff(
+    demand_df,
+    supply_df,
+    cost_df,
+    max_cost=None,
+    demand_name="demand",
+    supply_name="supply",
+    attractiveness=None,
+    cost_origin="origin",
+    cost_dest="dest",
+    cost_name="cost",
+    weight_fn=None,
+):
+    """
+    Calculation of a Huff-model access ratio :cite:`1963_huff_trade_areas` :cite:`2014_luo_huff_2SFCA`.
+    Each origin splits its demand across the facilities in its catchment,
+    with probabilities proportional to their attractiveness times the weighted cost,
+
+    .. math:: P_{ij} = \\frac{A_j f(c_{ij})}{\\sum_k A_k f(c_{ik})}.
+
+    The expected load of facility :math:`j` is :math:`L_j = \\sum_i P_{ij} D_i`,
+    and the access of origin :math:`i` is the supply per expected visitor over the facilities it chooses,
+    :math:`\\sum_j P_{ij} S_j / L_j`.
+    Since every unit of demand is assigned, all supply in reach of some demand is distributed.
+    This is a closed-form alternative to the iterative assignment of :func:`access.raam.raam`.
+
+    Parameters
+    ----------
+
+    demand_df        : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_
+                       The demand, indexed by location.
+    supply_df        : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_
+                       The supply, indexed by location.
+    cost_df          : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_ or :class:`access.costs.SortedCostIndex`
+                       Costs from origins to supply locations.
+    max_cost         : float
+                       Catchment size: facilities beyond it are never chosen.
+    demand_name      : str
+                       The column of `demand_df` holding the demand.
+    supply_name      : str
+                       The column of `supply_df` holding the supply.
+    attractiveness   : str
+                       The column of `supply_df` holding the attractiveness of each facility.
+                       If None, the supply itself is used.
+    cost_origin      : str
+                       The column name of the origin locations.
+    cost_dest        : str
+                       The column name of the supply locations.
+    cost_name        : str
+                       The column name of the travel cost.
+    weight_fn        : function
+                       Distance decay of the choice probabilities, as a function of the raw cost.
+                       If None, every facility in the catchment is weighted by its attractiveness alone.
+
+    Returns
+    -------
+    access           : pandas.Series
+                       The Huff-model access ratio, for each origin of the cost table.
+                       Origins with no attractive facility in their catchment are NaN.
+    """  # noqa: E501
+
+    if not isinstance(cost_df, SortedCostIndex):
+        with stage("index"):
+            cost_df = SortedCostIndex.from_frame(
+                cost_df, cost_origin, cost_dest, cost_name
+            )
+
+    if cost_df.by == "dest":
+        with stage("index"):
+            cost_df = cost_df.transpose()
+
+    demand = demand_df[demand_name].reindex(cost_df.row_ids).fillna(0)
+    demand = demand.to_numpy(dtype=float)
+    supply = supply_df[supply_name].reindex(cost_df.col_ids).fillna(0)
+    supply = supply.to_numpy(dtype=float)
+    if attractiveness is None:
+        attract = supply
+    else:
+        attract = supply_df[attractiveness].reindex(cost_df.col_ids).fillna(0)
+        attract = attract.to_numpy(dtype=float)
+
+    with stage("probability"):
+        prob = cost_df.to_csr(max_cost, weight_fn)
+        record_rows(prob.nnz)
+        prob = kernels.huff_probabilities(prob, attract)
+
+    with stage("access"):
+        access = kernels.huff_access(prob, demand, supply)
+
+    return pd.Series(
+        access, index=pd.Index(cost_df.row_ids, name=cost_origin), name=supply_name
+    )
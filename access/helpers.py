@@ -1,3 +1,10 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+from . import weights
+
+
 def sanitize_supply_cost(a, cost, name):
     if cost is None:
         cost = a.default_cost
@@ -42,3 +49,94 @@ def normalized_access(a, columns):
     )
 
     return a.access_df[columns].divide(mean_access_values)
+
+
+def margin_of_error(df, value, moe):
+    """
+    Absolute margins of error for column `value` of `df`.
+    `moe` is either the name of a column of `df`,
+    or a fraction of the value (e.g., 0.1 for +/-10%).
+    """
+
+    if moe is None:
+        return None
+
+    if type(moe) is str:
+        if moe not in df.columns:
+            raise ValueError(f"{moe} is not a column of the dataframe")
+        return df[moe].to_numpy(dtype=float)
+
+    if moe < 0:
+        raise ValueError("Margins of error must be non-negative.")
+
+    return moe * df[value].to_numpy(dtype=float)
+
+
+def draw_values(df, value, moe, draws, rng, confidence=0.9):
+    """
+    Normal draws of `df[value]`, with standard deviations implied
+    by margins of error at the given confidence level
+    (ACS margins of error are reported at 90%).
+    Draws are truncated at zero. Returns a DataFrame with one column per draw.
+    """
+
+    values = df[value].to_numpy(dtype=float)
+    moe = margin_of_error(df, value, moe)
+
+    if moe is None:
+        sampled = np.repeat(values[:, None], draws, axis=1)
+    else:
+        sd = moe / norm.ppf(0.5 + confidence / 2)
+        sampled = rng.normal(values[:, None], sd[:, None], (len(values), draws))
+        sampled = np.maximum(sampled, 0)
+
+    return pd.DataFrame(sampled, index=df.index)
+
+
+def quantile_columns(draws_df, quantiles, prefix):
+    """Per-row quantiles of a DataFrame of draws, as named columns."""
+
+    values = np.nanquantile(draws_df.to_numpy(), quantiles, axis=1).T
+
+    return pd.DataFrame(
+        values,
+        index=draws_df.index,
+        columns=[f"{prefix}_q{100 * q:g}" for q in quantiles],
+    )
+
+
+def weight_fingerprint(weight_fn):
+    """
+    Hashable key identifying what a weight function computes, for caching.
+    Weight functions with the same parameters, e.g. two calls of ``weights.gaussian(20)``,
+    share a key; any other callable is only known to be equal to itself.
+    Returns None when there is no weight function, and a tuple of keys for a list of them.
+    """  # noqa: E501
+
+    if weight_fn is None:
+        return None
+
+    if isinstance(weight_fn, (list, tuple)):
+        return tuple(weight_fingerprint(f) for f in weight_fn)
+
+    if isinstance(weight_fn, weights.WeightFunction):
+        return weight_fn.fingerprint
+
+    return weight_fn
+
+
+def is_plain_key(key):
+    """Whether the cache key `key` is built only of strings, numbers and None, so that it means the same in another session."""  # noqa: E501
+
+    if isinstance(key, tuple):
+        return all(is_plain_key(k) for k in key)
+
+    return key is None or isinstance(key, (str, bytes, int, float, np.number))
+
+
+def value_fingerprint(df, columns):
+    """Hash of the index and `columns` of `df`, to detect changed inputs."""
+
+    hashes = pd.util.hash_pandas_object(df[columns], index=True)
+
+    return (tuple(columns), len(df), int(hashes.to_numpy().sum()))
@@ -0,0 +1,471 @@
+import numpy as np
+import scipy.sparse as sp
+
+from .weights import evaluate_unique
+
+
+def catchment(
+    origin,
+    dest,
+    cost,
+    shape=None,
+    max_cost=None,
+    weight_fn=None,
+    weights=None,
+):
+    """
+    Sparse matrix of catchment weights, from integer-coded origin-destination pairs.
+    Entry :math:`(i, j)` is the weight of destination :math:`j` seen from origin :math:`i`:
+    1 (or `weight_fn` of the cost) if the pair is within `max_cost`, and not stored otherwise.
+    Pairs of missing cost or weight are left out, as unreachable.
+    Repeated pairs are summed, and explicit zero weights are kept.
+
+    Parameters
+    ----------
+
+    origin        : numpy.ndarray
+                    Origin code of each pair, from 0 to the number of origins.
+                    Negative codes (e.g., missing IDs, from :func:`pandas.factorize`) are ignored.
+    dest          : numpy.ndarray
+                    Destination code of each pair, coded like `origin`.
+    cost          : numpy.ndarray
+                    Travel cost of each pair.
+    shape         : tuple
+                    Number of origins and destinations.
+                    If None, they are one more than the largest codes.
+    max_cost      : float
+                    This is the maximum cost to consider;
+                    note that it applies *along with* the weight function.
+    weight_fn     : function
+                    This function will weight each pair, as a function of the raw cost.
+    weights       : numpy.ndarray
+                    Precomputed values of `weight_fn` for each pair.
+                    If given, they are used instead of evaluating `weight_fn`.
+
+    Returns
+    -------
+    catchment     : scipy.sparse.csr_matrix
+                    Matrix of shape (origins, destinations).
+    """  # noqa: E501
+
+    origin = np.asarray(origin)
+    dest = np.asarray(dest)
+    cost = np.asarray(cost, dtype=float)
+
+    if shape is None:
+        shape = (int(origin.max(initial=-1)) + 1, int(dest.max(initial=-1)) + 1)
+
+    # Pairs of missing cost (e.g., from an outer join of costs) are unreachable.
+    keep = (origin >= 0) & (dest >= 0) & ~np.isnan(cost)
+    if max_cost is not None:
+        keep &= cost <= max_cost
+
+    if weights is not None:
+        data = np.asarray(weights, dtype=float)[keep]
+    elif weight_fn:
+        data = evaluate_unique(weight_fn, cost[keep])
+    else:
+        data = np.ones(keep.sum())
+
+    # Like a sum skipping missing values, leave out pairs of missing weight.
+    valid = ~np.isnan(data)
+    origin, dest = origin[keep][valid], dest[keep][valid]
+
+    return sp.csr_matrix((data[valid], (origin, dest)), shape=shape)
+
+
+def stacked_catchment(
+    origin,
+    dest,
+    cost,
+    weight_fns,
+    shape=None,
+    max_cost=None,
+    weights=None,
+):
+    """
+    Catchment matrices of several weight functions, side by side in one sparse matrix.
+    Entry :math:`(i, jK + k)` is the weight of destination :math:`j` seen from origin :math:`i`
+    under the :math:`k`-th of the :math:`K` functions,
+    so that each stage of the floating catchment area is a single product for all of them
+    (see :func:`facility_demand` and :func:`stacked_access`).
+    The weights are evaluated together, as a matrix of pairs by functions
+    (see :func:`access.weights.evaluate_unique`).
+
+    Parameters
+    ----------
+
+    origin        : numpy.ndarray
+                    Origin code of each pair, from 0 to the number of origins.
+                    Negative codes (e.g., missing IDs, from :func:`pandas.factorize`) are ignored.
+    dest          : numpy.ndarray
+                    Destination code of each pair, coded like `origin`.
+    cost          : numpy.ndarray
+                    Travel cost of each pair.
+    weight_fns    : list
+                    Functions weighting each pair, as a function of the raw cost.
+    shape         : tuple
+                    Number of origins and destinations.
+                    If None, they are one more than the largest codes.
+    max_cost      : float
+                    This is the maximum cost to consider;
+                    note that it applies *along with* the weight functions.
+    weights       : numpy.ndarray
+                    Precomputed values of `weight_fns` for each pair, with one column per function.
+                    If given, they are used instead of evaluating `weight_fns`.
+
+    Returns
+    -------
+    catchment     : scipy.sparse.csr_matrix
+                    Matrix of shape (origins, destinations × functions).
+    """  # noqa: E501
+
+    origin = np.asarray(origin)
+    dest = np.asarray(dest)
+    cost = np.asarray(cost, dtype=float)
+
+    if shape is None:
+        shape = (int(origin.max(initial=-1)) + 1, int(dest.max(initial=-1)) + 1)
+
+    # Pairs of missing cost (e.g., from an outer join of costs) are unreachable.
+    keep = (origin >= 0) & (dest >= 0) & ~np.isnan(cost)
+    if max_cost is not None:
+        keep &= cost <= max_cost
+
+    if weights is not None:
+        data = np.asarray(weights, dtype=float)[keep]
+    else:
+        data = evaluate_unique(list(weight_fns), cost[keep])
+
+    k = data.shape[1]
+    rows = np.repeat(origin[keep], k)
+    cols = (dest[keep, None] * k + np.arange(k)).ravel()
+
+    # Like a sum skipping missing values, leave out pairs of missing weight.
+    data = data.ravel()
+    valid = ~np.isnan(data)
+
+    return sp.csr_matrix(
+        (data[valid], (rows[valid], cols[valid])), shape=(shape[0], shape[1] * k)
+    )
+
+
+def facility_demand(catchment, demand):
+    """
+    Demand within the catchment of each destination, :math:`\\sum_i W_{ij} D_i`.
+
+    Parameters
+    ----------
+
+    catchment     : scipy.sparse.csr_matrix
+                    Catchment weights, of shape (origins, destinations) (see :func:`catchment`).
+    demand        : numpy.ndarray
+                    Demand at each origin; with two dimensions, one column per draw or scenario.
+
+    Returns
+    -------
+    load          : numpy.ndarray
+                    Demand of each destination.
+    """  # noqa: E501
+
+    return catchment.T @ demand
+
+
+def supply_ratio(load, supply):
+    """
+    First stage of the two-stage floating catchment area:
+    the supply of each destination, divided by the demand within its catchment,
+    :math:`R_j = S_j / L_j`.
+
+    Parameters
+    ----------
+
+    load          : numpy.ndarray
+                    Demand of each destination (see :func:`facility_demand`).
+    supply        : numpy.ndarray
+                    Supply at each destination, with the same columns as `load`, if any.
+
+    Returns
+    -------
+    ratio         : numpy.ndarray
+                    Supply to demand ratio of each destination.
+                    Destinations with supply but no demand in reach have an infinite ratio;
+                    those with neither have a ratio of 0.
+    """  # noqa: E501
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = supply / load
+
+    return np.where(np.isnan(ratio), 0, ratio)
+
+
+def two_stage_access(catchment, ratio):
+    """
+    Second stage of the two-stage floating catchment area:
+    the weighted sum of the ratios within each origin's catchment,
+    :math:`A_i = \\sum_j W_{ij} R_j`.
+
+    Parameters
+    ----------
+
+    catchment     : scipy.sparse.csr_matrix
+                    Catchment weights, of shape (origins, destinations) (see :func:`catchment`).
+    ratio         : numpy.ndarray
+                    Supply to demand ratio of each destination (see :func:`supply_ratio`).
+
+    Returns
+    -------
+    access        : numpy.ndarray
+                    Access of each origin. Origins with nothing in their catchment are NaN.
+    """  # noqa: E501
+
+    access = catchment @ ratio
+    access[catchment.getnnz(axis=1) == 0] = np.nan
+
+    return access
+
+
+def two_stage_fca(
+    origin,
+    dest,
+    cost,
+    demand,
+    supply,
+    max_cost=None,
+    weight_fn=None,
+    weights=None,
+):
+    """
+    Two-stage floating catchment area, on integer-coded arrays
+    (see :func:`access.fca.two_stage_fca` for the method).
+
+    Parameters
+    ----------
+
+    origin        : numpy.ndarray
+                    Origin code of each pair, indexing `demand`.
+    dest          : numpy.ndarray
+                    Destination code of each pair, indexing `supply`.
+    cost          : numpy.ndarray
+                    Travel cost of each pair.
+    demand        : numpy.ndarray
+                    Demand at each origin; with two dimensions, one column per draw or scenario.
+    supply        : numpy.ndarray
+                    Supply at each destination, with the same columns as `demand`, if any.
+    max_cost      : float
+                    This is the maximum cost to consider in the weighted sum;
+                    note that it applies *along with* the weight function.
+    weight_fn     : function
+                    This function will weight the value of resources/facilities,
+                    as a function of the raw cost.
+    weights       : numpy.ndarray
+                    Precomputed values of `weight_fn` for each pair.
+
+    Returns
+    -------
+    access        : numpy.ndarray
+                    Access of each origin. Origins with nothing in their catchment are NaN.
+    """  # noqa: E501
+
+    demand = np.asarray(demand, dtype=float)
+    supply = np.asarray(supply, dtype=float)
+
+    matrix = catchment(
+        origin,
+        dest,
+        cost,
+        shape=(len(demand), len(supply)),
+        max_cost=max_cost,
+        weight_fn=weight_fn,
+        weights=weights,
+    )
+
+    ratio = supply_ratio(facility_demand(matrix, demand), supply)
+
+    return two_stage_access(matrix, ratio)
+
+
+def _normalize_rows(matrix):
+    """Divide each row of a CSR matrix, in place, by its sum; rows summing to 0 are left as they are."""  # noqa: E501
+
+    total = np.asarray(matrix.sum(axis=1)).ravel()
+    matrix.data /= np.repeat(np.where(total > 0, total, 1), np.diff(matrix.indptr))
+
+    return matrix
+
+
+def preference_weights(catchment):
+    """
+    Preference weights of the three-stage floating catchment area,
+    :math:`G_{ij} = W_{ij} / \\sum_k W_{ik}`:
+    the catchment weights of each origin, normalized to sum to 1.
+
+    Parameters
+    ----------
+
+    catchment     : scipy.sparse.csr_matrix
+                    Catchment weights, of shape (origins, destinations) (see :func:`catchment`).
+
+    Returns
+    -------
+    preference    : scipy.sparse.csr_matrix
+                    Preference weights, with the structure of `catchment`.
+                    Rows of origins whose weights are all zero stay zero.
+                    Missing weights count as zero, rather than making their whole row missing.
+    """  # noqa: E501
+
+    preference = catchment.astype(float, copy=True)
+    preference.data[np.isnan(preference.data)] = 0
+
+    return _normalize_rows(preference)
+
+
+def stacked_access(catchment, ratio):
+    """
+    Second stage of the two-stage floating catchment area, for several weight functions at once,
+    :math:`A_{ik} = \\sum_j W^k_{ij} R_{jk}`, as a single sparse product.
+
+    Parameters
+    ----------
+
+    catchment     : scipy.sparse.csr_matrix
+                    Catchment weights of all functions, of shape (origins, destinations × functions)
+                    (see :func:`stacked_catchment`).
+    ratio         : numpy.ndarray
+                    Supply to demand ratio of each destination (rows) under each function (columns).
+
+    Returns
+    -------
+    access        : numpy.ndarray
+                    Access of each origin (rows) under each function (columns).
+                    Origins with nothing in their catchment are NaN.
+    """  # noqa: E501
+
+    n, k = ratio.shape
+
+    # Gather the ratio of column jK + k into column k of the result.
+    select = sp.csr_matrix(
+        (ratio.ravel(), np.tile(np.arange(k), n), np.arange(n * k + 1)),
+        shape=(n * k, k),
+    )
+    access = (catchment @ select).toarray()
+    access[catchment.getnnz(axis=1) == 0] = np.nan
+
+    return access
+
+
+def huff_probabilities(catchment, attractiveness):
+    """
+    Choice probabilities of the Huff model,
+    :math:`P_{ij} = A_j W_{ij} / \\sum_k A_k W_{ik}`.
+
+    Parameters
+    ----------
+
+    catchment      : scipy.sparse.csr_matrix
+                     Catchment weights, of shape (origins, destinations) (see :func:`catchment`).
+    attractiveness : numpy.ndarray
+                     Attractiveness of each destination.
+
+    Returns
+    -------
+    probabilities  : scipy.sparse.csr_matrix
+                     Probabilities, with the structure of `catchment`.
+                     Rows of origins without any attractive destination are all zero.
+    """  # noqa: E501
+
+    prob = catchment.astype(float, copy=True)
+    prob.data *= np.asarray(attractiveness, dtype=float)[prob.indices]
+
+    return _normalize_rows(prob)
+
+
+def huff_access(probabilities, demand, supply):
+    """
+    Access from Huff-model choice probabilities (see :func:`access.fca.huff` for the method):
+    the supply per expected visitor, :math:`S_j / \\sum_i P_{ij} D_i`,
+    averaged over the choices of each origin.
+
+    Parameters
+    ----------
+
+    probabilities : scipy.sparse.csr_matrix
+                    Choice probabilities, of shape (origins, destinations) (see :func:`huff_probabilities`).
+    demand        : numpy.ndarray
+                    Demand at each origin.
+    supply        : numpy.ndarray
+                    Supply at each destination.
+
+    Returns
+    -------
+    access        : numpy.ndarray
+                    Access of each origin. Origins with no attractive destination in their catchment are NaN.
+    """  # noqa: E501
+
+    load = probabilities.T @ demand
+
+    # Destinations that no one chooses serve no one.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(load > 0, supply / load, 0)
+
+    access = probabilities @ ratio
+    access[np.asarray(probabilities.sum(axis=1)).ravel() <= 0] = np.nan
+
+    return access
+
+
+def huff(
+    origin,
+    dest,
+    cost,
+    demand,
+    supply,
+    attractiveness=None,
+    max_cost=None,
+    weight_fn=None,
+):
+    """
+    Huff-model access ratio, on integer-coded arrays
+    (see :func:`access.fca.huff` for the method).
+
+    Parameters
+    ----------
+
+    origin         : numpy.ndarray
+                     Origin code of each pair, indexing `demand`.
+    dest           : numpy.ndarray
+                     Destination code of each pair, indexing `supply`.
+    cost           : numpy.ndarray
+                     Travel cost of each pair.
+    demand         : numpy.ndarray
+                     Demand at each origin.
+    supply         : numpy.ndarray
+                     Supply at each destination.
+    attractiveness : numpy.ndarray
+                     Attractiveness of each destination. If None, the supply itself is used.
+    max_cost       : float
+                     Catchment size: destinations beyond it are never chosen.
+    weight_fn      : function
+                     Distance decay of the choice probabilities, as a function of the raw cost.
+
+    Returns
+    -------
+    access         : numpy.ndarray
+                     Access of each origin. Origins with no attractive destination in their catchment are NaN.
+    """  # noqa: E501
+
+    demand = np.asarray(demand, dtype=float)
+    supply = np.asarray(supply, dtype=float)
+    if attractiveness is None:
+        attractiveness = supply
+
+    matrix = catchment(
+        origin,
+        dest,
+        cost,
+        shape=(len(demand), len(supply)),
+        max_cost=max_cost,
+        weight_fn=weight_fn,
+    )
+
+    return huff_access(huff_probabilities(matrix, attractiveness), demand, supply)
@@ -0,0 +1,108 @@
+import contextlib
+import contextvars
+import time
+import tracemalloc
+
+_active = contextvars.ContextVar("access_profile", default=None)
+
+
+class Profile:
+    """
+    Wall time per stage and row counts, for a single measure calculation.
+
+    Attributes
+    ----------
+    stages              : dict
+                          Seconds spent in each stage. Nested stages are
+                          named by their path, e.g. ``"demand/merge"``.
+    rows                : dict
+                          Rows remaining after `max_cost` filtering, by stage.
+    seconds             : float
+                          Total wall time.
+    peak_bytes          : int
+                          Peak memory allocated during the calculation,
+                          if memory was traced; otherwise None.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.rows = {}
+        self.seconds = None
+        self.peak_bytes = None
+        self._path = []
+
+    def as_dict(self):
+        return {
+            "seconds": self.seconds,
+            "stages": dict(self.stages),
+            "rows": dict(self.rows),
+            "peak_bytes": self.peak_bytes,
+        }
+
+
+@contextlib.contextmanager
+def profile(trace_memory=False):
+    """
+    Collect a :class:`Profile` of everything run inside the block.
+    Measures report their stages with :func:`stage` and :func:`record_rows`;
+    outside of a `profile` block, those calls do nothing.
+
+    Parameters
+    ----------
+    trace_memory        : bool
+                          Also record peak allocated bytes, with :mod:`tracemalloc`.
+                          This slows down allocation-heavy code.
+    """
+
+    prof = Profile()
+    token = _active.set(prof)
+
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    if trace_memory:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+
+    start = time.perf_counter()
+    try:
+        yield prof
+    finally:
+        prof.seconds = time.perf_counter() - start
+
+        if trace_memory:
+            prof.peak_bytes = tracemalloc.get_traced_memory()[1] - baseline
+        if started_tracing:
+            tracemalloc.stop()
+
+        _active.reset(token)
+
+
+@contextlib.contextmanager
+def stage(name):
+    """Time the block as stage `name` of the active profile, if any."""
+
+    prof = _active.get()
+    if prof is None:
+        yield
+        return
+
+    prof._path.append(name)
+    key = "/".join(prof._path)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        prof.stages[key] = prof.stages.get(key, 0) + time.perf_counter() - start
+        prof._path.pop()
+
+
+def record_rows(n):
+    """Add `n` rows to the count of the current stage of the active profile."""
+
+    prof = _active.get()
+    if prof is None:
+        return
+
+    key = "/".join(prof._path) or "total"
+    prof.rows[key] = prof.rows.get(key, 0) + int(n)
@@ -1,5 +1,13 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import pandas as pd
+import scipy.sparse as sp
+from scipy.cluster.vq import kmeans2
+
+from .profiling import record_rows, stage
 
 
 def iterate_raam(
@@ -12,89 +20,486 @@ def iterate_raam(
     half_life=50,
     limit_initial=20,
     verbose=False,
+    assignment=None,
+    return_assignment=False,
+    checkpoint=None,
 ):
+    """
+    Move whole units of demand from each origin's most costly facility to its cheapest one,
+    with a step that decays over the cycles.
+    Starts from `assignment` (origins x facilities), if given, or else from each origin's nearest facility
+    (see :func:`start_assignment`).
+    With a :class:`Checkpoint`, it resumes from the last snapshot, if there is one, and saves new snapshots as it goes.
+    Returns the mean total cost of each origin, and the final assignment if `return_assignment`.
+    """  # noqa: E501
+
     norig, ndest = travel.shape
-    assignment = np.zeros((norig, ndest))
-    assignment[range(norig), travel.argmin(axis=1)] = demand
+    first, snapshot = 0, checkpoint.load() if checkpoint else None
+    if snapshot is None:
+        assignment = start_assignment(demand, travel, assignment, integer=True)
+    else:
+        assignment, first = snapshot
 
-    for i in range(max_cycles):
-        demand_at_supply = assignment.sum(axis=0)
-        congestion_cost = demand_at_supply / supply
-        total_cost = congestion_cost + travel
+    total_cost = assignment.sum(axis=0) / supply + travel
 
-        max_locations = np.ma.masked_array(total_cost, assignment == 0).argmax(axis=1)
-        min_locations = total_cost.argmin(axis=1)
+    try:
+        for i in range(first, max_cycles):
+            demand_at_supply = assignment.sum(axis=0)
+            congestion_cost = demand_at_supply / supply
+            total_cost = congestion_cost + travel
 
-        slmin = supply[min_locations]
-        slmax = supply[max_locations]
+            max_locations = np.ma.masked_array(total_cost, assignment == 0).argmax(
+                axis=1
+            )
+            min_locations = total_cost.argmin(axis=1)
 
-        trlmin = travel[range(norig), min_locations]
-        trlmax = travel[range(norig), max_locations]
+            slmin = supply[min_locations]
+            slmax = supply[max_locations]
 
-        drlmin = assignment[range(norig), min_locations]
-        drlmax = assignment[range(norig), max_locations]
+            trlmin = travel[range(norig), min_locations]
+            trlmax = travel[range(norig), max_locations]
 
-        dr = drlmin + drlmax
+            drlmin = assignment[range(norig), min_locations]
+            drlmax = assignment[range(norig), max_locations]
 
-        drotherlmin = demand_at_supply[min_locations] - drlmin
-        drotherlmax = demand_at_supply[max_locations] - drlmax
+            dr = drlmin + drlmax
 
-        drlmin_new = ((slmin * slmax) / (slmin + slmax)) * (
-            (trlmax - trlmin) + (dr + drotherlmax) / slmax - drotherlmin / slmin
-        )
+            drotherlmin = demand_at_supply[min_locations] - drlmin
+            drotherlmax = demand_at_supply[max_locations] - drlmax
 
-        delta = drlmin_new - drlmin
+            drlmin_new = ((slmin * slmax) / (slmin + slmax)) * (
+                (trlmax - trlmin) + (dr + drotherlmax) / slmax - drotherlmin / slmin
+            )
 
-        delta = np.minimum(delta, drlmax)
-        delta = np.where(max_locations == min_locations, 0, delta)
+            delta = drlmin_new - drlmin
 
-        if type(initial_step) is float:
-            step_size = initial_step * 0.5 ** (i / half_life)
-            if step_size < min_step:
-                step_size = min_step
+            delta = np.minimum(delta, drlmax)
+            delta = np.where(max_locations == min_locations, 0, delta)
 
-            delta = np.minimum(delta, step_size * demand).astype(int)
+            if type(initial_step) is float:
+                step_size = initial_step * 0.5 ** (i / half_life)
+                if step_size < min_step:
+                    step_size = min_step
 
-        else:
-            step_size = int(np.round(initial_step * 0.5 ** (i / half_life)))
-            if step_size < min_step:
-                step_size = min_step
+                delta = np.minimum(delta, step_size * demand).astype(int)
 
-            delta = np.minimum(delta, step_size).astype(int)
+            else:
+                step_size = int(np.round(initial_step * 0.5 ** (i / half_life)))
+                if step_size < min_step:
+                    step_size = min_step
 
-        ## We don't want "attractive locations" getting mobbed.
-        ## This will only happen in the first 10-20 cycles.
-        ## So only do these (somewhat costly checks) then.
-        if i < limit_initial:
-            delta_mat = np.zeros(travel.shape)
-            delta_mat[range(norig), min_locations] += delta
+                delta = np.minimum(delta, step_size).astype(int)
 
-            naive_assignment = delta_mat.sum(axis=0) / (supply)  # * rho)
-            scale_factor = np.maximum(naive_assignment, 1)
+            ## We don't want "attractive locations" getting mobbed.
+            ## This will only happen in the first 10-20 cycles.
+            ## So only do these (somewhat costly checks) then.
+            if i < limit_initial:
+                delta_mat = np.zeros(travel.shape)
+                delta_mat[range(norig), min_locations] += delta
 
-            delta_mat = (delta_mat / scale_factor).round().astype(int)
+                naive_assignment = delta_mat.sum(axis=0) / (supply)  # * rho)
+                scale_factor = np.maximum(naive_assignment, 1)
 
-            delta = delta_mat.sum(axis=1)
+                delta_mat = (delta_mat / scale_factor).round().astype(int)
 
-        assignment[range(norig), min_locations] += delta
-        assignment[range(norig), max_locations] -= delta
+                delta = delta_mat.sum(axis=1)
 
-        assert (assignment.sum(axis=1) == demand).all()
+            assignment[range(norig), min_locations] += delta
+            assignment[range(norig), max_locations] -= delta
 
-        if not (i % 25):
-            raam_cost = (total_cost * assignment).sum(axis=1) / assignment.sum(axis=1)
+            assert (assignment.sum(axis=1) == demand).all()
 
-            if verbose:
-                print(
-                    f"{i:d} {raam_cost.mean():.2f} {delta.sum():d} {step_size:.3f}",
-                    end=" || ",
+            if not (i % 25):
+                raam_cost = (total_cost * assignment).sum(axis=1) / assignment.sum(
+                    axis=1
                 )
 
+                if verbose:
+                    print(
+                        f"{i:d} {raam_cost.mean():.2f} {delta.sum():d} {step_size:.3f}",
+                        end=" || ",
+                    )
+
+            if checkpoint:
+                checkpoint.update(assignment, i, max_cycles)
+    finally:
+        if checkpoint:
+            checkpoint.close()
+
+    # A completed run leaves nothing to resume.
+    if checkpoint:
+        checkpoint.remove()
+
     raam_cost = (total_cost * assignment).sum(axis=1) / assignment.sum(axis=1)
 
+    if return_assignment:
+        return raam_cost, assignment
+
     return raam_cost
 
 
+def start_assignment(demand, travel, initial=None, integer=False):
+    """
+    Initial (origins x facilities) assignment of demand for :func:`iterate_raam` and :func:`solve_raam`.
+    Without `initial`, all demand goes to each origin's nearest facility.
+    Otherwise, `initial` -- typically the result of an earlier run -- is kept where it is valid:
+    rows are rescaled to the current demand (and rounded down, if `integer`),
+    and whatever is left over, including the demand of rows without any assignment,
+    goes to the nearest facility.
+    """  # noqa: E501
+
+    unreachable = np.ma.getmaskarray(travel)
+    rows = np.arange(len(demand))
+    nearest = np.where(unreachable, np.inf, np.ma.filled(travel, 0)).argmin(axis=1)
+
+    assignment = np.zeros(travel.shape)
+    if initial is not None:
+        assignment[:] = np.where(unreachable, 0, np.maximum(initial, 0))
+
+        total = assignment.sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            assignment *= np.where(total > 0, demand / total, 0)[:, None]
+        if integer:
+            assignment = np.floor(assignment)
+
+    assignment[rows, nearest] += demand - assignment.sum(axis=1)
+
+    return assignment
+
+
+class Checkpoint:
+    """
+    Periodic snapshots of the assignment of a RAAM optimization,
+    to resume it after an interruption with the same results.
+    Every `every` cycles, a copy of the assignment is written in the background,
+    so that the optimization does not wait for the disk.
+    Each snapshot is written to a temporary file and then renamed over `path`,
+    so an interruption mid-write leaves the previous snapshot intact.
+
+    The snapshot is removed once the optimization completes,
+    so that a later run with the same file starts afresh.
+
+    The snapshot is a NumPy ``.npz`` archive, with arrays
+
+    - ``assignment``: the (origins x facilities) assignment after cycle ``cycle``,
+    - ``cycle``: the last completed cycle,
+    - ``origins``, ``dests``: the location IDs of the rows and columns, if given, and
+    - ``fingerprint``: the fingerprint of the problem, if given.
+
+    Parameters
+    ----------
+    path                : str
+                          File of the snapshot.
+    every               : int
+                          Cycles between snapshots.
+    origins, dests      : array-like
+                          Location IDs of the rows and columns of the assignment.
+                          A snapshot saved with a different order is reordered on loading,
+                          and one with different locations raises ValueError.
+    fingerprint         : str
+                          Identifies the inputs and settings of the optimization (see :func:`problem_fingerprint`).
+                          A snapshot saved with a different one raises ValueError on loading.
+    """  # noqa: E501
+
+    def __init__(self, path, every=25, origins=None, dests=None, fingerprint=None):
+        self.path = os.fspath(path)
+        self.every = every
+        self.origins = None if origins is None else _plain_ids(origins)
+        self.dests = None if dests is None else _plain_ids(dests)
+        self.fingerprint = fingerprint
+        self._executor = None
+        self._pending = None
+
+    def load(self):
+        """The saved assignment and the next cycle to run, or None if there is no snapshot."""  # noqa: E501
+
+        if not os.path.exists(self.path):
+            return None
+
+        with np.load(self.path, allow_pickle=False) as snapshot:
+            if self.fingerprint is not None and (
+                "fingerprint" not in snapshot
+                or str(snapshot["fingerprint"]) != self.fingerprint
+            ):
+                raise ValueError(
+                    f"{self.path} is a checkpoint of a run with other inputs"
+                    " or settings; delete it to start over."
+                )
+
+            assignment = snapshot["assignment"]
+            cycle = int(snapshot["cycle"])
+
+            if self.origins is not None and "origins" in snapshot:
+                rows = self._positions(snapshot["origins"], self.origins)
+                cols = self._positions(snapshot["dests"], self.dests)
+                assignment = assignment[np.ix_(rows, cols)]
+
+        return assignment, cycle + 1
+
+    def _positions(self, saved, current):
+        positions = pd.Index(saved).get_indexer(current)
+        if len(saved) != len(current) or (positions < 0).any():
+            raise ValueError(f"{self.path} is a checkpoint of a different problem.")
+
+        return positions
+
+    def update(self, assignment, cycle, max_cycles):
+        """Save a snapshot after `cycle`, if one is due and it is not the last cycle."""
+
+        if (cycle + 1) % self.every == 0 and cycle + 1 < max_cycles:
+            self.save(assignment, cycle)
+
+    def save(self, assignment, cycle):
+        """Write a copy of `assignment` in the background."""
+
+        self.wait()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+
+        self._pending = self._executor.submit(self._write, assignment.copy(), cycle)
+
+    def _write(self, assignment, cycle):
+        arrays = {"assignment": assignment, "cycle": cycle}
+        if self.origins is not None:
+            arrays.update(origins=self.origins, dests=self.dests)
+        if self.fingerprint is not None:
+            arrays.update(fingerprint=np.str_(self.fingerprint))
+
+        temporary = self.path + ".tmp"
+        with open(temporary, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(temporary, self.path)
+
+    def wait(self):
+        """Block until the last snapshot is written, raising any error from writing it."""  # noqa: E501
+
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            pending.result()
+
+    def close(self):
+        """Wait for the last snapshot, and stop the background writer."""
+
+        try:
+            self.wait()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def remove(self):
+        """Delete the snapshot, e.g., once the optimization completes."""
+
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _plain_ids(ids):
+    """Location IDs as an array of a plain dtype, to be saved without pickling."""
+
+    ids = np.asarray(ids)
+    if ids.dtype == object:
+        ids = np.asarray(ids.tolist())
+    if ids.dtype == object:
+        ids = ids.astype(str)
+
+    return ids
+
+
+def problem_fingerprint(demand, supply, travel, origins=None, dests=None, **settings):
+    """
+    Digest of the inputs and settings of a RAAM optimization, for :class:`Checkpoint`.
+    The rows and columns are taken in the order of their IDs, if given,
+    so that the digest does not depend on the order of the locations.
+
+    Parameters
+    ----------
+    demand        : numpy.ndarray
+                    Demand at each origin.
+    supply        : numpy.ndarray
+                    Supply at each facility.
+    travel        : numpy.ndarray
+                    (origins x facilities) travel costs. Masked entries are unreachable.
+    origins, dests : array-like
+                    Location IDs of the rows and columns.
+    settings      : dict
+                    Other parameters, e.g., the method and the number of cycles.
+
+    Returns
+    -------
+    fingerprint   : str
+    """  # noqa: E501
+
+    rows = slice(None) if origins is None else pd.Index(origins).argsort()
+    cols = slice(None) if dests is None else pd.Index(dests).argsort()
+
+    digest = hashlib.sha256()
+    for values in (
+        np.asarray(demand, dtype=float)[rows],
+        np.asarray(supply, dtype=float)[cols],
+        np.ma.filled(travel, np.nan).astype(float)[rows][:, cols],
+    ):
+        digest.update(np.ascontiguousarray(values).tobytes())
+    digest.update(repr(sorted(settings.items())).encode())
+
+    return digest.hexdigest()
+
+
+def solve_raam(
+    demand,
+    supply,
+    travel,
+    method="frank-wolfe",
+    max_cycles=1000,
+    tol=1e-3,
+    verbose=False,
+    assignment=None,
+    return_assignment=False,
+    checkpoint=None,
+):
+    """
+    Solve the continuous relaxation of the rational agent access model.
+    Demand may be split in any proportions, and the equilibrium minimizes the convex potential
+
+    .. math:: \\sum_{ij} t_{ij} x_{ij} + \\sum_j \\frac{L_j^2}{2 s_j},
+
+    where :math:`x_{ij}` is the demand of origin :math:`i` assigned to facility :math:`j`,
+    and :math:`L_j = \\sum_i x_{ij}` is the load of facility :math:`j`.
+    Its gradient is the total cost :math:`t_{ij} + L_j / s_j` of :func:`iterate_raam`.
+    Each cycle chooses a descent direction, and takes the exact minimizing step along it.
+    It stops when the relative duality gap -- the share of the total cost
+    that origins would save by moving to their cheapest facilities -- falls below `tol`.
+
+    Parameters
+    ----------
+
+    demand        : numpy.ndarray
+                    Demand at each origin.
+    supply        : numpy.ndarray
+                    Supply at each facility, scaled by rho.
+    travel        : numpy.ndarray
+                    (origins x facilities) travel costs, scaled by tau. Masked entries are unreachable.
+    method        : str
+                    "frank-wolfe" moves towards the assignment of all demand to the currently cheapest facilities.
+                    "projected-gradient" moves demand from each used facility to the cheapest one,
+                    by the amount that would equalize their costs, if nothing else moved; it needs fewer cycles.
+    max_cycles    : int
+                    Maximum number of cycles.
+    tol           : float
+                    Relative duality gap at which to stop.
+    verbose       : bool
+                    Print the duality gap as the optimization proceeds.
+    assignment    : numpy.ndarray
+                    Initial (origins x facilities) assignment, e.g., from an earlier run (see :func:`start_assignment`).
+                    By default, each origin starts at its nearest facility.
+    return_assignment : bool
+                    Also return the final assignment.
+    checkpoint    : Checkpoint
+                    Resume from its last snapshot, if there is one, and save new snapshots as the optimization proceeds.
+
+    Returns
+    -------
+    raam_cost     : numpy.ndarray
+                    Mean total cost of the demand of each origin.
+    assignment    : numpy.ndarray
+                    The final assignment, if `return_assignment`.
+    """  # noqa: E501
+
+    if method not in ("frank-wolfe", "projected-gradient"):
+        raise ValueError("method must be 'frank-wolfe' or 'projected-gradient'.")
+
+    unreachable = np.ma.getmaskarray(travel)
+
+    rows = np.arange(len(demand))
+    first, snapshot = 0, checkpoint.load() if checkpoint else None
+    if snapshot is None:
+        assignment = start_assignment(demand, travel, assignment)
+    else:
+        assignment, first = snapshot
+
+    travel = np.ma.filled(travel, 0).astype(float)
+
+    try:
+        for i in range(first, max_cycles):
+            load = assignment.sum(axis=0)
+            congestion_cost = load / supply
+
+            total_cost = travel + congestion_cost
+            if unreachable.any():
+                total_cost[unreachable] = np.inf
+
+            cheapest = total_cost.argmin(axis=1)
+            min_cost = total_cost[rows, cheapest]
+
+            # Unreachable pairs hold no demand, and take their travel cost as 0.
+            current = np.vdot(travel, assignment) + np.vdot(congestion_cost, load)
+            gap = (current - np.vdot(demand, min_cost)) / current
+
+            if verbose and not (i % 25):
+                print(f"{i:d} {gap:.2e}", end=" || ")
+
+            if gap < tol:
+                break
+
+            if method == "frank-wolfe":
+                direction = -assignment
+                direction[rows, cheapest] += demand
+            else:
+                # Newton step between each used facility and the cheapest one,
+                # which is 0 for the cheapest itself.
+                total_cost -= min_cost[:, None]
+                total_cost /= 1 / supply + (1 / supply[cheapest])[:, None]
+                direction = -np.minimum(assignment, total_cost)
+                direction[rows, cheapest] = -direction.sum(axis=1)
+
+            # The potential is quadratic along the direction: step to its minimum.
+            change = direction.sum(axis=0)
+            slope = np.vdot(travel, direction) + np.vdot(congestion_cost, change)
+            curvature = np.vdot(change / supply, change)
+            step = min(1, -slope / curvature) if curvature > 0 else 1
+
+            assignment += step * direction
+
+            if checkpoint:
+                checkpoint.update(assignment, i, max_cycles)
+    finally:
+        if checkpoint:
+            checkpoint.close()
+
+    # A completed run leaves nothing to resume.
+    if checkpoint:
+        checkpoint.remove()
+
+    congestion_cost = assignment.sum(axis=0) / supply
+    travel_cost = (travel * assignment).sum(axis=1)
+
+    raam_cost = (travel_cost + assignment @ congestion_cost) / assignment.sum(axis=1)
+
+    if return_assignment:
+        return raam_cost, assignment
+
+    return raam_cost
+
+
+def travel_matrix(
+    cost_df, demand_locations, supply_locations, cost_origin, cost_dest, cost_name
+):
+    """
+    Pivot a long-format cost table into a dense, masked
+    (demand locations x supply locations) travel matrix.
+    Missing pairs are masked.
+    """
+
+    cost_pivot = cost_df.pivot(index=cost_origin, columns=cost_dest, values=cost_name)
+    try:
+        travel_np = cost_pivot.loc[demand_locations, supply_locations].to_numpy()
+    except:  # noqa: E722 –– Do not use bare `except`
+        travel_np = cost_pivot.loc[demand_locations, supply_locations].values
+
+    return np.ma.masked_array(travel_np, np.isnan(travel_np))
+
+
 def raam(
     demand_df,
     supply_df,
@@ -113,6 +518,14 @@ def raam(
     min_step=0.005,
     half_life=50,
     verbose=False,
+    method="iterate",
+    tol=1e-3,
+    assignment=None,
+    return_assignment=False,
+    clusters=None,
+    refine_cycles=10,
+    checkpoint=None,
+    checkpoint_every=25,
 ):
     """Calculate the rational agent access model's total cost --
     a weighted travel and congestion cost.
@@ -152,12 +565,45 @@ def raam(
     max_cost   : float
                   This is the maximum cost to consider in the weighted sum;
                   note that it applies along with the weight function.
+    method     : str
+                  "iterate" (default) moves whole units of demand with the step schedule of :func:`iterate_raam`.
+                  "frank-wolfe" and "projected-gradient" solve the continuous relaxation with :func:`solve_raam`,
+                  until the relative duality gap is below `tol` or for `max_cycles`;
+                  `initial_step`, `min_step` and `half_life` are then unused.
+    tol        : float
+                  Relative duality gap at which :func:`solve_raam` stops.
+    assignment : pandas.Series
+                  Demand assigned to each (origin, destination) pair by an earlier run, to start from.
+                  Pairs missing from it start empty, and rows are rescaled to the current demand
+                  (see :func:`start_assignment`). By default, each origin starts at its nearest facility.
+    return_assignment : bool
+                  Also return the final assignment, in the same format, e.g. to warm-start a later run.
+    clusters   : pandas.Series
+                  Cluster of each origin (see :func:`cluster_origins`), to solve in two levels.
+                  The coarse problem between clusters and facilities is solved first, for `max_cycles`,
+                  with each cluster's demand and its demand-weighted mean travel cost (see :func:`coarsen`).
+                  Each origin then starts from the shares of its cluster, for another `refine_cycles`.
+                  Origins missing from `clusters` are clusters of their own.
+                  Ignored if `assignment` is given.
+    refine_cycles : int
+                  Cycles at the level of the origins, after solving the coarse problem.
+    checkpoint : str
+                  File to save the assignment to every `checkpoint_every` cycles (see :class:`Checkpoint`).
+                  If the file exists, the optimization resumes from it, with the same results as an uninterrupted run,
+                  rather than starting from `assignment` or `clusters`.
+                  The file is deleted when the optimization completes.
+                  One left by a run with other demand, supply, costs, `tau` or solver settings raises ValueError.
+    checkpoint_every : int
+                  Cycles between checkpoints.
 
     Returns
     -------
     access     : pandas.Series
 
                   A -- potentially-weighted -- Rational Agent Access Model cost.
+    assignment : pandas.Series
+                  If `return_assignment`, the assigned demand, indexed by (origin, destination),
+                  for the pairs that have any.
     """  # noqa: E501
 
     if demand_index is not True:
@@ -165,49 +611,327 @@ def raam(
     if supply_index is not True:
         supply_df = supply_df.set_index(supply_index)
 
-    demand_df = demand_df[demand_df[demand_name] > 0].copy()
-    supply_df = supply_df[supply_df[supply_name] > 0].copy()
+    demand_df = demand_df[demand_df[demand_name] > 0]
+    supply_df = supply_df[supply_df[supply_name] > 0]
 
     demand_locations = list(set(cost_df[cost_origin]) & set(demand_df.index))
     supply_locations = list(set(cost_df[cost_dest]) & set(supply_df.index))
 
-    cost_pivot = cost_df.pivot(index=cost_origin, columns=cost_dest, values=cost_name)
-    try:
-        travel_np = cost_pivot.loc[demand_locations, supply_locations].to_numpy().copy()
-    except:  # noqa: E722 –– Do not use bare `except`
-        travel_np = cost_pivot.loc[demand_locations, supply_locations].values.copy()
+    with stage("index"):
+        travel_np = travel_matrix(
+            cost_df,
+            demand_locations,
+            supply_locations,
+            cost_origin,
+            cost_dest,
+            cost_name,
+        )
+    record_rows(travel_np.count())
 
     travel_np = travel_np / tau
-    travel_np = np.ma.masked_array(travel_np, np.isnan(travel_np))
 
     # If it is not specified, rho is the average demand to supply ratio.
     if rho is None:
         rho = demand_df[demand_name].sum() / supply_df[supply_name].sum()
 
     try:
-        supply_np = supply_df.loc[supply_locations, supply_name].to_numpy().copy()
+        supply_np = supply_df.loc[supply_locations, supply_name].to_numpy()
     except:  # noqa: E722 –– Do not use bare `except`
-        supply_np = supply_df.loc[supply_locations, supply_name].values.copy()
+        supply_np = supply_df.loc[supply_locations, supply_name].values
 
     supply_np = supply_np * rho
 
     # Change this -- should be
     try:
-        demand_np = demand_df.loc[demand_locations, demand_name].to_numpy().copy()
+        demand_np = demand_df.loc[demand_locations, demand_name].to_numpy()
     except:  # noqa: E722 –– Do not use bare `except`
-        demand_np = demand_df.loc[demand_locations, demand_name].values.copy()
-
-    raam_cost = iterate_raam(
-        demand_np,
-        supply_np,
-        travel_np,
-        verbose=verbose,
-        max_cycles=max_cycles,
-        initial_step=initial_step,
-        min_step=min_step,
-        half_life=half_life,
-    )
+        demand_np = demand_df.loc[demand_locations, demand_name].values
+
+    def solve(demand, travel, assignment, cycles, checkpoint=None):
+        if method == "iterate":
+            return iterate_raam(
+                demand,
+                supply_np,
+                travel,
+                verbose=verbose,
+                max_cycles=cycles,
+                initial_step=initial_step,
+                min_step=min_step,
+                half_life=half_life,
+                assignment=assignment,
+                return_assignment=True,
+                checkpoint=checkpoint,
+            )
+
+        return solve_raam(
+            demand,
+            supply_np,
+            travel,
+            method=method,
+            max_cycles=cycles,
+            tol=tol,
+            verbose=verbose,
+            assignment=assignment,
+            return_assignment=True,
+            checkpoint=checkpoint,
+        )
+
+    # When resuming from a checkpoint, the solver starts from it instead.
+    resume = checkpoint is not None and os.path.exists(checkpoint)
+    if checkpoint is not None:
+        fingerprint = problem_fingerprint(
+            demand_np,
+            supply_np,
+            travel_np,
+            demand_locations,
+            supply_locations,
+            method=method,
+            max_cycles=max_cycles,
+            refine_cycles=refine_cycles if clusters is not None else None,
+            initial_step=initial_step,
+            min_step=min_step,
+            half_life=half_life,
+            tol=tol,
+        )
+        checkpoint = Checkpoint(
+            checkpoint,
+            checkpoint_every,
+            demand_locations,
+            supply_locations,
+            fingerprint=fingerprint,
+        )
+
+    if assignment is not None:
+        if resume:
+            assignment = None
+        else:
+            assignment = assignment_matrix(
+                assignment, demand_locations, supply_locations
+            )
+
+    elif clusters is not None:
+        if not resume:
+            codes = cluster_codes(clusters, demand_locations)
+            coarse_demand, coarse_travel = coarsen(demand_np, travel_np, codes)
+
+            with stage("coarse"):
+                _, coarse = solve(coarse_demand, coarse_travel, None, max_cycles)
+
+            # Each origin starts with the shares of its cluster.
+            assignment = (coarse / coarse_demand[:, None])[codes] * demand_np[:, None]
+
+        max_cycles = refine_cycles
+
+    with stage("iterate"):
+        raam_cost, assignment = solve(
+            demand_np, travel_np, assignment, max_cycles, checkpoint
+        )
 
     rs = pd.Series(name="RAAM", index=demand_locations, data=raam_cost)
 
+    if return_assignment:
+        o, d = np.nonzero(assignment)
+        index = pd.MultiIndex.from_arrays(
+            [np.asarray(demand_locations)[o], np.asarray(supply_locations)[d]],
+            names=[cost_origin, cost_dest],
+        )
+        return rs, pd.Series(assignment[o, d], index=index, name="assignment")
+
     return rs
+
+
+def cluster_codes(clusters, locations):
+    """
+    Integer cluster code of each location, from a Series mapping locations to clusters.
+    Locations without a cluster get one of their own.
+    """
+
+    codes, uniques = pd.factorize(pd.Series(clusters).reindex(locations))
+
+    missing = codes < 0
+    codes[missing] = len(uniques) + np.arange(missing.sum())
+
+    return codes
+
+
+def coarsen(demand, travel, codes):
+    """
+    Aggregate the origins of a RAAM problem into clusters.
+    The demand of a cluster is the sum over its origins,
+    and its travel cost to each facility is the demand-weighted mean over the origins that reach it;
+    facilities that none of them reach are masked.
+
+    Parameters
+    ----------
+    demand        : numpy.ndarray
+                    Demand at each origin.
+    travel        : numpy.ndarray
+                    (origins x facilities) travel costs. Masked entries are unreachable.
+    codes         : numpy.ndarray
+                    Integer cluster of each origin, from 0.
+
+    Returns
+    -------
+    demand        : numpy.ndarray
+                    Demand of each cluster.
+    travel        : numpy.ma.MaskedArray
+                    (clusters x facilities) travel costs.
+    """  # noqa: E501
+
+    n_clusters = codes.max() + 1 if len(codes) else 0
+    members = sp.csr_matrix(
+        (np.ones(len(codes)), (codes, np.arange(len(codes)))),
+        shape=(n_clusters, len(codes)),
+    )
+
+    reached = ~np.ma.getmaskarray(travel) * demand[:, None]
+    weight = members @ reached
+    total = members @ (np.ma.filled(travel, 0) * reached)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        coarse = np.ma.masked_array(total / weight, weight == 0)
+
+    return members @ demand, coarse
+
+
+def cluster_origins(demand_df, prefix=None, k=None, seed=0):
+    """
+    Group locations into spatial clusters, for :func:`raam` with `clusters`.
+
+    Parameters
+    ----------
+    demand_df     : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_ or `geopandas.GeoDataFrame <http://geopandas.org/reference/geopandas.GeoDataFrame.html>`_
+                    Locations, on the index.
+    prefix        : int
+                    Cluster by the first `prefix` characters of the location IDs,
+                    e.g., 5 for the county of a census tract GEOID.
+    k             : int
+                    Cluster by k-means on the centroids of the geometries, into `k` clusters.
+    seed          : int
+                    Random seed of the k-means initialization.
+
+    Returns
+    -------
+    clusters      : pandas.Series
+                    Cluster of each location.
+    """  # noqa: E501
+
+    if (prefix is None) == (k is None):
+        raise ValueError("Specify exactly one of prefix or k.")
+
+    if prefix is not None:
+        labels = demand_df.index.astype(str).str[:prefix]
+        return pd.Series(labels, index=demand_df.index, name="cluster")
+
+    if not hasattr(demand_df, "geometry"):
+        raise ValueError("Clustering by k-means requires a geometry column.")
+
+    centroids = demand_df.geometry.centroid
+    points = np.column_stack([centroids.x, centroids.y]).astype(float)
+    _, labels = kmeans2(points, k, seed=seed, minit="++")
+
+    return pd.Series(labels, index=demand_df.index, name="cluster")
+
+
+def assignment_matrix(assignment, demand_locations, supply_locations):
+    """
+    Dense (demand locations x supply locations) matrix of an assignment
+    indexed by (origin, destination), as returned by :func:`raam`.
+    Pairs outside the given locations are dropped.
+    """
+
+    o = pd.Index(demand_locations).get_indexer(assignment.index.get_level_values(0))
+    d = pd.Index(supply_locations).get_indexer(assignment.index.get_level_values(1))
+    keep = (o >= 0) & (d >= 0)
+
+    matrix = np.zeros((len(demand_locations), len(supply_locations)))
+    matrix[o[keep], d[keep]] = assignment.to_numpy()[keep]
+
+    return matrix
+
+
+def raam_draws(
+    demand_draws,
+    supply_draws,
+    cost_df,
+    cost_origin="origin",
+    cost_dest="dest",
+    cost_name="cost",
+    tau=60,
+    rho=None,
+    max_cycles=150,
+    initial_step=0.2,
+    min_step=0.005,
+    half_life=50,
+):
+    """Evaluate the rational agent access model for many draws of demand and supply.
+    The travel matrix is pivoted a single time and shared by every draw,
+    which then runs :func:`iterate_raam` directly on arrays.
+    Demand draws are rounded to whole numbers, as :func:`iterate_raam` moves integer demand.
+
+    Parameters
+    ----------
+
+    demand_draws  : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_
+                    Demand, indexed by origin location, with one column per draw.
+    supply_draws  : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_
+                    Supply, indexed by destination location, with the same columns as `demand_draws`.
+    cost_df       : `pandas.DataFrame <https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html>`_
+                    This dataframe contains a link between neighboring demand locations, and a cost between them.
+    cost_origin   : str
+                    The column name of the locations of users or consumers.
+    cost_dest     : str
+                    The column name of the supply or resource locations.
+    cost_name     : str
+                    The column name of the travel cost between origins and destinations
+    tau, rho, max_cycles, initial_step, min_step, half_life :
+                    As in :func:`raam`. If `rho` is None, it is recomputed for each draw.
+
+    Returns
+    -------
+    access        : pandas.DataFrame
+                    RAAM cost for each origin (rows) and draw (columns).
+    """  # noqa: E501
+
+    # Locations that never have demand or supply are dropped, as in raam.
+    demand_draws = demand_draws[demand_draws.max(axis=1) > 0]
+    supply_draws = supply_draws[supply_draws.max(axis=1) > 0]
+
+    demand_locations = list(set(cost_df[cost_origin]) & set(demand_draws.index))
+    supply_locations = list(set(cost_df[cost_dest]) & set(supply_draws.index))
+
+    with stage("index"):
+        travel_np = travel_matrix(
+            cost_df,
+            demand_locations,
+            supply_locations,
+            cost_origin,
+            cost_dest,
+            cost_name,
+        )
+    record_rows(travel_np.count())
+
+    travel_np = travel_np / tau
+
+    demand_np = demand_draws.loc[demand_locations].to_numpy().round()
+    supply_np = supply_draws.loc[supply_locations].to_numpy(dtype=float)
+
+    # A facility drawn with no supply would have infinite congestion.
+    supply_np = np.maximum(supply_np, np.finfo(float).eps)
+
+    results = np.empty(demand_np.shape)
+    for r in range(demand_np.shape[1]):
+        rho_r = demand_np[:, r].sum() / supply_np[:, r].sum() if rho is None else rho
+
+        with stage("iterate"), np.errstate(divide="ignore", invalid="ignore"):
+            results[:, r] = iterate_raam(
+                demand_np[:, r],
+                supply_np[:, r] * rho_r,
+                travel_np,
+                max_cycles=max_cycles,
+                initial_step=initial_step,
+                min_step=min_step,
+                half_life=half_life,
+            )
+
+    return pd.DataFrame(results, index=demand_locations, columns=demand_draws.columns)
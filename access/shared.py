@@ -0,0 +1,162 @@
+import contextlib
+import weakref
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .costs import FactorizedCosts
+
+
+def _open_segment(name):
+    # Workers only borrow the segment; the creating process owns its lifetime.
+    # Python < 3.13 has no `track` argument, but workers started through
+    # multiprocessing share the parent's resource tracker, so re-registering
+    # the name is harmless there.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def _release(segments, unlink):
+    for shm in segments:
+        # If an array still references the buffer, the mapping goes away
+        # with the process instead.
+        with contextlib.suppress(BufferError):
+            shm.close()
+        if unlink:
+            with contextlib.suppress(FileNotFoundError):
+                shm.unlink()
+
+
+class SharedCosts:
+    """
+    Factorized cost arrays placed in :mod:`multiprocessing.shared_memory`.
+
+    The creating process owns the segments and unlinks them on :meth:`close`,
+    when the object is garbage collected, or at interpreter exit --
+    whichever comes first -- so that a crashing worker cannot leak them.
+    Should the owner itself die, the multiprocessing resource tracker
+    removes the segments.
+    Workers receive the small, picklable :attr:`handle` and reattach
+    with :meth:`SharedCosts.attach`, which maps the same memory without copying.
+
+    Parameters
+    ----------
+    costs               : FactorizedCosts
+                          The cost structure to share.
+
+    Examples
+    --------
+
+    >>> shared = chicago_primary_care.share_costs()
+    >>> def worker(handle):
+    ...     with SharedCosts.attach(handle) as costs:
+    ...         return costs["cost:cost"].mean()
+    >>> with ProcessPoolExecutor() as pool:
+    ...     pool.submit(worker, shared.handle).result()
+    >>> shared.close()
+
+    Pickling a `SharedCosts` also sends only its handle,
+    so it may be passed to workers directly.
+    """  # noqa: E501
+
+    def __init__(self, costs):
+        self._segments = []
+        self._arrays = {}
+        self.handle = {}
+
+        try:
+            for key, values in costs.arrays().items():
+                values = np.asarray(values)
+                if values.dtype == object:
+                    # Object IDs (e.g., string geoids) are not shareable as is.
+                    values = values.astype(str)
+
+                shm = shared_memory.SharedMemory(
+                    create=True, size=max(values.nbytes, 1)
+                )
+                self._segments.append(shm)
+
+                view = np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)
+                view[...] = values
+                self._arrays[key] = view
+                self.handle[key] = (shm.name, values.dtype.str, values.shape)
+        except BaseException:
+            self._arrays = {}
+            _release(self._segments, unlink=True)
+            raise
+
+        self._finalizer = weakref.finalize(self, _release, self._segments, unlink=True)
+
+    @classmethod
+    def attach(cls, handle):
+        """
+        Reattach to segments created in another process.
+
+        Parameters
+        ----------
+        handle              : dict
+                              The :attr:`handle` of the owning `SharedCosts`.
+
+        Returns
+        -------
+        shared              : SharedCosts
+                              A non-owning view; closing it never unlinks the segments.
+        """  # noqa: E501
+
+        obj = cls.__new__(cls)
+        obj._segments = []
+        obj._arrays = {}
+        obj.handle = dict(handle)
+
+        try:
+            for key, (name, dtype, shape) in handle.items():
+                shm = _open_segment(name)
+                obj._segments.append(shm)
+                obj._arrays[key] = np.ndarray(
+                    shape, dtype=np.dtype(dtype), buffer=shm.buf
+                )
+        except BaseException:
+            obj._arrays = {}
+            _release(obj._segments, unlink=False)
+            raise
+
+        obj._finalizer = weakref.finalize(obj, _release, obj._segments, unlink=False)
+
+        return obj
+
+    def __reduce__(self):
+        # Pickling sends only the handle; the receiver reattaches.
+        return (SharedCosts.attach, (self.handle,))
+
+    def __getitem__(self, key):
+        return self._arrays[key]
+
+    def __iter__(self):
+        return iter(self._arrays)
+
+    def __len__(self):
+        return len(self._arrays)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def closed(self):
+        return not self._finalizer.alive
+
+    @property
+    def costs(self):
+        """The shared arrays as a (zero-copy) :class:`FactorizedCosts`."""
+
+        return FactorizedCosts.from_arrays(self._arrays)
+
+    def close(self):
+        """Detach from the segments, unlinking them if this process owns them."""
+
+        self._arrays = {}
+        self._finalizer()
@@ -1,3 +1,5 @@
+import numpy as np
+import pandas as pd
 import pytest
 import util as tu
 
@@ -326,3 +328,32 @@ class TestAccess:
                 neighbor_cost_dest="dest",
                 neighbor_cost_name=cost_name_dict,
             )
+
+    def test_access_initialize_without_copy_shares_data(self):
+        kwargs = {
+            "demand_index": "id",
+            "demand_value": "value",
+            "supply_index": "id",
+            "supply_value": "value",
+            "cost_df": self.cost_matrix,
+            "cost_origin": "origin",
+            "cost_dest": "dest",
+            "cost_name": "cost",
+        }
+        copied = Access(
+            demand_df=self.supply_grid, supply_df=self.supply_grid, **kwargs
+        )
+        shared = Access(
+            demand_df=self.supply_grid,
+            supply_df=self.supply_grid,
+            copy=False,
+            **kwargs,
+        )
+
+        assert "id" in self.supply_grid.columns
+        assert np.shares_memory(
+            shared.supply_df["value"].to_numpy(), self.supply_grid["value"].to_numpy()
+        )
+        pd.testing.assert_frame_equal(
+            shared.two_stage_fca(max_cost=3), copied.two_stage_fca(max_cost=3)
+        )
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+import util as tu
+
+from access import Access, arrow
+from access.costs import FactorizedCosts
+
+pytest.importorskip("pyarrow")
+
+
+class TestArrow:
+    def setup_method(self):
+        n = 5
+        supply_grid = tu.create_nxn_grid(n, random_values=True)
+        self.cost_matrix = tu.create_cost_matrix(supply_grid, "euclidean")
+        self.cost_matrix["other"] = 2 * self.cost_matrix["cost"]
+
+        self.model = Access(
+            demand_df=supply_grid,
+            demand_index="id",
+            demand_value="value",
+            supply_df=supply_grid,
+            supply_index="id",
+            supply_value="value",
+            cost_df=self.cost_matrix,
+            cost_origin="origin",
+            cost_dest="dest",
+            cost_name=["cost", "other"],
+        )
+
+    def assert_same_costs(self, actual, expected):
+        assert list(actual.costs) == list(expected.costs)
+        np.testing.assert_array_equal(actual.origin_ids, expected.origin_ids)
+        pd.testing.assert_frame_equal(
+            actual.to_frame().sort_values(["origin", "dest"], ignore_index=True),
+            expected.to_frame().sort_values(["origin", "dest"], ignore_index=True),
+        )
+
+    @pytest.mark.parametrize("name", ["costs.parquet", "costs.feather"])
+    def test_costs_round_trip(self, tmp_path, name):
+        costs = self.model.factorized_costs()
+        arrow.write_costs(costs, tmp_path / name)
+
+        self.assert_same_costs(
+            arrow.read_costs(tmp_path / name, cost_names=["cost", "other"]), costs
+        )
+
+    def test_read_costs_projects_and_filters(self, tmp_path):
+        self.cost_matrix.assign(extra="unused").to_parquet(tmp_path / "costs.parquet")
+        costs = arrow.read_costs(tmp_path / "costs.parquet", max_cost=1.5)
+
+        expected = FactorizedCosts.from_frame(
+            self.cost_matrix[self.cost_matrix["cost"] <= 1.5], "origin", "dest", "cost"
+        )
+        self.assert_same_costs(costs, expected)
+
+    def test_write_access_df(self, tmp_path):
+        self.model.two_stage_fca(max_cost=2)
+        arrow.write_frame(self.model.access_df, tmp_path / "access.parquet")
+
+        pd.testing.assert_frame_equal(
+            pd.read_parquet(tmp_path / "access.parquet"), self.model.access_df
+        )
@@ -0,0 +1,192 @@
+import numpy as np
+import pandas as pd
+import util as tu
+
+from access import Access, helpers, weights
+from access.cache import CatchmentCache
+
+
+class TestCatchmentCache:
+    def setup_method(self):
+        n = 5
+        supply_grid = tu.create_nxn_grid(n, random_values=True)
+        demand_grid = supply_grid.copy()
+        supply_grid["other"] = supply_grid["value"] * 2
+        self.cost_matrix = tu.create_cost_matrix(supply_grid, "euclidean")
+
+        self.model = Access(
+            demand_df=demand_grid,
+            demand_index="id",
+            demand_value="value",
+            supply_df=supply_grid,
+            supply_index="id",
+            supply_value=["value", "other"],
+            cost_df=self.cost_matrix,
+            cost_origin="origin",
+            cost_dest="dest",
+            cost_name="cost",
+        )
+
+    def uncached_model(self):
+        model = Access(
+            demand_df=self.model.demand_df,
+            demand_value="value",
+            supply_df=self.model.supply_df,
+            supply_value=["value", "other"],
+            cost_df=self.cost_matrix,
+            cost_origin="origin",
+            cost_dest="dest",
+            cost_name="cost",
+        )
+        model.cache.max_bytes = 0
+
+        return model
+
+    def test_lru_evicts_least_recently_used(self):
+        cache = CatchmentCache(max_bytes=2 * 800)
+        cache.put("a", np.zeros(100))
+        cache.put("b", np.zeros(100))
+        cache.get("a")
+        cache.put("c", np.zeros(100))
+
+        assert "a" in cache and "c" in cache
+        assert "b" not in cache
+        assert cache.nbytes == 1600
+
+    def test_lru_skips_values_over_budget(self):
+        cache = CatchmentCache(max_bytes=100)
+        cache.put("a", np.zeros(100))
+
+        assert len(cache) == 0
+        assert cache.nbytes == 0
+
+    def test_weight_fingerprint_matches_equal_parameters(self):
+        assert helpers.weight_fingerprint(
+            weights.gaussian(20)
+        ) == helpers.weight_fingerprint(weights.gaussian(20))
+        assert helpers.weight_fingerprint(
+            weights.gaussian(20)
+        ) != helpers.weight_fingerprint(weights.gaussian(30))
+        assert helpers.weight_fingerprint(
+            weights.step_fn({10: 1, 20: 0.5})
+        ) != helpers.weight_fingerprint(weights.step_fn({10: 1, 20: 0.6}))
+
+    def test_weight_fingerprint_of_plain_callable_is_identity(self):
+        def factory(scale):
+            return lambda x: x / scale
+
+        fn = factory(np.arange(10_000))
+
+        assert helpers.weight_fingerprint(fn) is fn
+        assert helpers.weight_fingerprint(fn) != helpers.weight_fingerprint(
+            factory(np.arange(10_000) + 1)
+        )
+
+    def test_cached_two_stage_fca_matches_uncached(self):
+        fn = weights.gaussian(2)
+        self.model.two_stage_fca(max_cost=3, weight_fn=fn)
+        self.model.enhanced_two_stage_fca(
+            name="e2sfca", max_cost=3, weight_fn=weights.gaussian(2)
+        )
+
+        expected = self.uncached_model().two_stage_fca(max_cost=3, weight_fn=fn)
+
+        assert self.model.cache.hits > 0
+        pd.testing.assert_frame_equal(
+            self.model.access_df[["e2sfca_value", "e2sfca_other"]],
+            expected.rename(columns=lambda c: c.replace("2sfca", "e2sfca")),
+        )
+
+    def test_demand_stage_is_reused_across_supply_types(self):
+        self.model.two_stage_fca(max_cost=3)
+        records = self.model.access_metadata.set_index("name")
+
+        assert "demand" in records.loc["2sfca_value", "stages"]
+        assert "demand" not in records.loc["2sfca_other", "stages"]
+
+    def test_changed_supply_is_not_stale(self):
+        self.model.two_stage_fca(max_cost=3)
+        before = self.model.access_df["2sfca_value"].copy()
+
+        self.model.supply_df["value"] *= 2
+        self.model.two_stage_fca(max_cost=3)
+
+        pd.testing.assert_series_equal(self.model.access_df["2sfca_value"], 2 * before)
+
+    def test_append_user_cost_clears_cache(self):
+        self.model.two_stage_fca(max_cost=3, weight_fn=weights.gaussian(2))
+        assert len(self.model.cache) > 0
+
+        new_cost = self.cost_matrix.rename(columns={"cost": "other_cost"})
+        self.model.append_user_cost(new_cost, "origin", "dest", "other_cost")
+
+        assert len(self.model.cache) == 0
+
+    def test_location_ids_are_factorized_once(self):
+        self.model.two_stage_fca(max_cost=3)
+        self.model.nearest()
+        shared = self.model.share_costs()
+
+        costs = self.model.factorized_costs()
+        assert ("costs", "factorized") in self.model.cache
+        assert self.model.cost_index().col_ids is costs.dest_ids
+        np.testing.assert_array_equal(shared.costs.origin, costs.origin)
+        shared.close()
+
+    def test_demand_stage_is_reused_across_calls(self):
+        self.model.two_stage_fca(max_cost=3, supply_values="value")
+        self.model.two_stage_fca(name="again", max_cost=3, supply_values="other")
+        self.model.three_stage_fca(max_cost=3, supply_values="value")
+        self.model.three_stage_fca(name="again3", max_cost=3, supply_values="other")
+        records = self.model.access_metadata.set_index("name")
+
+        assert "demand" not in records.loc["again_other", "stages"]
+        assert "demand" not in records.loc["again3_other", "stages"]
+
+    def test_demand_stage_is_shared_without_cache(self):
+        model = self.uncached_model()
+        model.two_stage_fca(max_cost=3)
+        model.three_stage_fca(max_cost=3)
+        records = model.access_metadata.set_index("name")
+
+        assert "demand" not in records.loc["2sfca_other", "stages"]
+        assert "demand" not in records.loc["3sfca_other", "stages"]
+
+    def test_facility_demand_and_crowdedness(self):
+        self.model.supply_df.loc[self.model.supply_df.index[0], "other"] = 0
+        self.model.two_stage_fca(max_cost=2)
+
+        costs = self.cost_matrix[self.cost_matrix["cost"] <= 2]
+        expected = (
+            costs.join(self.model.demand_df["value"], on="origin")
+            .groupby("dest")["value"]
+            .sum()
+        )
+        facilities = self.model.access
+
+        np.testing.assert_allclose(
+            facilities["2sfca_demand"], expected.reindex(facilities.index)
+        )
+        np.testing.assert_allclose(
+            facilities["2sfca_value_crowdedness"],
+            expected.reindex(facilities.index) / self.model.supply_df["value"],
+        )
+        assert np.isnan(facilities["2sfca_other_crowdedness"].iloc[0])
+
+    def test_preference_weights_are_reused_across_catchments(self):
+        fn = weights.gaussian(2)
+        self.model.three_stage_fca(max_cost=3, weight_fn=fn)
+        self.model.three_stage_fca(name="small", max_cost=1.5, weight_fn=fn)
+        records = self.model.access_metadata.set_index("name")
+
+        assert "preference" in records.loc["3sfca_value", "stages"]
+        assert "preference" not in records.loc["small_value", "stages"]
+        assert "demand" in records.loc["small_value", "stages"]
+
+    def test_preference_weights_built_once_when_cache_is_too_small(self):
+        self.model.cache = CatchmentCache(max_bytes=1)
+        self.model.three_stage_fca(max_cost=3, weight_fn=weights.gaussian(2))
+        records = self.model.access_metadata.set_index("name")
+
+        assert "preference" in records.loc["3sfca_value", "stages"]
+        assert "preference" not in records.loc["3sfca_other", "stages"]
@@ -0,0 +1,285 @@
+import numpy as np
+import pandas as pd
+import pytest
+import util as tu
+
+from access import Access, fca, weights
+from access.costs import (
+    FactorizedCosts,
+    PartitionedCosts,
+    SortedCostIndex,
+    compact_costs,
+    partition_costs,
+)
+
+
+class TestCosts:
+    def setup_method(self):
+        n = 5
+        self.supply_grid = tu.create_nxn_grid(n, random_values=True).set_index("id")
+        self.demand_grid = self.supply_grid.copy()
+        self.cost_matrix = tu.create_cost_matrix(
+            self.supply_grid.reset_index(), "euclidean"
+        )
+
+    def test_factorized_costs_round_trip(self):
+        costs = FactorizedCosts.from_frame(self.cost_matrix, "origin", "dest", "cost")
+        actual = costs.to_frame()
+
+        assert costs.origin.dtype == np.int32
+        assert (actual["origin"] == self.cost_matrix["origin"]).all()
+        assert (actual["dest"] == self.cost_matrix["dest"]).all()
+        assert (actual["cost"] == self.cost_matrix["cost"]).all()
+
+    def test_factorized_costs_drops_missing_keys(self):
+        cost_df = self.cost_matrix.copy()
+        cost_df.loc[0, "origin"] = np.nan
+        costs = FactorizedCosts.from_frame(cost_df, "origin", "dest", "cost")
+
+        assert len(costs) == len(cost_df) - 1
+
+    def test_partition_costs_keeps_origins_together(self, tmp_path):
+        chunks = [self.cost_matrix.iloc[:300], self.cost_matrix.iloc[300:]]
+        partitioned = partition_costs(chunks, str(tmp_path), "origin", n_partitions=4)
+
+        seen = []
+        for part in partitioned:
+            seen.extend(part["origin"].unique())
+
+        assert len(seen) == len(set(seen)) == self.cost_matrix["origin"].nunique()
+        assert sum(len(p) for p in PartitionedCosts(str(tmp_path))) == len(
+            self.cost_matrix
+        )
+
+    def test_partition_costs_refuses_non_empty_directory(self, tmp_path):
+        partition_costs(self.cost_matrix, str(tmp_path), "origin", n_partitions=2)
+
+        with pytest.raises(FileExistsError):
+            partition_costs(self.cost_matrix, str(tmp_path), "origin")
+
+    def test_partitioned_two_stage_fca_matches_in_memory(self, tmp_path):
+        partitioned = partition_costs(
+            self.cost_matrix, str(tmp_path), "origin", n_partitions=3
+        )
+        kwargs = {
+            "demand_df": self.demand_grid,
+            "supply_df": self.supply_grid,
+            "max_cost": 2.5,
+            "demand_index": "id",
+            "demand_name": "value",
+            "supply_name": "value",
+        }
+
+        expected = fca.two_stage_fca(cost_df=self.cost_matrix, **kwargs)
+        actual = fca.two_stage_fca(cost_df=partitioned, **kwargs)
+
+        pd.testing.assert_series_equal(
+            actual.sort_index(), expected.sort_index(), check_names=False
+        )
+
+    def test_partitioned_fca_ratio_matches_in_memory(self, tmp_path):
+        partitioned = partition_costs(
+            self.cost_matrix, str(tmp_path), "origin", n_partitions=3
+        )
+        kwargs = {
+            "demand_df": self.demand_grid,
+            "supply_df": self.supply_grid,
+            "max_cost": 1.5,
+            "demand_index": "id",
+            "supply_index": "id",
+            "demand_name": "value",
+            "supply_name": "value",
+        }
+
+        expected = fca.fca_ratio(
+            demand_cost_df=self.cost_matrix, supply_cost_df=self.cost_matrix, **kwargs
+        )
+        actual = fca.fca_ratio(
+            demand_cost_df=partitioned, supply_cost_df=partitioned, **kwargs
+        )
+
+        pd.testing.assert_series_equal(actual.sort_index(), expected.sort_index())
+
+    def test_partitioned_three_stage_fca_raises_type_error(self, tmp_path):
+        partitioned = partition_costs(self.cost_matrix, str(tmp_path), "origin")
+
+        with pytest.raises(TypeError):
+            fca.three_stage_fca(
+                self.demand_grid, self.supply_grid, partitioned, max_cost=10
+            )
+
+    def test_sorted_index_cutoffs_match_scan(self):
+        index = SortedCostIndex.from_frame(self.cost_matrix, "origin", "dest", "cost")
+        expected = (
+            (self.cost_matrix["cost"] <= 2.5)
+            .groupby(self.cost_matrix["origin"])
+            .sum()
+            .reindex(index.row_ids)
+        )
+
+        assert (index.counts(2.5) == expected.to_numpy()).all()
+        assert (index.counts() == np.diff(index.indptr)).all()
+
+        thresholds = np.linspace(0, 4, len(index.row_ids))
+        for i, t in enumerate(thresholds):
+            rows = self.cost_matrix["origin"] == index.row_ids[i]
+            assert (
+                index.counts(thresholds)[i]
+                == (self.cost_matrix.loc[rows, "cost"] <= t).sum()
+            )
+
+    @pytest.mark.parametrize("by", ["origin", "dest"])
+    def test_sorted_index_matrix_matches_catchment_matrix(self, by):
+        index = SortedCostIndex.from_frame(
+            self.cost_matrix, "origin", "dest", "cost", by=by
+        )
+        origins = self.demand_grid.index[::-1]
+        dests = self.supply_grid.index[:10]
+        fn = weights.gaussian(2)
+
+        expected = fca.catchment_matrix(
+            self.cost_matrix, origins, dests, max_cost=2, weight_fn=fn
+        )
+        actual = fca.catchment_matrix(index, origins, dests, max_cost=2, weight_fn=fn)
+
+        assert actual.nnz == expected.nnz
+        np.testing.assert_allclose(actual.toarray(), expected.toarray())
+
+    @pytest.mark.parametrize("by", ["origin", "dest"])
+    def test_indexed_two_stage_fca_matches_frame(self, by):
+        index = SortedCostIndex.from_frame(
+            self.cost_matrix, "origin", "dest", "cost", by=by
+        )
+        kwargs = {
+            "demand_df": self.demand_grid,
+            "supply_df": self.supply_grid,
+            "max_cost": 2.5,
+            "demand_index": "id",
+            "demand_name": "value",
+            "supply_name": "value",
+            "weight_fn": weights.gaussian(2),
+        }
+
+        expected = fca.two_stage_fca(cost_df=self.cost_matrix, **kwargs)
+        actual = fca.two_stage_fca(cost_df=index, **kwargs)
+
+        pd.testing.assert_series_equal(actual, expected, check_names=False)
+
+    def test_compact_costs_types(self):
+        cost_df = self.cost_matrix.assign(extra=1)
+        compact = compact_costs(cost_df, "origin", "dest", "cost")
+
+        assert list(compact.columns) == ["origin", "dest", "cost"]
+        assert isinstance(compact["origin"].dtype, pd.CategoricalDtype)
+        assert compact["cost"].dtype == np.float32
+        assert (compact["origin"].astype(int) == cost_df["origin"]).all()
+        np.testing.assert_allclose(compact["cost"], cost_df["cost"], rtol=1e-6)
+
+        minutes = compact_costs(cost_df, "origin", "dest", "cost", costs="uint16")
+        assert (minutes["cost"] == cost_df["cost"].round()).all()
+
+    def test_compact_costs_uint16_rejects_missing_costs(self):
+        cost_df = self.cost_matrix.copy()
+        cost_df.loc[0, "cost"] = np.nan
+
+        with pytest.raises(ValueError):
+            compact_costs(cost_df, "origin", "dest", "cost", costs="uint16")
+
+    def test_compacted_access_matches(self):
+        def model():
+            access = Access(
+                demand_df=self.demand_grid.sample(10, random_state=0),
+                demand_value="value",
+                supply_df=self.supply_grid,
+                supply_value="value",
+                cost_df=self.cost_matrix,
+                cost_origin="origin",
+                cost_dest="dest",
+                cost_name="cost",
+            )
+            other = self.cost_matrix.rename(
+                columns={"origin": "o", "dest": "d", "cost": "other"}
+            )
+            access.append_user_cost(other, "o", "d", "other")
+
+            return access
+
+        full, compact = model(), model()
+        memory = compact.compact_costs()
+
+        assert list(compact.cost_df.columns) == ["origin", "dest", "cost", "other"]
+        assert memory["saved"] == memory["before"] - memory["after"] > 0
+
+        fn = weights.gaussian(2)
+        for access in [full, compact]:
+            access.two_stage_fca(max_cost=1.5, weight_fn=fn)
+            access.three_stage_fca(max_cost=1.5, weight_fn=fn, cost="other")
+
+        pd.testing.assert_frame_equal(compact.access_df, full.access_df, rtol=1e-5)
+
+    def test_appended_costs_stay_compact(self):
+        def model():
+            return Access(
+                demand_df=self.demand_grid,
+                demand_value="value",
+                supply_df=self.supply_grid,
+                supply_value="value",
+                cost_df=self.cost_matrix,
+                cost_origin="origin",
+                cost_dest="dest",
+                cost_name="cost",
+                neighbor_cost_df=self.cost_matrix,
+                neighbor_cost_origin="origin",
+                neighbor_cost_dest="dest",
+                neighbor_cost_name="cost",
+            )
+
+        other = self.cost_matrix.rename(
+            columns={"origin": "o", "dest": "d", "cost": "other"}
+        )
+        full, compact = model(), model()
+        compact.compact_costs()
+        compact.compact_costs(neighbors=True)
+        for access in [full, compact]:
+            access.append_user_cost(other, "o", "d", "other")
+            access.create_euclidean_distance(threshold=10)
+            access.create_euclidean_distance_neighbors(threshold=10)
+
+        assert list(compact.cost_df.columns) == [
+            "origin",
+            "dest",
+            "cost",
+            "other",
+            "euclidean",
+        ]
+        for cost_df in [compact.cost_df, compact.neighbor_cost_df]:
+            assert isinstance(cost_df["origin"].dtype, pd.CategoricalDtype)
+            assert cost_df["euclidean"].dtype == np.float32
+        assert compact.cost_df["other"].dtype == np.float32
+
+        fn = weights.gaussian(2)
+        for access in [full, compact]:
+            access.two_stage_fca(max_cost=1.5, weight_fn=fn, cost="other")
+            access.two_stage_fca(
+                name="euclidean", max_cost=1.5, weight_fn=fn, cost="euclidean"
+            )
+
+        pd.testing.assert_frame_equal(compact.access_df, full.access_df, rtol=1e-5)
+
+    def test_appended_missing_costs_undo_uint16_compaction(self):
+        access = Access(
+            demand_df=self.demand_grid,
+            demand_value="value",
+            supply_df=self.supply_grid,
+            supply_value="value",
+            cost_df=self.cost_matrix,
+            cost_origin="origin",
+            cost_dest="dest",
+            cost_name="cost",
+        )
+        access.compact_costs(costs="uint16")
+        partial = self.cost_matrix.iloc[::2].rename(columns={"cost": "other"})
+        access.append_user_cost(partial, "origin", "dest", "other")
+
+        assert access.cost_df["other"].isna().any()
+        assert access.cost_df["other"].dtype == np.float64
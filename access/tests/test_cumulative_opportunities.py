@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+import util as tu
+
+from access import Access, fca
+
+
+class TestCumulativeOpportunities:
+    def setup_method(self):
+        n = 5
+        supply_grid = tu.create_nxn_grid(n, random_values=True)
+        supply_grid["other"] = np.arange(len(supply_grid)) % 3
+        demand_grid = supply_grid.sample(10, random_state=0)
+        self.cost_matrix = tu.create_cost_matrix(supply_grid, "euclidean")
+
+        self.model = Access(
+            demand_df=demand_grid,
+            demand_index="id",
+            demand_value="value",
+            supply_df=supply_grid,
+            supply_index="id",
+            supply_value=["value", "other"],
+            cost_df=self.cost_matrix,
+            cost_origin="origin",
+            cost_dest="dest",
+            cost_name="cost",
+        )
+
+    @pytest.mark.parametrize("threshold", [0, 1, 1.5, 2.5, 10])
+    def test_cumulative_opportunities_match_weighted_catchment(self, threshold):
+        result = self.model.cumulative_opportunities(thresholds=[1, threshold])
+
+        for s in ["value", "other"]:
+            expected = fca.weighted_catchment(
+                self.model.supply_df,
+                self.cost_matrix,
+                max_cost=threshold,
+                cost_source="dest",
+                cost_dest="origin",
+                loc_index=True,
+                loc_value=s,
+            )
+            expected = expected.reindex(result.index).fillna(0)
+
+            np.testing.assert_allclose(
+                result[f"cumulative_{s}_{threshold:g}"], expected.to_numpy()
+            )
+
+    def test_cumulative_opportunities_increase_with_threshold(self):
+        result = self.model.cumulative_opportunities(
+            name="co", thresholds=[0.5, 1, 2, 10], supply_values="value"
+        )
+
+        assert list(result.columns) == [
+            "co_value_0.5",
+            "co_value_1",
+            "co_value_2",
+            "co_value_10",
+        ]
+        assert (result.diff(axis=1).iloc[:, 1:] >= 0).all().all()
+        assert (result["co_value_10"] == self.model.supply_df["value"].sum()).all()
+
+    def test_cumulative_opportunities_recorded_per_supply(self):
+        self.model.cumulative_opportunities(thresholds=[1, 2])
+        names = set(self.model.access_metadata["name"])
+
+        assert {"cumulative_value", "cumulative_other"} <= names
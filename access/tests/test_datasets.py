@@ -15,3 +15,28 @@ class TestDatasets:
 
     def test_prints_available_datasets(self):
         Datasets.available_datasets()
+
+    def test_synthetic_problem_shapes(self):
+        demand, supply, costs, neighbor_costs = Datasets.synthetic(
+            500, k=20, neighbor_k=5
+        )
+
+        assert len(demand) == 500
+        assert len(supply) == 50
+        assert len(costs) == 500 * 20
+        assert len(neighbor_costs) == 500 * 5
+        assert costs["dest"].isin(supply["geoid"]).all()
+        assert neighbor_costs["dest"].isin(demand["geoid"]).all()
+        assert (costs["cost"] > 0).all()
+
+    def test_synthetic_problem_is_reproducible(self):
+        first = Datasets.synthetic(200, seed=3)
+        second = Datasets.synthetic(200, seed=3)
+
+        for a, b in zip(first, second, strict=True):
+            pd.testing.assert_frame_equal(a, b)
+
+    def test_synthetic_problem_k_capped_at_facilities(self):
+        _, supply, costs, _ = Datasets.synthetic(100, n_facilities=5, k=50)
+
+        assert len(costs) == 100 * len(supply)
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+import util as tu
+
+from access import Access, weights
+
+
+class TestHuff:
+    def setup_method(self):
+        n = 5
+        supply_grid = tu.create_nxn_grid(n, random_values=True)
+        supply_grid["value"] *= np.arange(len(supply_grid)) % 3 == 0
+        supply_grid["beds"] = np.arange(len(supply_grid)) % 4 + 1
+        demand_grid = tu.create_nxn_grid(n, random_values=True, seed=1)
+        self.cost_matrix = tu.create_cost_matrix(supply_grid, "euclidean")
+
+        self.model = Access(
+            demand_df=demand_grid,
+            demand_index="id",
+            demand_value="value",
+            supply_df=supply_grid,
+            supply_index="id",
+            supply_value="value",
+            cost_df=self.cost_matrix,
+            cost_origin="origin",
+            cost_dest="dest",
+            cost_name="cost",
+        )
+
+    def brute_force(self, max_cost, weight_fn, attractiveness="value"):
+        cost = self.cost_matrix.pivot(index="origin", columns="dest", values="cost")
+        supply = self.model.supply_df["value"].reindex(cost.columns).to_numpy()
+        attract = self.model.supply_df[attractiveness].reindex(cost.columns)
+        demand = self.model.demand_df["value"].reindex(cost.index).to_numpy()
+
+        w = cost.map(weight_fn) if weight_fn else cost * 0 + 1
+        w = w.where(cost <= max_cost, 0).to_numpy() * attract.to_numpy()
+        prob = w / w.sum(axis=1, keepdims=True)
+
+        load = demand @ prob
+        ratio = np.where(load > 0, supply / np.where(load > 0, load, 1), 0)
+
+        return prob @ ratio
+
+    @pytest.mark.parametrize(
+        "weight_fn", [None, weights.gravity(scale=1, alpha=-2, min_dist=1)]
+    )
+    def test_huff_matches_brute_force(self, weight_fn):
+        result = self.model.huff(max_cost=10, weight_fn=weight_fn)
+
+        np.testing.assert_allclose(
+            result["huff_value"], self.brute_force(10, weight_fn)
+        )
+
+    def test_huff_attractiveness(self):
+        fn = weights.gaussian(2)
+        result = self.model.huff(
+            name="beds", max_cost=10, weight_fn=fn, attractiveness="beds"
+        )
+
+        np.testing.assert_allclose(
+            result["beds_value"], self.brute_force(10, fn, "beds")
+        )
+
+    def test_huff_distributes_all_supply(self):
+        result = self.model.huff(max_cost=10, weight_fn=weights.gaussian(2))
+        demand = self.model.access_df["value"]
+
+        assert np.isclose(
+            (result["huff_value"] * demand).sum(),
+            self.model.supply_df["value"].sum(),
+        )
+
+    def test_huff_without_catchment_is_nan(self):
+        result = self.model.huff(max_cost=0.5)
+        at_supply = self.model.supply_df["value"] > 0
+
+        assert result.loc[at_supply, "huff_value"].notna().all()
+        assert result.loc[~at_supply, "huff_value"].isna().all()
+
+    def test_huff_missing_costs_are_unreachable(self):
+        self.cost_matrix.loc[self.cost_matrix.index[::7], "cost"] = np.nan
+        self.model.cost_df = self.cost_matrix
+        fn = weights.gravity(scale=1, alpha=-2, min_dist=1)
+        result = self.model.huff(weight_fn=fn)
+
+        assert result["huff_value"].notna().all()
+        np.testing.assert_allclose(result["huff_value"], self.brute_force(np.inf, fn))
+
+    def test_huff_unknown_attractiveness_raises_value_error(self):
+        with pytest.raises(ValueError):
+            self.model.huff(attractiveness="missing")
@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import util as tu
+
+from access import fca, kernels, weights
+
+
+class TestKernels:
+    def setup_method(self):
+        n = 5
+        grid = tu.create_nxn_grid(n, random_values=True)
+        self.cost_matrix = tu.create_cost_matrix(grid, "euclidean")
+        self.supply_grid = grid.set_index("id")
+        self.demand_grid = self.supply_grid.sample(15, random_state=0)
+
+        self.origin, self.origin_ids = pd.factorize(self.cost_matrix["origin"])
+        self.dest, self.dest_ids = pd.factorize(self.cost_matrix["dest"])
+        self.cost = self.cost_matrix["cost"].to_numpy()
+        self.demand = self.demand_grid["value"].reindex(self.origin_ids).fillna(0)
+        self.supply = self.supply_grid["value"].reindex(self.dest_ids)
+
+    def test_catchment_skips_missing_and_sums_repeated_pairs(self):
+        matrix = kernels.catchment(
+            np.array([0, 0, -1, 1, 1]),
+            np.array([0, 0, 1, 1, 0]),
+            np.array([1.0, 2.0, 1.0, 1.0, 5.0]),
+            max_cost=2,
+        )
+
+        np.testing.assert_array_equal(matrix.toarray(), [[2, 0], [0, 1]])
+
+    def test_catchment_skips_missing_costs_and_weights(self):
+        origin, dest = np.array([0, 0, 1, 1]), np.array([0, 1, 0, 1])
+        cost = np.array([1.0, np.nan, 2.0, 3.0])
+        fn = weights.gaussian(2)
+
+        matrix = kernels.catchment(origin, dest, cost, weight_fn=fn)
+        stacked = kernels.stacked_catchment(origin, dest, cost, [fn, fn])
+        nan_weights = kernels.catchment(
+            origin, dest, cost, weights=np.array([1.0, 1.0, np.nan, 1.0])
+        )
+
+        assert matrix.nnz == 3
+        assert not np.isnan(matrix.data).any()
+        assert stacked.nnz == 6
+        np.testing.assert_allclose(stacked[:, ::2].toarray(), matrix.toarray())
+        np.testing.assert_array_equal(nan_weights.toarray(), [[1, 0], [0, 1]])
+
+    def test_two_stage_fca_matches_pandas(self):
+        fn = weights.gaussian(2)
+        expected = fca.two_stage_fca(
+            self.demand_grid,
+            self.supply_grid,
+            self.cost_matrix,
+            max_cost=2.5,
+            demand_index=True,
+            demand_name="value",
+            supply_name="value",
+            weight_fn=fn,
+        )
+        actual = kernels.two_stage_fca(
+            self.origin,
+            self.dest,
+            self.cost,
+            self.demand.to_numpy(),
+            self.supply.to_numpy(),
+            max_cost=2.5,
+            weight_fn=fn,
+        )
+        actual = pd.Series(actual, index=self.origin_ids)
+
+        np.testing.assert_allclose(actual.reindex(expected.index), expected)
+
+    def test_two_stage_fca_columns_are_independent(self):
+        draws = np.column_stack([self.demand, 2 * self.demand])
+        supply = np.column_stack([self.supply, self.supply])
+        actual = kernels.two_stage_fca(
+            self.origin, self.dest, self.cost, draws, supply, max_cost=2
+        )
+        single = kernels.two_stage_fca(
+            self.origin, self.dest, self.cost, self.demand, self.supply, max_cost=2
+        )
+
+        np.testing.assert_allclose(actual[:, 0], single)
+        np.testing.assert_allclose(actual[:, 1], single / 2)
+
+    def test_stacked_catchment_matches_each_function(self):
+        fns = [weights.step_fn({1: 1, 2: 0.5}), weights.gaussian(2)]
+        matrix = kernels.stacked_catchment(
+            self.origin, self.dest, self.cost, fns, max_cost=2.5
+        )
+        load = kernels.facility_demand(matrix, self.demand).reshape(-1, 2)
+
+        for k, fn in enumerate(fns):
+            single = kernels.catchment(
+                self.origin, self.dest, self.cost, max_cost=2.5, weight_fn=fn
+            )
+            np.testing.assert_allclose(
+                matrix[:, k::2].toarray(), single.toarray(), atol=1e-15
+            )
+            np.testing.assert_allclose(
+                load[:, k], kernels.facility_demand(single, self.demand)
+            )
+
+    def test_preference_weights_rows_sum_to_one(self):
+        matrix = kernels.catchment(
+            np.array([0, 0, 1, 2]),
+            np.array([0, 1, 1, 0]),
+            np.array([1.0, 3.0, 2.0, 1.0]),
+            weights=np.array([1.0, 3.0, 2.0, 0.0]),
+        )
+        preference = kernels.preference_weights(matrix)
+
+        np.testing.assert_allclose(preference.toarray(), [[0.25, 0.75], [0, 1], [0, 0]])
+        np.testing.assert_array_equal(matrix.toarray(), [[1, 3], [0, 2], [0, 0]])
+
+    def test_preference_weights_ignore_missing_weights(self):
+        matrix = sp.csr_matrix(np.array([[1.0, np.nan], [2.0, 2.0]]))
+        preference = kernels.preference_weights(matrix)
+
+        np.testing.assert_allclose(preference.toarray(), [[1, 0], [0.5, 0.5]])
+
+    def test_huff_matches_pandas(self):
+        fn = weights.gravity(scale=1, alpha=-2, min_dist=1)
+        expected = fca.huff(
+            self.demand_grid,
+            self.supply_grid,
+            self.cost_matrix,
+            max_cost=3,
+            demand_name="value",
+            supply_name="value",
+            weight_fn=fn,
+        )
+        actual = kernels.huff(
+            self.origin,
+            self.dest,
+            self.cost,
+            self.demand,
+            self.supply,
+            max_cost=3,
+            weight_fn=fn,
+        )
+
+        np.testing.assert_allclose(
+            pd.Series(actual, index=self.origin_ids).reindex(expected.index), expected
+        )
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+import util as tu
+
+from access import Access
+
+
+class TestNearest:
+    def setup_method(self):
+        n = 5
+        supply_grid = tu.create_nxn_grid(n)
+        supply_grid["value"] = (np.arange(len(supply_grid)) % 4 == 0).astype(int)
+        supply_grid["other"] = (np.arange(len(supply_grid)) % 7 == 3).astype(int)
+        demand_grid = supply_grid.copy()
+        self.cost_matrix = tu.create_cost_matrix(supply_grid, "euclidean")
+
+        self.model = Access(
+            demand_df=demand_grid,
+            demand_index="id",
+            demand_value="value",
+            supply_df=supply_grid,
+            supply_index="id",
+            supply_value=["value", "other"],
+            cost_df=self.cost_matrix,
+            cost_origin="origin",
+            cost_dest="dest",
+            cost_name="cost",
+        )
+
+    def brute_force(self, supply, k):
+        with_supply = self.model.supply_df.index[self.model.supply_df[supply] > 0]
+        costs = self.cost_matrix[self.cost_matrix["dest"].isin(with_supply)]
+        nearest = costs.sort_values("cost").groupby("origin")["cost"].head(k)
+        nearest = costs.loc[nearest.index].groupby("origin")["cost"]
+
+        return nearest.mean().where(nearest.count() >= k)
+
+    def test_nearest_matches_brute_force(self):
+        result = self.model.nearest()
+
+        for s in ["value", "other"]:
+            expected = self.brute_force(s, 1).reindex(result.index)
+            np.testing.assert_allclose(result["nearest_" + s], expected)
+
+    @pytest.mark.parametrize("k", [2, 3, 5])
+    def test_k_nearest_matches_brute_force(self, k):
+        result = self.model.nearest(name="knn", k=[1, k])
+
+        for s in ["value", "other"]:
+            expected = self.brute_force(s, k).reindex(result.index)
+            np.testing.assert_allclose(result[f"knn_{s}_{k}"], expected)
+
+    def test_nearest_is_zero_at_supply(self):
+        result = self.model.nearest(supply_values="value")
+        at_supply = self.model.supply_df["value"] > 0
+
+        assert (result.loc[at_supply, "nearest_value"] == 0).all()
+        assert (result.loc[~at_supply, "nearest_value"] > 0).all()
+
+    def test_k_beyond_supply_is_nan(self):
+        n_other = int(self.model.supply_df["other"].sum())
+        result = self.model.nearest(name="far", k=n_other + 1, supply_values="other")
+
+        assert result["far_other"].isna().all()
+
+    def test_k_below_one_raises_value_error(self):
+        with pytest.raises(ValueError):
+            self.model.nearest(k=0)
@@ -0,0 +1,90 @@
+import logging
+
+import util as tu
+
+from access import Access, profiling
+
+
+class TestProfiling:
+    def setup_method(self):
+        n = 5
+        supply_grid = tu.create_nxn_grid(n)
+        demand_grid = supply_grid.sample(5)
+        cost_matrix = tu.create_cost_matrix(supply_grid, "euclidean")
+
+        self.model = Access(
+            demand_df=demand_grid,
+            demand_index="id",
+            demand_value="value",
+            supply_df=supply_grid,
+            supply_index="id",
+            supply_value="value",
+            cost_df=cost_matrix,
+            cost_origin="origin",
+            cost_dest="dest",
+            cost_name="cost",
+            neighbor_cost_df=cost_matrix,
+            neighbor_cost_origin="origin",
+            neighbor_cost_dest="dest",
+            neighbor_cost_name="cost",
+        )
+
+    def test_stage_outside_profile_is_a_no_op(self):
+        with profiling.stage("merge"):
+            profiling.record_rows(10)
+
+    def test_profile_nests_stage_names(self):
+        with profiling.profile() as prof:
+            with profiling.stage("demand"), profiling.stage("merge"):
+                profiling.record_rows(3)
+            with profiling.stage("demand"):
+                profiling.record_rows(2)
+
+        assert set(prof.stages) == {"demand", "demand/merge"}
+        assert prof.rows == {"demand/merge": 3, "demand": 2}
+        assert prof.seconds >= prof.stages["demand"]
+        assert prof.peak_bytes is None
+
+    def test_two_stage_fca_records_stages_and_rows(self):
+        self.model.two_stage_fca(max_cost=1)
+        record = self.model.access_metadata.set_index("name").loc["2sfca_value"]
+
+        assert record["function"] == "two_stage_fca"
+        assert record["distance"] == "cost"
+        assert record["parameters"]["max_cost"] == 1
+        for key in ["demand/index", "demand/aggregate", "supply/aggregate", "join"]:
+            assert key in record["stages"]
+        cost_df = self.model.cost_df
+        expected = (
+            cost_df["origin"].isin(self.model.demand_df.index) & (cost_df["cost"] <= 1)
+        ).sum()
+        assert record["rows"]["demand"] == expected
+
+    def test_rerun_replaces_metadata_record(self):
+        self.model.two_stage_fca()
+        self.model.two_stage_fca(max_cost=1)
+
+        assert (self.model.access_metadata["name"] == "2sfca_value").sum() == 1
+
+    def test_trace_memory_records_peak_bytes(self):
+        self.model.trace_memory = True
+        self.model.raam(max_cycles=5)
+        record = self.model.access_metadata.set_index("name").loc["raam_value"]
+
+        assert record["peak_bytes"] > 0
+        assert "iterate" in record["stages"]
+
+    def test_measures_are_logged_as_structured_records(self, caplog):
+        log = logging.getLogger("access")
+        log.propagate = True
+        try:
+            with caplog.at_level(logging.DEBUG, logger="access"):
+                self.model.fca_ratio()
+        finally:
+            log.propagate = False
+
+        records = [r.access for r in caplog.records if hasattr(r, "access")]
+        assert records[0]["name"] == "fca_value"
+
+    def test_cost_metadata_is_populated(self):
+        assert list(self.model.cost_metadata["name"]) == ["cost"]
@@ -1,6 +1,17 @@
+import numpy as np
+import pytest
 import util as tu
 
-from access import Access
+from access import Access, raam
+
+
+class InterruptedCheckpoint(raam.Checkpoint):
+    """Checkpoint that stops the optimization after the snapshot of cycle 49."""
+
+    def update(self, assignment, cycle, max_cycles):
+        super().update(assignment, cycle, max_cycles)
+        if cycle == 49:
+            raise KeyboardInterrupt
 
 
 class TestRAAM:
@@ -66,3 +77,237 @@ class TestRAAM:
         actual = self.model.access_df["raam_value"].iloc[0]
 
         assert actual == 25
+
+    @pytest.mark.parametrize("method", ["frank-wolfe", "projected-gradient"])
+    def test_raam_solver_splits_single_demand_location(self, method):
+        self.model.raam(method=method, tol=1e-6)
+        self.model.raam(name="integer")
+
+        # Unlike the whole unit of demand moved by "iterate",
+        # the relaxation spreads it over the nearby facilities.
+        actual = self.model.access_df["raam_value"].iloc[0]
+        assert 0 < actual < self.model.access_df["integer_value"].iloc[0]
+
+        records = self.model.access_metadata.set_index("name")
+        assert records.loc["raam_value", "parameters"]["method"] == method
+
+    def test_raam_solvers_reach_the_same_equilibrium(self):
+        rng = np.random.default_rng(0)
+        travel = rng.uniform(0, 2, (40, 10))
+        demand = rng.integers(100, 1000, 40).astype(float)
+        supply = rng.integers(1, 10, 10) * demand.sum() / 50
+
+        fw = raam.solve_raam(demand, supply, travel, "frank-wolfe", tol=1e-8)
+        pg = raam.solve_raam(demand, supply, travel, "projected-gradient", tol=1e-8)
+        iterated = raam.iterate_raam(demand, supply, travel)
+
+        np.testing.assert_allclose(fw, pg, rtol=1e-3)
+        assert np.isclose(iterated.mean(), pg.mean(), rtol=0.02)
+
+    def test_raam_solver_skips_unreachable_facilities(self):
+        travel = np.ma.masked_invalid([[1.0, np.nan], [1.0, 2.0]])
+        demand = np.array([10.0, 10.0])
+        supply = np.array([1.0, 100.0])
+
+        cost = raam.solve_raam(demand, supply, travel, "projected-gradient")
+
+        # The first origin is stuck with the crowded first facility.
+        assert cost[0] > 10
+        assert cost[1] < cost[0]
+
+    def test_raam_unknown_method_raises_value_error(self):
+        with pytest.raises(ValueError):
+            self.model.raam(method="simplex")
+
+    def test_raam_returns_assignment_to_resume_from(self):
+        rng = np.random.default_rng(1)
+        travel = rng.uniform(0, 2, (30, 8))
+        demand = rng.integers(10, 100, 30).astype(float)
+        supply = rng.integers(1, 10, 8) * demand.sum() / 40
+
+        _, assignment = raam.iterate_raam(
+            demand, supply, travel, return_assignment=True
+        )
+        _, resumed = raam.iterate_raam(
+            demand,
+            supply,
+            travel,
+            max_cycles=0,
+            assignment=assignment,
+            return_assignment=True,
+        )
+
+        np.testing.assert_array_equal(assignment.sum(axis=1), demand)
+        np.testing.assert_array_equal(resumed, assignment)
+
+    def test_start_assignment_rescales_to_demand(self):
+        travel = np.ma.masked_invalid([[1.0, 2.0, np.nan], [3.0, 1.0, 2.0]])
+        initial = np.array([[3.0, 1.0, 5.0], [0.0, 0.0, 0.0]])
+
+        start = raam.start_assignment(np.array([9.0, 4.0]), travel, initial, True)
+
+        # The unreachable pair is dropped, and the rest scaled by 9 / 4;
+        # the second row falls back to its nearest facility.
+        np.testing.assert_array_equal(start, [[7, 2, 0], [0, 4, 0]])
+
+    def test_raam_warm_start_after_supply_change(self):
+        grid = tu.create_nxn_grid(6, random_values=True)
+        cost_matrix = tu.create_cost_matrix(grid, "euclidean")
+        model = Access(
+            demand_df=grid,
+            demand_index="id",
+            demand_value="value",
+            supply_df=grid.assign(value=grid["value"] // 10 + 1),
+            supply_index="id",
+            supply_value="value",
+            cost_df=cost_matrix,
+            cost_origin="origin",
+            cost_dest="dest",
+            cost_name="cost",
+        )
+        options = {"tau": 2, "method": "projected-gradient", "tol": 1e-8}
+        model.raam(**options)
+        assert ("value", "cost", 2) in model.raam_assignments
+
+        model.supply_df.loc[model.supply_df.index[0], "value"] += 1
+        model.raam(name="warm", max_cycles=3, warm_start=True, **options)
+        model.raam(name="cold", max_cycles=3, **options)
+        model.raam(name="full", max_cycles=1000, **options)
+
+        full = model.access_df["full_value"]
+        cold = (model.access_df["cold_value"] - full).abs().max()
+        warm = (model.access_df["warm_value"] - full).abs().max()
+        assert warm < cold / 10
+
+        records = model.access_metadata.set_index("name")
+        assert records.loc["warm_value", "parameters"]["warm_start"]
+
+    def test_coarsen_averages_reachable_travel_by_demand(self):
+        travel = np.ma.masked_invalid([[1.0, np.nan], [4.0, np.nan], [2.0, 3.0]])
+        demand = np.array([1.0, 3.0, 5.0])
+
+        coarse_demand, coarse_travel = raam.coarsen(demand, travel, np.array([0, 0, 1]))
+
+        np.testing.assert_array_equal(coarse_demand, [4, 5])
+        np.testing.assert_array_equal(coarse_travel.filled(-1), [[3.25, -1], [2, 3]])
+
+    def test_cluster_origins(self):
+        demand = self.model.supply_df.set_index(
+            self.model.supply_df.index.astype(str).str.zfill(3)
+        )
+
+        by_prefix = raam.cluster_origins(demand, prefix=2)
+        by_kmeans = raam.cluster_origins(demand, k=4)
+
+        assert set(by_prefix) == {"00", "01", "02"}
+        assert by_kmeans.nunique() == 4
+
+        with pytest.raises(ValueError):
+            raam.cluster_origins(demand)
+
+    @pytest.mark.parametrize("method", ["iterate", "projected-gradient"])
+    def test_multilevel_raam_is_close_to_full_solve(self, method):
+        grid = tu.create_nxn_grid(8, random_values=True)
+        model = Access(
+            demand_df=grid,
+            demand_index="id",
+            demand_value="value",
+            supply_df=grid.assign(value=grid["value"] // 10 + 1),
+            supply_index="id",
+            supply_value="value",
+            cost_df=tu.create_cost_matrix(grid, "euclidean"),
+            cost_origin="origin",
+            cost_dest="dest",
+            cost_name="cost",
+        )
+        clusters = raam.cluster_origins(model.demand_df, k=16)
+
+        full = model.raam(name="full", tau=2, method=method, max_cycles=500)
+        multilevel = model.raam(
+            name="ml",
+            tau=2,
+            method=method,
+            max_cycles=500,
+            clusters=clusters,
+            refine_cycles=50,
+        )
+
+        error = (multilevel["ml_value"] - full["full_value"]).abs()
+        assert error.mean() < 0.02 * full["full_value"].mean()
+
+    @pytest.mark.parametrize("method", ["iterate", "projected-gradient"])
+    def test_raam_resumes_from_checkpoint(self, tmp_path, method):
+        rng = np.random.default_rng(2)
+        travel = rng.uniform(0, 2, (30, 8))
+        demand = rng.integers(10, 100, 30).astype(float)
+        supply = rng.integers(1, 10, 8) * demand.sum() / 40
+        solver = raam.iterate_raam if method == "iterate" else raam.solve_raam
+        options = {} if method == "iterate" else {"method": method, "tol": 0}
+
+        expected = solver(demand, supply, travel, max_cycles=60, **options)
+
+        # The first run is interrupted after the checkpoint of cycle 49,
+        # from which the second only runs the last 10 cycles.
+        path = tmp_path / "raam.npz"
+        with pytest.raises(KeyboardInterrupt):
+            solver(
+                demand,
+                supply,
+                travel,
+                max_cycles=60,
+                checkpoint=InterruptedCheckpoint(path, every=10),
+                **options,
+            )
+        assert raam.Checkpoint(path).load()[1] == 50
+
+        resumed = solver(
+            demand,
+            supply,
+            travel,
+            max_cycles=60,
+            checkpoint=raam.Checkpoint(path, every=10),
+            **options,
+        )
+
+        np.testing.assert_array_equal(resumed, expected)
+        assert not path.exists()
+
+    def test_checkpoint_reorders_locations(self, tmp_path):
+        path = tmp_path / "raam.npz"
+        assignment = np.arange(6.0).reshape(3, 2)
+
+        checkpoint = raam.Checkpoint(path, origins=["a", "b", "c"], dests=[1, 2])
+        checkpoint.save(assignment, 4)
+        checkpoint.close()
+
+        reordered = raam.Checkpoint(path, origins=["c", "a", "b"], dests=[2, 1])
+        loaded, cycle = reordered.load()
+
+        assert cycle == 5
+        np.testing.assert_array_equal(loaded, assignment[[2, 0, 1]][:, [1, 0]])
+
+        with pytest.raises(ValueError):
+            raam.Checkpoint(path, origins=["a", "b", "d"], dests=[1, 2]).load()
+
+    def test_access_raam_checkpoints_each_supply(self, tmp_path):
+        self.model.raam(max_cycles=30)
+        expected = self.model.access_df["raam_value"].copy()
+
+        self.model.raam(max_cycles=30, checkpoint=tmp_path, checkpoint_every=10)
+        assert not (tmp_path / "raam_value.npz").exists()
+        np.testing.assert_array_equal(self.model.access_df["raam_value"], expected)
+
+    def test_checkpoint_of_other_inputs_raises(self, tmp_path):
+        demand = np.array([10.0, 20.0])
+        supply = np.array([5.0, 5.0])
+        travel = np.array([[1.0, 2.0], [2.0, 1.0]])
+        fingerprint = raam.problem_fingerprint(demand, supply, travel, method="a")
+
+        checkpoint = raam.Checkpoint(tmp_path / "raam.npz", fingerprint=fingerprint)
+        checkpoint.save(np.diag(demand), 4)
+        checkpoint.close()
+
+        other = raam.problem_fingerprint(demand, 2 * supply, travel, method="a")
+        with pytest.raises(ValueError, match="other inputs"):
+            raam.Checkpoint(tmp_path / "raam.npz", fingerprint=other).load()
+        assert raam.Checkpoint(tmp_path / "raam.npz", fingerprint=fingerprint).load()
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import util as tu
+
+from access import Access, weights
+
+
+class TestSession:
+    def setup_method(self):
+        n = 5
+        supply_grid = tu.create_nxn_grid(n, random_values=True)
+        supply_grid["other"] = supply_grid["value"] % 7
+        demand_grid = supply_grid.sample(15, random_state=0)
+        cost_matrix = tu.create_cost_matrix(supply_grid, "euclidean")
+
+        self.model = Access(
+            demand_df=demand_grid,
+            demand_index="id",
+            demand_value="value",
+            supply_df=supply_grid,
+            supply_index="id",
+            supply_value=["value", "other"],
+            cost_df=cost_matrix,
+            cost_origin="origin",
+            cost_dest="dest",
+            cost_name="cost",
+            neighbor_cost_df=cost_matrix,
+            neighbor_cost_origin="origin",
+            neighbor_cost_dest="dest",
+            neighbor_cost_name="cost",
+        )
+        self.model.append_user_cost(
+            cost_matrix.assign(doubled=2 * cost_matrix["cost"]),
+            "origin",
+            "dest",
+            "doubled",
+        )
+        self.model.two_stage_fca(max_cost=3, weight_fn=weights.gaussian(2))
+        self.model.fca_ratio(max_cost=2)
+
+    def test_round_trip(self, tmp_path):
+        self.model.save(tmp_path)
+        loaded = Access.load(tmp_path)
+
+        pd.testing.assert_frame_equal(loaded.access_df, self.model.access_df)
+        pd.testing.assert_frame_equal(loaded.demand_df, self.model.demand_df)
+        pd.testing.assert_frame_equal(loaded.supply_df, self.model.supply_df)
+        pd.testing.assert_frame_equal(loaded.cost_metadata, self.model.cost_metadata)
+        assert list(loaded.access_metadata["name"]) == list(
+            self.model.access_metadata["name"]
+        )
+        assert loaded.cost_names == ["cost", "doubled"]
+        assert loaded.default_cost == "cost"
+        assert loaded.neighbor_cost_names == ["cost"]
+
+        columns = ["origin", "dest", "cost", "doubled"]
+        pd.testing.assert_frame_equal(
+            loaded.cost_df[columns],
+            self.model.cost_df[columns].sort_values(
+                ["origin", "dest"], ignore_index=True
+            ),
+            check_dtype=False,
+        )
+
+    def test_cost_arrays_are_memory_mapped(self, tmp_path):
+        self.model.save(tmp_path)
+        costs = Access.load(tmp_path).factorized_costs()
+        in_memory = Access.load(tmp_path, mmap=False).factorized_costs()
+
+        assert isinstance(costs.costs["doubled"], np.memmap)
+        assert not isinstance(in_memory.costs["doubled"], np.memmap)
+        np.testing.assert_array_equal(costs.origin, in_memory.origin)
+
+    def test_cached_stages_are_reused(self, tmp_path):
+        self.model.save(tmp_path)
+        loaded = Access.load(tmp_path)
+        expected = self.model.access_df[["2sfca_value", "2sfca_other"]]
+
+        loaded.two_stage_fca(name="again", max_cost=3, weight_fn=weights.gaussian(2))
+        records = loaded.access_metadata.set_index("name")
+
+        assert "demand" not in records.loc["again_value", "stages"]
+        pd.testing.assert_frame_equal(
+            loaded.access_df[["again_value", "again_other"]],
+            expected.rename(columns=lambda c: c.replace("2sfca", "again")),
+        )
+
+    def test_compact_costs_stay_compact(self, tmp_path):
+        self.model.compact_costs()
+        self.model.save(tmp_path)
+        loaded = Access.load(tmp_path)
+
+        assert isinstance(loaded.cost_df["origin"].dtype, pd.CategoricalDtype)
+        assert loaded.cost_df["cost"].dtype == np.float32
+        pd.testing.assert_frame_equal(
+            loaded.three_stage_fca(max_cost=3), self.model.three_stage_fca(max_cost=3)
+        )
+
+    def test_entries_of_plain_callables_are_not_saved(self, tmp_path):
+        def fn(x):
+            return x
+
+        self.model.two_stage_fca(name="plain", max_cost=3, weight_fn=fn)
+        self.model.save(tmp_path)
+        keys = [k for k, _ in Access.load(tmp_path).cache.items()]
+
+        assert ("cost", "gaussian(sigma=2)", "weights") in keys
+        assert not any(fn in k for k in keys if isinstance(k, tuple))
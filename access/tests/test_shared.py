@@ -0,0 +1,92 @@
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+import util as tu
+
+from access import Access
+from access.shared import SharedCosts
+
+
+def _mean_cost(handle):
+    with SharedCosts.attach(handle) as shared:
+        return float(shared["cost:cost"].mean())
+
+
+def _crash(handle):
+    shared = SharedCosts.attach(handle)
+    shared["cost:cost"].sum()
+    raise RuntimeError("worker died")
+
+
+class TestSharedCosts:
+    def setup_method(self):
+        n = 5
+        supply_grid = tu.create_nxn_grid(n)
+        demand_grid = supply_grid.sample(1)
+        self.cost_matrix = tu.create_cost_matrix(supply_grid, "euclidean")
+
+        self.model = Access(
+            demand_df=demand_grid,
+            demand_index="id",
+            demand_value="value",
+            supply_df=supply_grid,
+            supply_index="id",
+            supply_value="value",
+            cost_df=self.cost_matrix,
+            cost_origin="origin",
+            cost_dest="dest",
+            cost_name="cost",
+        )
+
+    def test_shared_costs_round_trip_frame(self):
+        with self.model.share_costs() as shared:
+            actual = shared.costs.to_frame()
+
+        assert (actual["origin"] == self.cost_matrix["origin"]).all()
+        assert (actual["dest"] == self.cost_matrix["dest"]).all()
+        assert np.allclose(actual["cost"], self.cost_matrix["cost"])
+
+    def test_shared_costs_attach_is_zero_copy(self):
+        with self.model.share_costs() as shared:
+            attached = SharedCosts.attach(shared.handle)
+            attached["cost:cost"][0] = -1.0
+
+            assert shared["cost:cost"][0] == -1.0
+
+            attached.close()
+
+    def test_shared_costs_pickle_sends_only_handle(self):
+        with self.model.share_costs() as shared:
+            payload = pickle.dumps(shared)
+            assert len(payload) < shared["cost:cost"].nbytes
+
+            attached = pickle.loads(payload)
+            assert np.array_equal(attached["origin"], shared["origin"])
+            attached.close()
+
+    def test_shared_costs_worker_processes(self):
+        expected = self.cost_matrix["cost"].mean()
+        with (
+            self.model.share_costs() as shared,
+            ProcessPoolExecutor(max_workers=2) as pool,
+        ):
+            results = list(pool.map(_mean_cost, [shared.handle] * 4))
+
+        assert results == pytest.approx([expected] * 4)
+
+    def test_shared_costs_unlinked_after_worker_crash(self):
+        shared = self.model.share_costs()
+        with ProcessPoolExecutor(max_workers=1) as pool, pytest.raises(RuntimeError):
+            pool.submit(_crash, shared.handle).result()
+
+        shared.close()
+        assert shared.closed
+
+        with pytest.raises(FileNotFoundError):
+            SharedCosts.attach(shared.handle)
+
+    def test_shared_costs_unavailable_cost_raises_value_error(self):
+        with pytest.raises(ValueError):
+            self.model.share_costs(cost_names="euclidean")
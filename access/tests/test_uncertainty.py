@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+import util as tu
+
+from access import Access, fca
+
+
+class TestUncertainty:
+    def setup_method(self):
+        n = 5
+        supply_grid = tu.create_nxn_grid(n, random_values=True)
+        demand_grid = tu.create_nxn_grid(n, random_values=True, seed=7)
+        self.cost_matrix = tu.create_cost_matrix(supply_grid, "euclidean")
+
+        self.model = Access(
+            demand_df=demand_grid,
+            demand_index="id",
+            demand_value="value",
+            supply_df=supply_grid,
+            supply_index="id",
+            supply_value="value",
+            cost_df=self.cost_matrix,
+            cost_origin="origin",
+            cost_dest="dest",
+            cost_name="cost",
+        )
+
+    def test_two_stage_fca_draws_single_draw_matches_two_stage_fca(self):
+        demand = self.model.demand_df[["value"]].set_axis([0], axis=1)
+        supply = self.model.supply_df[["value"]].set_axis([0], axis=1)
+
+        actual = fca.two_stage_fca_draws(demand, supply, self.cost_matrix, max_cost=2)
+        expected = fca.two_stage_fca(
+            self.model.demand_df,
+            self.model.supply_df,
+            self.cost_matrix,
+            max_cost=2,
+            demand_index="id",
+            demand_name="value",
+            supply_name="value",
+        )
+
+        assert np.allclose(actual[0].sort_index(), expected.sort_index())
+
+    def test_two_stage_fca_uncertainty_without_moe_is_point_estimate(self):
+        self.model.two_stage_fca(max_cost=2)
+        result = self.model.two_stage_fca_uncertainty(max_cost=2, draws=5)
+
+        for column in result.columns:
+            assert np.allclose(result[column], self.model.access_df["2sfca_value"])
+
+    def test_two_stage_fca_uncertainty_quantiles_are_ordered(self):
+        result = self.model.two_stage_fca_uncertainty(
+            max_cost=2, draws=200, demand_moe=0.2, supply_moe={"value": 0.2}, seed=1
+        )
+
+        assert list(result.columns) == [
+            "2sfca_mc_value_q5",
+            "2sfca_mc_value_q50",
+            "2sfca_mc_value_q95",
+        ]
+        assert (result["2sfca_mc_value_q5"] < result["2sfca_mc_value_q95"]).all()
+
+    def test_two_stage_fca_uncertainty_is_reproducible_with_seed(self):
+        first = self.model.two_stage_fca_uncertainty(draws=20, demand_moe=0.1, seed=3)
+        first = first.copy()
+        second = self.model.two_stage_fca_uncertainty(draws=20, demand_moe=0.1, seed=3)
+
+        pd.testing.assert_frame_equal(first, second)
+
+    def test_two_stage_fca_uncertainty_bad_moe_column_raises_value_error(self):
+        with pytest.raises(ValueError):
+            self.model.two_stage_fca_uncertainty(draws=2, demand_moe="moe")
+
+    def test_raam_uncertainty_without_moe_is_point_estimate(self):
+        self.model.raam(max_cycles=20)
+        result = self.model.raam_uncertainty(max_cycles=20, draws=2)
+
+        assert np.allclose(
+            result["raam_mc_value_q50"], self.model.access_df["raam_value"]
+        )
+
+    def test_raam_uncertainty_quantiles_are_ordered(self):
+        result = self.model.raam_uncertainty(
+            max_cycles=20, draws=10, demand_moe=0.3, supply_moe=0.3, seed=2
+        )
+
+        assert (result["raam_mc_value_q5"] <= result["raam_mc_value_q95"]).all()
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import util as tu
+
+from access import Access, weights
+from access.costs import SortedCostIndex
+
+
+class TestVariableCatchment:
+    def setup_method(self):
+        n = 5
+        supply_grid = tu.create_nxn_grid(n, random_values=True)
+        demand_grid = supply_grid.copy()
+        self.cost_matrix = tu.create_cost_matrix(supply_grid, "euclidean")
+
+        self.model = Access(
+            demand_df=demand_grid,
+            demand_index="id",
+            demand_value="value",
+            supply_df=supply_grid,
+            supply_index="id",
+            supply_value="value",
+            cost_df=self.cost_matrix,
+            cost_origin="origin",
+            cost_dest="dest",
+            cost_name="cost",
+        )
+
+    def test_reach_matches_running_sum(self):
+        index = self.model.cost_index(by="dest")
+        values = self.model.demand_df["value"].reindex(index.col_ids).to_numpy()
+
+        radius = index.reach(values, 500)
+        for i in range(len(index.row_ids)):
+            row = slice(index.indptr[i], index.indptr[i + 1])
+            totals = np.cumsum(values[index.cols[row]])
+            expected = index.costs[row][np.argmax(totals >= 500)]
+
+            assert radius[i] == expected
+
+        assert np.isinf(index.reach(values, values.sum() + 1)).all()
+
+    def test_transpose_matches_index_by_dest(self):
+        by_origin = SortedCostIndex.from_frame(
+            self.cost_matrix, "origin", "dest", "cost"
+        )
+        by_dest = SortedCostIndex.from_frame(
+            self.cost_matrix, "origin", "dest", "cost", by="dest"
+        )
+        transposed = by_origin.transpose()
+
+        assert transposed.by == "dest"
+        assert (transposed.indptr == by_dest.indptr).all()
+        np.testing.assert_array_equal(
+            transposed.to_csr(2).toarray(), by_dest.to_csr(2).toarray()
+        )
+
+    def test_fixed_catchments_match_two_stage_fca(self):
+        fn = weights.gaussian(2)
+        expected = self.model.two_stage_fca(max_cost=2.5, weight_fn=fn)
+        actual = self.model.variable_two_stage_fca(max_cost=2.5, weight_fn=fn)
+
+        np.testing.assert_allclose(actual["vc2sfca_value"], expected["2sfca_value"])
+
+    def test_variable_catchments_cover_thresholds(self):
+        demand = self.model.demand_df["value"]
+        result = self.model.variable_two_stage_fca(
+            demand_threshold=demand.sum() + 1, supply_threshold=1e9
+        )
+
+        # Catchments that never reach their thresholds include everything,
+        # so every origin gets the system-wide ratio of supply to demand.
+        expected = self.model.supply_df["value"].sum() / demand.sum()
+        assert np.allclose(result["vc2sfca_value"], expected)
+
+    def test_larger_thresholds_smooth_access(self):
+        small = self.model.variable_two_stage_fca(
+            name="small", demand_threshold=300, supply_threshold=300
+        )["small_value"]
+        large = self.model.variable_two_stage_fca(
+            name="large", demand_threshold=1500, supply_threshold=1500
+        )["large_value"]
+
+        assert isinstance(small, pd.Series)
+        assert small.notna().all()
+        assert (large / large.mean()).std() < (small / small.mean()).std()
@@ -1,3 +1,4 @@
+import pandas as pd
 import pytest
 import util as tu
 
@@ -108,3 +109,18 @@ class TestWeightedCatchment:
             actual = self.model.access_df.gravity_value.loc[_id]
 
             assert pytest.approx(actual) == expected
+
+    def test_weighted_catchment_skips_missing_costs(self):
+        cost_df = self.model.cost_df
+        missing = cost_df.index[::7]
+        fn = weights.gaussian(2)
+
+        self.model.cost_df = cost_df.drop(missing)
+        expected = self.model.weighted_catchment(name="test", weight_fn=fn)
+        self.model.cost_df = cost_df.assign(
+            cost=cost_df["cost"].where(~cost_df.index.isin(missing))
+        )
+        actual = self.model.weighted_catchment(name="test", weight_fn=fn)
+
+        assert not actual["test_value"].isna().any()
+        pd.testing.assert_frame_equal(actual, expected)
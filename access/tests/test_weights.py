@@ -1,5 +1,7 @@
+import pickle
 from random import randint
 
+import numpy as np
 import pandas as pd
 import pytest
 
@@ -105,3 +107,86 @@ class TestWeights:
         actual = w_applied.loc[0]
 
         assert actual == 1
+
+    def test_weight_functions_equal_by_parameters(self):
+        assert weights.gaussian(20) == weights.gaussian(20)
+        assert hash(weights.gaussian(20)) == hash(weights.gaussian(20))
+        assert weights.gaussian(20) != weights.gaussian(30)
+        assert weights.gravity(20, -1) != weights.gaussian(20)
+        assert weights.step_fn({20: 1, 10: 2}) == weights.step_fn({10: 2, 20: 1})
+
+    def test_weight_function_fingerprint(self):
+        fn = weights.gravity(scale=60, alpha=-1)
+
+        assert fn.fingerprint == "gravity(alpha=-1, min_dist=0, scale=60)"
+        assert weights.kernel("gravity", scale=60, alpha=-1) == fn
+
+    def test_weight_function_pickles_by_parameters(self):
+        fn = weights.step_fn({10: 1, 20: 0.68, 30: 0.22})
+        restored = pickle.loads(pickle.dumps(fn))
+
+        assert restored == fn
+        assert [restored(v) for v in range(0, 40, 5)] == [
+            fn(v) for v in range(0, 40, 5)
+        ]
+
+    def test_register_user_kernel(self):
+        @weights.register
+        class Linear(weights.WeightFunction):
+            name = "test_linear"
+
+            def __init__(self, max_cost):
+                super().__init__(max_cost=max_cost)
+
+            def __call__(self, x):
+                return max(0, 1 - x / self.params["max_cost"])
+
+        fn = weights.kernel("test_linear", max_cost=10)
+
+        assert isinstance(fn, Linear)
+        assert fn(5) == 0.5
+
+        with pytest.raises(ValueError):
+            weights.kernel("not_registered")
+
+    def test_evaluate_unique_matches_apply(self):
+        costs = pd.Series([0.5, 12.25, 30.0, 12.25, np.nan, 75.0, 0.5, 41.0])
+        for fn in [
+            weights.step_fn({10: 1, 20: 0.68, 30: 0.22}),
+            weights.gaussian(20),
+            weights.gravity(scale=20, alpha=-2, min_dist=1),
+            lambda x: 2 * x,
+        ]:
+            expected = costs.apply(fn).to_numpy(dtype=float)
+            actual = weights.evaluate_unique(fn, costs.to_numpy())
+
+            np.testing.assert_allclose(actual, expected)
+
+    def test_evaluate_unique_integer_lookup_table(self):
+        costs = np.array([3, 70, 3, 15, 0, 45])
+        fn = weights.step_fn({20: 1, 40: 0.68, 60: 0.22})
+        calls = []
+
+        def counted(x):
+            calls.append(x)
+            return fn(x)
+
+        actual = weights.evaluate_unique(counted, costs)
+        table = weights.evaluate_unique(fn, costs)
+
+        assert actual.tolist() == [fn(c) for c in costs]
+        assert table.tolist() == actual.tolist()
+        # Plain callables are only applied to the distinct costs.
+        assert sorted(calls) == sorted(set(costs.tolist()))
+
+    def test_evaluate_unique_integer_extremes(self):
+        fn = weights.gaussian(50)
+        for costs in [
+            np.tile(np.array([-100, 100, 0, -100, 100], dtype=np.int8), 100),
+            np.array([-(2**62), 2**62, 0], dtype=np.int64),
+            np.array([0, 2**64 - 1, 0], dtype=np.uint64),
+        ]:
+            actual = weights.evaluate_unique(fn, costs)
+            expected = [fn(c) for c in costs.tolist()]
+
+            np.testing.assert_allclose(actual, expected)
@@ -1,7 +1,7 @@
-import math
 import random
 
 import geopandas as gpd
+import numpy as np
 import pandas as pd
 
 
@@ -55,21 +55,23 @@ def create_cost_matrix(grid, dist_func):
                  to every other point in the play grid. Has columns 'origin',
                  'dest', and 'cost'
     """
-    rows = []
+    x = grid["x"].to_numpy()
+    y = grid["y"].to_numpy()
+    ids = grid["id"].to_numpy()
+
+    # every origin (outer) against every destination (inner)
+    n = len(grid)
+    o = np.repeat(np.arange(n), n)
+    d = np.tile(np.arange(n), n)
 
     funcs = {
-        "manhattan": lambda i, j: abs(i.x - j.x) + abs(i.y - j.y),
-        "euclidean": lambda i, j: math.sqrt((i.x - j.x) ** 2 + (i.y - j.y) ** 2),
+        "manhattan": lambda o, d: np.abs(x[o] - x[d]) + np.abs(y[o] - y[d]),
+        "euclidean": lambda o, d: np.sqrt((x[o] - x[d]) ** 2 + (y[o] - y[d]) ** 2),
     }
     dist_func = funcs[dist_func]
 
-    for x in grid.iterrows():
-        x = x[1]
-        for y in grid.iterrows():
-            y = y[1]
-            dist = dist_func(x, y)
-            rows.append([x.id, y.id, dist])
-
-    cost_matrix = pd.DataFrame(rows, columns=["origin", "dest", "cost"])
+    cost_matrix = pd.DataFrame(
+        {"origin": ids[o], "dest": ids[d], "cost": dist_func(o, d)}
+    )
 
     return cost_matrix
@@ -1,5 +1,274 @@
 import numpy as np
 
+_registry = {}
+
+
+def register(cls):
+    """
+    Register a :class:`WeightFunction` subclass under its `name`,
+    so that it can be created with :func:`kernel`.
+    Use it as a class decorator.
+
+    Examples
+    --------
+
+    >>> from access import weights
+
+    >>> @weights.register
+    ... class Exponential(weights.WeightFunction):
+    ...     name = "exponential"
+    ...     def __init__(self, scale):
+    ...         super().__init__(scale = scale)
+    ...     def __call__(self, x):
+    ...         return np.exp(-x / self.params["scale"])
+
+    >>> weights.kernel("exponential", scale = 30)
+    exponential(scale=30)
+    """
+
+    if not (isinstance(cls, type) and issubclass(cls, WeightFunction)):
+        raise TypeError("Only WeightFunction subclasses can be registered.")
+
+    if not cls.name:
+        raise ValueError("Weight functions must have a name to be registered.")
+
+    _registry[cls.name] = cls
+
+    return cls
+
+
+def kernel(name, **params):
+    """Create the registered weight function `name`, with `params`."""
+
+    if name not in _registry:
+        raise ValueError(f"{name} is not a registered weight function.")
+
+    return _registry[name](**params)
+
+
+class WeightFunction:
+    """
+    Base class of the weight functions: a callable from cost to weight,
+    described entirely by its `name` and `params`.
+    Two weight functions with the same name and parameters are equal and hash alike,
+    so that results computed with one can be reused for the other,
+    and they are pickled as just their parameters.
+    Subclasses pass their parameters, which must be hashable,
+    to ``WeightFunction.__init__`` and implement ``__call__``.
+
+    Attributes
+    ----------
+    name                : str
+                          Name of the family of functions, e.g., "gaussian".
+    params              : dict
+                          Parameters of this function.
+    """  # noqa: E501
+
+    name = None
+
+    def __init__(self, **params):
+        self.params = params
+
+    def __call__(self, x):
+        raise NotImplementedError
+
+    def apply(self, values):
+        """
+        Weights for an array of costs. Subclasses should override this
+        with a vectorized version; by default, the function is called on each value.
+        """
+
+        return np.fromiter((self(v) for v in values), dtype=float, count=len(values))
+
+    def _key(self):
+        return (
+            self.name or type(self).__qualname__,
+            tuple(sorted(self.params.items())),
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, WeightFunction):
+            return NotImplemented
+
+        return type(self) is type(other) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        params = ", ".join(f"{k}={v!r}" for k, v in sorted(self.params.items()))
+        return f"{self._key()[0]}({params})"
+
+    @property
+    def fingerprint(self):
+        """Identifier of the function, stable across processes and sessions."""
+
+        return repr(self)
+
+
+@register
+class StepFunction(WeightFunction):
+    """
+    Piecewise-constant weights: the value of the first step
+    whose cut-off is at least the cost, and 0 beyond the last one.
+    See :func:`step_fn`.
+    """
+
+    name = "step"
+
+    def __init__(self, steps):
+        if isinstance(steps, dict):
+            steps = steps.items()
+
+        steps = tuple(sorted(steps))
+        for _, v in steps:
+            if v < 0:
+                raise ValueError("All weights must be positive.")
+
+        super().__init__(steps=steps)
+
+    def __call__(self, x):
+        for k, v in self.params["steps"]:
+            if x <= k:
+                return v
+
+        return 0
+
+    def apply(self, values):
+        cutoffs = np.array([k for k, _ in self.params["steps"]], dtype=float)
+        levels = np.array([v for _, v in self.params["steps"]] + [0], dtype=float)
+
+        # Index of the first cut-off at or above each value; NaN sorts past the end.
+        return levels[np.searchsorted(cutoffs, values, side="left")]
+
+
+@register
+class Gaussian(WeightFunction):
+    """
+    Gaussian weights, :math:`f(x) = \\exp(-x^2 / 2\\sigma^2)`. See :func:`gaussian`.
+    """
+
+    name = "gaussian"
+
+    def __init__(self, sigma):
+        if sigma == 0:
+            raise ValueError("Sigma must be non-zero.")
+
+        super().__init__(sigma=sigma)
+
+    def __call__(self, x):
+        sigma = self.params["sigma"]
+        return np.exp(-x * x / (2 * sigma**2))  # / np.sqrt(2*np.pi*sigma**2)
+
+    def apply(self, values):
+        return self(np.asarray(values, dtype=float))
+
+
+@register
+class Gravity(WeightFunction):
+    """
+    Gravity weights, :math:`f(x) = (\\text{max}(x, x_\\text{min})/s)^\\alpha`. See :func:`gravity`.
+    """  # noqa: E501
+
+    name = "gravity"
+
+    def __init__(self, scale, alpha, min_dist=0):
+        super().__init__(scale=scale, alpha=alpha, min_dist=min_dist)
+
+    def __call__(self, x):
+        p = self.params
+        return np.power(max(x, p["min_dist"]) / p["scale"], p["alpha"])
+
+    def apply(self, values):
+        p = self.params
+        values = np.maximum(np.asarray(values, dtype=float), p["min_dist"])
+        return np.power(values / p["scale"], p["alpha"])
+
+
+# Integer costs spanning at most this many values are weighted through a lookup table.
+_MAX_TABLE = 2**20
+
+
+def evaluate_unique(weight_fn, costs):
+    """
+    Evaluate `weight_fn` on an array of costs, once per distinct value.
+    Cost tables are typically rounded (e.g., to 0.01 minutes),
+    so millions of rows share a few thousand values:
+    the function is applied to those, and the results are gathered back to the rows.
+    Integer costs in a range narrower than their number use a lookup table instead of sorting,
+    when all the functions are :class:`WeightFunction` objects.
+    This makes arbitrary Python weight functions nearly as cheap as vectorized ones.
+    With a list of functions, the distinct values are found once, and all functions share them.
+
+    Parameters
+    ----------
+    weight_fn           : {function, list}
+                          Weight as a function of the cost;
+                          a :class:`WeightFunction`, or any callable on a single value.
+                          Or a list of them.
+    costs               : array-like
+                          Costs to weight.
+
+    Returns
+    -------
+
+    weights             : numpy.ndarray
+                          Weight of each cost, as floats;
+                          with a list of functions, one column per function.
+    """  # noqa: E501
+
+    costs = np.asarray(costs)
+    if isinstance(weight_fn, (list, tuple)):
+        weight_fns = list(weight_fn)
+        shape = (len(costs), len(weight_fns))
+    else:
+        weight_fns = [weight_fn]
+        shape = (len(costs),)
+
+    if not len(costs):
+        return np.zeros(shape)
+
+    if _use_table(weight_fns, costs):
+        low, high = int(costs.min()), int(costs.max())
+        # Widen signed costs, whose offsets from the minimum may not fit their type.
+        index = (
+            costs - costs.min()
+            if costs.dtype.kind == "u"
+            else costs.astype(np.int64) - low
+        )
+        values = np.arange(low, high + 1)
+    else:
+        values, index = np.unique(costs, return_inverse=True)
+        index = index.reshape(-1)
+
+    table = np.column_stack([_apply(f, values) for f in weight_fns])
+
+    return table[index].reshape(shape)
+
+
+def _use_table(weight_fns, costs):
+    """
+    Whether to evaluate the weight functions on every integer from the least to the greatest cost.
+    Only vectorized functions, and ranges no longer than the costs themselves, are worth it.
+    """  # noqa: E501
+
+    if costs.dtype.kind not in "iu":
+        return False
+
+    if not all(isinstance(f, WeightFunction) for f in weight_fns):
+        return False
+
+    span = int(costs.max()) - int(costs.min())
+
+    return span < min(_MAX_TABLE, len(costs))
+
+
+def _apply(weight_fn, values):
+    if isinstance(weight_fn, WeightFunction):
+        return np.asarray(weight_fn.apply(values), dtype=float)
+
+    return np.array([weight_fn(v) for v in values.tolist()], dtype=float)
+
 
 def step_fn(step_dict):
     """
@@ -13,7 +282,7 @@ def step_fn(step_dict):
     Returns
     -------
 
-    weight_function     : function
+    weight_function     : StepFunction
                           Function returning weight, for input distance or time, *x*.
                           Values beyond the largest threshold will return 0.
 
@@ -36,18 +305,7 @@ def step_fn(step_dict):
     if not isinstance(step_dict, dict):
         raise TypeError("step_dict must be of type dict.")
 
-    for v in step_dict.values():
-        if v < 0:
-            raise ValueError("All weights must be positive.")
-
-    def helper(key_to_test):
-        for k, v in sorted(step_dict.items()):
-            if key_to_test <= k:
-                return v
-
-        return 0
-
-    return helper
+    return StepFunction(step_dict)
 
 
 def gaussian(sigma):
@@ -66,7 +324,7 @@ def gaussian(sigma):
     Returns
     -------
 
-    weight_function     : function
+    weight_function     : Gaussian
                           Function returning weight, for input distance or time, *x*.
 
     Examples
@@ -91,10 +349,7 @@ def gaussian(sigma):
     {0: 1.0, 1: 0.6065306597126334, 2: 0.1353352832366127, 3: 0.011108996538242306}
     """  # noqa: E501
 
-    if sigma == 0:
-        raise ValueError("Sigma must be non-zero.")
-
-    return lambda x: np.exp(-x * x / (2 * sigma**2))  # / np.sqrt(2*np.pi*sigma**2)
+    return Gaussian(sigma)
 
 
 def gravity(scale, alpha, min_dist=0):
@@ -120,7 +375,7 @@ def gravity(scale, alpha, min_dist=0):
     Returns
     -------
 
-    weight_function     : function
+    weight_function     : Gravity
                           Function returning weight, for input distance or time, *x*.
 
     Examples
@@ -139,4 +394,4 @@ def gravity(scale, alpha, min_dist=0):
     {0: 400.0, 1: 400.0, 2: 100.0, 20: 1.0, 40: 0.25, 60: 0.11}
     """  # noqa: E501
 
-    return lambda x: np.power(max(x, min_dist) / scale, alpha)
+    return Gravity(scale, alpha, min_dist)
@@ -0,0 +1,156 @@
+"""
+Benchmarks for the access measures, run with `airspeed velocity <https://asv.readthedocs.io>`_:
+
+    asv run
+    asv continuous main HEAD
+
+Problems are generated with :meth:`access.Datasets.synthetic`,
+at 1k, 10k and 100k origins (with a tenth as many facilities).
+"""
+
+import geopandas as gpd
+
+from access import Access, Datasets, weights
+
+SIZES = [1_000, 10_000, 100_000]
+
+
+def build_access(n_origins, geometry=False):
+    demand, supply, costs, neighbor_costs = Datasets.synthetic(n_origins)
+
+    if geometry:
+        demand = gpd.GeoDataFrame(
+            demand, geometry=gpd.points_from_xy(demand.x * 1000, demand.y * 1000)
+        )
+        supply = gpd.GeoDataFrame(
+            supply, geometry=gpd.points_from_xy(supply.x * 1000, supply.y * 1000)
+        )
+
+    return Access(
+        demand_df=demand,
+        demand_index="geoid",
+        demand_value="pop",
+        supply_df=supply,
+        supply_index="geoid",
+        supply_value=["doc", "dentist"],
+        cost_df=costs,
+        cost_origin="origin",
+        cost_dest="dest",
+        cost_name="cost",
+        neighbor_cost_df=neighbor_costs,
+        neighbor_cost_origin="origin",
+        neighbor_cost_dest="dest",
+        neighbor_cost_name="cost",
+    )
+
+
+class Synthetic:
+    params = SIZES
+    param_names = ["n_origins"]
+
+    def time_synthetic(self, n_origins):
+        Datasets.synthetic(n_origins)
+
+
+class WeightedCatchment:
+    params = SIZES
+    param_names = ["n_origins"]
+    timeout = 600
+
+    def setup(self, n_origins):
+        self.access = build_access(n_origins)
+
+    # Each timed call starts from an empty cache, so that it measures the computation;
+    # the *_cached benchmarks measure the repeated calls that hit it.
+
+    def time_weighted_catchment(self, _):
+        self.access.cache.clear()
+        self.access.weighted_catchment(max_cost=30)
+
+    def time_weighted_catchment_gravity(self, _):
+        self.access.cache.clear()
+        self.access.weighted_catchment(weight_fn=weights.gravity(30, -1, min_dist=1))
+
+
+class FloatingCatchment:
+    params = SIZES
+    param_names = ["n_origins"]
+    timeout = 600
+
+    def setup(self, n_origins):
+        self.access = build_access(n_origins)
+
+    # Each timed call starts from an empty cache, so that it measures the computation;
+    # the *_cached benchmarks measure the repeated calls that hit it.
+
+    def time_fca_ratio(self, _):
+        self.access.cache.clear()
+        self.access.fca_ratio(max_cost=30)
+
+    def time_two_stage_fca(self, _):
+        self.access.cache.clear()
+        self.access.two_stage_fca(max_cost=30)
+
+    def time_enhanced_two_stage_fca(self, _):
+        self.access.cache.clear()
+        self.access.enhanced_two_stage_fca()
+
+    def time_three_stage_fca(self, _):
+        self.access.cache.clear()
+        self.access.three_stage_fca()
+
+    def peakmem_two_stage_fca(self, _):
+        self.access.cache.clear()
+        self.access.two_stage_fca(max_cost=30)
+
+
+class FloatingCatchmentCached:
+    params = SIZES
+    param_names = ["n_origins"]
+    timeout = 600
+
+    def setup(self, n_origins):
+        self.access = build_access(n_origins)
+        self.access.two_stage_fca(max_cost=30)
+        self.access.three_stage_fca()
+
+    def time_two_stage_fca_cached(self, _):
+        self.access.two_stage_fca(max_cost=30)
+
+    def time_three_stage_fca_cached(self, _):
+        self.access.three_stage_fca()
+
+
+class RAAM:
+    params = SIZES
+    param_names = ["n_origins"]
+    timeout = 1800
+
+    def setup(self, n_origins):
+        # RAAM holds dense origins x facilities matrices: 100k x 10k does not fit.
+        if n_origins > 10_000:
+            raise NotImplementedError
+        self.access = build_access(n_origins)
+
+    def time_raam(self, _):
+        self.access.raam(supply_values="doc", tau=30)
+
+
+class Euclidean:
+    params = SIZES
+    param_names = ["n_origins"]
+    timeout = 600
+
+    def setup(self, n_origins):
+        # Point geometries are compared by a full cross join.
+        if n_origins > 10_000:
+            raise NotImplementedError
+        self.access = build_access(n_origins, geometry=True)
+
+    def time_create_euclidean_distance(self, _):
+        self.access.create_euclidean_distance(threshold=50_000)
+
+    def time_create_euclidean_distance_neighbors(self, n_origins):
+        if n_origins > 1_000:
+            raise NotImplementedError
+        self.access.create_euclidean_distance_neighbors(threshold=50_000)